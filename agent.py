@@ -2,10 +2,19 @@
 # Contains the core logic for the AI agent.
 # It uses a Language Model to reason, decide which tools to use, and formulate answers.
 
+import asyncio
 import os
+import time
 from openai import AsyncOpenAI
-from prompts import SYSTEM_PROMPT_TEMPLATE
-from tools import SupplyChainNewsSearchTool
+from analytics_store import get_analytics_store
+from app_config import AGENT_CONFIG, ANALYTICS_CONFIG, COMPRESSION_CONFIG, MEMORY_CONFIG
+from cancellation import CancellationToken, RunCancelled
+from compression import get_compressor
+from planner import PlanAndExecuteEngine
+from prompts import SESSION_EVIDENCE_TEMPLATE, SYSTEM_PROMPT_TEMPLATE
+from text_processing import estimate_tokens
+from tool_registry import get_tool_registry
+from tools import parse_results, parse_urls
 
 class SupplyChainAnalystAgent:
     """
@@ -14,21 +23,57 @@ class SupplyChainAnalystAgent:
     This agent uses an LLM to break down a user's query, use available tools
     to gather information, and synthesize an answer based on its findings.
     """
-    def __init__(self, model="gpt-4o"):
+    def __init__(self, model="gpt-4o", client=None, engine=None, tools=None, analytics=None):
         """
         Initializes the agent.
         Args:
             model (str): The name of the OpenAI model to use for reasoning.
+            client: An OpenAI-compatible async client. Defaults to AsyncOpenAI
+                with the key from the environment.
+            engine (str): "react" for the step-by-step loop or "plan" for the
+                plan-and-execute engine. Defaults to AGENT_CONFIG["engine"].
+            tools (ToolRegistry): The tools the agent may call. Defaults to the
+                shared registry built from TOOL_CONFIG.
+            analytics (AnalyticsStore): Where every run is recorded. Defaults to
+                the shared store when ANALYTICS_CONFIG["enabled"] is set.
         """
-        self.client = AsyncOpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+        self.client = client or AsyncOpenAI(api_key=os.getenv("OPENAI_API_KEY"))
         self.model = model
-        # The agent's "toolbox" contains all the tools it can use.
-        self.tools = [SupplyChainNewsSearchTool()]
+        self.engine = engine or AGENT_CONFIG["engine"]
+        # The agent's "toolbox" contains all the tools it can use. Tools are
+        # constructed on first use and run within their declared limits.
+        self.tools = tools or get_tool_registry()
+        if analytics is None and ANALYTICS_CONFIG["enabled"]:
+            analytics = get_analytics_store()
+        self.analytics = analytics
 
-    async def run(self, query: str, max_steps: int = 5) -> str:
+    async def run(self, query: str, max_steps: int = 5, on_progress=None, cancel_token=None, memory=None) -> str:
         """
         Runs the agent to answer a user's query.
 
+        Args:
+            query (str): The user's question.
+            max_steps (int): The maximum number of steps the agent can take.
+            on_progress (callable): Receives each progress message; defaults to print.
+            cancel_token (CancellationToken): Cancels the run when cancelled.
+            memory (SessionMemory): The conversation's evidence memory, if any.
+
+        Returns:
+            str: The final answer to the user's query.
+
+        Raises:
+            RunCancelled: If `cancel_token` was cancelled.
+        """
+        run_record = await self.analyze(
+            query, max_steps=max_steps, on_progress=on_progress, cancel_token=cancel_token, memory=memory
+        )
+        return run_record["answer"]
+
+    async def analyze(self, query: str, max_steps: int = 5, on_progress=None, cancel_token=None,
+                      memory=None) -> dict:
+        """
+        Runs the agent and returns the answer together with the evidence behind it.
+
         The agent operates in a loop:
         1. Thinks about what to do next.
         2. Chooses a tool to use.
@@ -38,10 +83,78 @@ class SupplyChainAnalystAgent:
         Args:
             query (str): The user's question.
             max_steps (int): The maximum number of steps the agent can take.
+            on_progress (callable): Receives each progress message (steps, tool
+                calls, observations); defaults to print.
+            cancel_token (CancellationToken): Cancelling it aborts the run,
+                including its in-flight model and tool requests.
+            memory (SessionMemory): Evidence from earlier questions of the same
+                conversation. The run is seeded with the relevant part of it,
+                repeated searches are answered from it, and the run's own
+                evidence is added to it afterwards.
+
+        With the "plan" engine the loop is replaced by a single planning call,
+        concurrent tool calls and a synthesis call (see planner.py).
 
         Returns:
-            str: The final answer to the user's query.
+            dict: The run record with keys 'query', 'answer', 'steps',
+                'observations' (one dict per tool call with 'tool', 'input',
+                the raw 'output', the compressed 'context' shown to the model,
+                its 'compression' stats and whether it was 'reused' from
+                memory) and 'evidence' (the prior evidence it was seeded with).
+
+        Raises:
+            RunCancelled: If `cancel_token` was cancelled. The exception
+                carries the partial run record.
         """
+        engine_name = self.engine
+        cancel_token = cancel_token or CancellationToken()
+        memory = memory if MEMORY_CONFIG["enabled"] else None
+        run_record = {"query": query, "answer": "", "steps": 0, "observations": [], "evidence": ""}
+        if memory is not None:
+            run_record["evidence"], recalled = memory.recall(query)
+            if run_record["evidence"]:
+                (on_progress or print)(f"Seeded with evidence from earlier in this conversation ({recalled} result(s)).")
+        started = time.perf_counter()
+        try:
+            with cancel_token.attach():
+                if engine_name == "plan":
+                    engine = PlanAndExecuteEngine(
+                        self,
+                        max_queries=AGENT_CONFIG["plan_max_queries"],
+                        follow_up_rounds=AGENT_CONFIG["plan_follow_up_rounds"]
+                    )
+                    max_steps = 2 + engine.follow_up_rounds
+                    await engine.analyze(
+                        query, token_budget=AGENT_CONFIG["context_token_budget"], on_progress=on_progress,
+                        cancel_token=cancel_token, run_record=run_record, memory=memory
+                    )
+                else:
+                    await self._react(run_record, max_steps, on_progress or print, cancel_token, memory)
+        except RunCancelled as e:
+            (on_progress or print)(f"Run cancelled: {e.reason}")
+            cancel_token.publish(saved_steps=max_steps - run_record["steps"])
+            e.run_record = run_record
+            raise
+        finally:
+            # Whatever was found is worth keeping, even if the run did not finish.
+            if memory is not None:
+                memory.add_run(run_record)
+
+        if self.analytics is not None:
+            # Analytics must never cost the user an answer, nor stall the event
+            # loop (other runs, lease heartbeats) while Parquet files are written.
+            try:
+                await asyncio.to_thread(
+                    self.analytics.record, run_record, latency=time.perf_counter() - started, engine=engine_name
+                )
+            except Exception as e:
+                print(f"Could not record the run in the analytics store: {e}")
+        return run_record
+
+    async def _react(self, run_record: dict, max_steps: int, report, cancel_token: CancellationToken, memory=None):
+        """The think/act/observe loop of the "react" engine; fills in `run_record` (see `analyze`)."""
+        query = run_record["query"]
+
         # Format the system prompt with the tools the agent can use
         system_prompt = SYSTEM_PROMPT_TEMPLATE.format(
             tools_summary=self._get_tools_summary(),
@@ -51,61 +164,182 @@ class SupplyChainAnalystAgent:
         # Initialize the conversation history
         messages = [
             {"role": "system", "content": system_prompt},
-            {"role": "user", "content": f"My question is: {query}"}
+            {"role": "user", "content": self.question_message(run_record)}
         ]
 
         for step in range(max_steps):
-            print(f"--- Step {step + 1} ---")
-            response = await self.client.chat.completions.create(
-                model=self.model,
-                messages=messages,
-                temperature=0.0,
-            )
-            assistant_message = response.choices[0].message
-            messages.append(assistant_message)
+            cancel_token.raise_if_cancelled()
+            report(f"--- Step {step + 1} ---")
+            run_record["steps"] = step + 1
+            with cancel_token.tracking("llm"):
+                assistant_content = await self.complete(messages)
+            messages.append({"role": "assistant", "content": assistant_content})
 
             # Check if the assistant's message contains the final answer
-            if "<answer>" in assistant_message.content:
-                final_answer = self._extract_content(assistant_message.content, "answer")
-                print("Agent has formulated the final answer.")
-                return final_answer
+            if "<answer>" in assistant_content:
+                final_answer = self._extract_content(assistant_content, "answer")
+                report("Agent has formulated the final answer.")
+                run_record["answer"] = final_answer
+                return
 
             # If not, the agent must be thinking about using a tool
-            if "<tool>" in assistant_message.content:
-                tool_name = self._extract_content(assistant_message.content, "tool")
-                tool_input = self._extract_content(assistant_message.content, "tool_input")
-                print(f"Agent wants to use tool: {tool_name} with input: '{tool_input}'")
+            if "<tool>" in assistant_content:
+                tool_name = self._extract_content(assistant_content, "tool")
+                tool_input = self._extract_content(assistant_content, "tool_input")
+                report(f"Agent wants to use tool: {tool_name} with input: '{tool_input}'")
 
                 # Find and execute the chosen tool
-                tool = self._find_tool(tool_name)
+                tool = self.find_tool(tool_name)
                 if tool:
-                    tool_output = await tool.use(tool_input)
-                    observation = f"<observation>\n{tool_output}\n</observation>"
+                    token_budget = self._step_token_budget(messages, max_steps - step - 1)
+                    tool_output, reused, tool_input = await self.use_tool(
+                        tool, tool_input, token_budget, cancel_token, memory, report, run_record
+                    )
+                    context, compression = self.compress_observation(
+                        f"{query} {tool_input}", tool_output, token_budget
+                    )
+                    run_record["observations"].append({
+                        "tool": tool_name, "input": tool_input, "output": tool_output,
+                        "context": context, "compression": compression, "reused": reused
+                    })
+                    if compression["ratio"] < 1.0:
+                        report(f"Compressed observation: {compression['raw_tokens']} -> "
+                               f"{compression['tokens']} tokens ({compression['ratio']:.0%})")
+                    observation = f"<observation>\n{context}\n</observation>"
                 else:
                     observation = f"<observation>\nTool '{tool_name}' not found.\n</observation>"
 
-                print(f"Observation: {observation[:200]}...") # Print snippet of observation
+                report(f"Observation: {observation[:200]}...") # Report snippet of observation
                 messages.append({"role": "user", "content": observation})
             else:
                 # If the agent doesn't provide an answer or use a tool, it might be stuck.
-                return "The agent could not find an answer or decide on the next step."
+                run_record["answer"] = "The agent could not find an answer or decide on the next step."
+                return
+
+        run_record["answer"] = "The agent reached the maximum number of steps without finding an answer."
+        return
 
-        return "The agent reached the maximum number of steps without finding an answer."
+    async def complete(self, messages: list) -> str:
+        """
+        Makes a single chat-completion call with the agent's model.
+
+        Args:
+            messages (list): The conversation to send.
+
+        Returns:
+            str: The assistant's reply.
+        """
+        response = await self.client.chat.completions.create(
+            model=self.model,
+            messages=messages,
+            temperature=0.0,
+        )
+        return response.choices[0].message.content or ""
+
+    async def use_tool(self, tool, tool_input: str, token_budget: int, cancel_token: CancellationToken,
+                       memory=None, report=None, run_record: dict = None) -> tuple:
+        """
+        Calls a tool, unless the conversation already ran an equivalent call.
+
+        Tools declaring `known_urls_only` are given only the URLs of their
+        input that are the URL of a result in the run's evidence or earlier
+        observations. URLs merely mentioned in a snippet or an article's text
+        do not count, so a page cannot steer the model into fetching arbitrary
+        addresses.
+
+        Args:
+            tool: The tool to call.
+            tool_input (str): The input chosen by the model.
+            token_budget (int): Tokens available for the output, if known.
+            cancel_token (CancellationToken): The run's cancellation token.
+            memory (SessionMemory): The conversation's evidence memory, if any.
+            report (callable): Told when a result is taken from memory.
+            run_record (dict): The run so far, for tools declaring `known_urls_only`.
+
+        Returns:
+            tuple: (tool output, whether it was taken from `memory`, the input
+                the tool was actually given, which is what should be recorded).
+        """
+        notice = ""
+        if tool.known_urls_only and run_record is not None:
+            texts = [run_record.get("evidence") or ""] + [obs["output"] for obs in run_record["observations"]]
+            known = {result["url"] for text in texts for result in parse_results(text)}
+            urls = parse_urls(tool_input)
+            allowed = [url for url in urls if url in known]
+            if not allowed:
+                return "Error: Only URLs of results in earlier observations can be fetched.", False, ""
+            if len(allowed) < len(urls):
+                notice = f"Skipped {len(urls) - len(allowed)} URL(s) that are not results of earlier observations.\n\n"
+            tool_input = " ".join(allowed)
+
+        if memory is not None:
+            output = memory.lookup(tool.name, tool_input)
+            if output is not None:
+                if report is not None:
+                    report(f"Reusing the earlier result of {tool.name} for '{tool_input}'")
+                return notice + output, True, tool_input
+        cancel_token.raise_if_cancelled()
+        with cancel_token.tracking("tool"):
+            return notice + await tool.use(tool_input, token_budget=token_budget), False, tool_input
+
+    @staticmethod
+    def question_message(run_record: dict) -> str:
+        """The opening user message of a run, with any prior evidence it was seeded with."""
+        message = f"My question is: {run_record['query']}"
+        if run_record.get("evidence"):
+            message += SESSION_EVIDENCE_TEMPLATE.format(evidence=run_record["evidence"])
+        return message
+
+    @staticmethod
+    def compress_observation(focus: str, tool_output: str, token_budget: int = None) -> tuple:
+        """
+        Shrinks a tool output to the sentences most relevant to the task.
+
+        Args:
+            focus (str): What the kept sentences should be relevant to: the
+                user's question and the tool input (which for some tools, such
+                as the article fetcher, is only a list of URLs).
+            tool_output (str): The raw tool output.
+            token_budget (int): The step's token budget, if known.
+
+        Returns:
+            tuple: (text for the model, stats dict with 'raw_tokens', 'tokens' and 'ratio').
+        """
+        if not COMPRESSION_CONFIG["enabled"]:
+            raw_tokens = estimate_tokens(tool_output)
+            return tool_output, {"raw_tokens": raw_tokens, "tokens": raw_tokens, "ratio": 1.0}
+        budget = COMPRESSION_CONFIG["observation_token_budget"]
+        if token_budget is not None:
+            budget = min(budget, token_budget)
+        return get_compressor().compress(focus, tool_output, budget)
+
+    @staticmethod
+    def _step_token_budget(messages: list, remaining_steps: int) -> int:
+        """
+        Splits the tokens left in the run's context budget across the remaining steps.
+
+        Args:
+            messages (list): The conversation so far.
+            remaining_steps (int): Steps left after the current one.
+
+        Returns:
+            int: The tokens this step's observation may take.
+        """
+        used = sum(estimate_tokens(message["content"] or "") for message in messages)
+        remaining = max(0, AGENT_CONFIG["context_token_budget"] - used)
+        return remaining // (remaining_steps + 1)
 
-    def _get_tools_summary(self) -> str:
-        """Generates a summary of available tools for the prompt."""
-        return "\n".join([f"- {tool.name}: {tool.description}" for tool in self.tools])
+    def _get_tools_summary(self, tools: list = None) -> str:
+        """Generates a summary of the given tools (all by default) for the prompt."""
+        return "\n".join([f"- {tool.name}: {tool.description}" for tool in (tools or self.tools)])
 
-    def _get_tools_details(self) -> str:
-        """Generates detailed descriptions of available tools for the prompt."""
-        return "\n".join([tool.details for tool in self.tools])
+    def _get_tools_details(self, tools: list = None) -> str:
+        """Generates detailed descriptions of the given tools (all by default) for the prompt."""
+        return "\n".join([tool.details for tool in (tools or self.tools)])
 
-    def _find_tool(self, name: str):
-        """Finds a tool instance by its name."""
-        for tool in self.tools:
-            if tool.name == name:
-                return tool
-        return None
+    def find_tool(self, name: str):
+        """Finds a tool by its name."""
+        return self.tools.get(name)
 
     @staticmethod
     def _extract_content(text: str, tag: str) -> str:
@@ -0,0 +1,468 @@
+# analytics_store.py
+# Append-only columnar store of past analyses for fast aggregate queries.
+# Every agent run is reduced to one row (query, time, engine, latency, risk
+# level, flagged categories, tagged regions, sources, ...) and appended to
+# Parquet files partitioned by date (analytics/date=YYYY-MM-DD/*.parquet).
+# Rows are buffered and written in batches, each process writes its own files,
+# and flushes keep the file count low by merging a partition's files once
+# today's partition has grown past `compact_files` files or a day is over.
+# Aggregates are computed with pyarrow over only the columns and date
+# partitions they need. Partitions and date ranges are UTC dates.
+#
+# Usage:
+#   python analytics_store.py summary [--days 30]
+#   python analytics_store.py compact
+
+import argparse
+import atexit
+import datetime
+import glob
+import os
+import signal
+import threading
+import time
+import uuid
+from functools import lru_cache
+
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+from app_config import ANALYTICS_CONFIG
+from entity_tagging import get_entity_tagger
+from metrics import metrics
+from risk_scoring import get_scoring_engine
+
+SCHEMA = pa.schema([
+    ("run_id", pa.string()),
+    ("timestamp", pa.timestamp("ms", tz="UTC")),
+    ("query", pa.string()),
+    ("engine", pa.string()),
+    ("steps", pa.int16()),
+    ("tool_calls", pa.int16()),
+    ("latency_seconds", pa.float32()),
+    ("observation_tokens", pa.int32()),
+    ("context_tokens", pa.int32()),
+    ("risk_level", pa.string()),
+    ("confidence", pa.float32()),
+    ("sources", pa.int32()),
+    ("snippets", pa.int32()),
+    ("top_category", pa.string()),
+    ("categories", pa.list_(pa.string())),
+    ("regions", pa.list_(pa.string())),
+    ("ports", pa.list_(pa.string())),
+    ("chokepoints", pa.list_(pa.string())),
+    ("commodities", pa.list_(pa.string())),
+])
+
+
+def utc_today() -> datetime.date:
+    """Today's date in UTC, the clock partitions are named by."""
+    return datetime.datetime.now(datetime.timezone.utc).date()
+
+
+def _as_date(value) -> datetime.date:
+    """Accepts a date, a datetime or an ISO 'YYYY-MM-DD' string."""
+    if value is None or isinstance(value, datetime.date) and not isinstance(value, datetime.datetime):
+        return value
+    if isinstance(value, datetime.datetime):
+        return value.date()
+    return datetime.date.fromisoformat(value)
+
+
+class AnalyticsStore:
+    """
+    Buffers run rows and appends them to date-partitioned Parquet files.
+
+    Queries see both the files on disk and the rows still buffered in this
+    process. The store is safe to share between threads; separate processes
+    may write to the same directory since every flush creates a new file,
+    and a lock file keeps two processes from compacting the same partition.
+    """
+
+    def __init__(self, root: str = None, flush_rows: int = None, flush_interval: float = None,
+                 compact_files: int = None):
+        """
+        Args:
+            root (str): Directory holding the partitions. Relative paths are
+                resolved against the application directory.
+            flush_rows (int): Buffered rows that trigger a write.
+            flush_interval (float): Seconds after which buffered rows are
+                written on the next append, however few there are.
+            compact_files (int): Files in today's partition that trigger a merge.
+        """
+        root = root or ANALYTICS_CONFIG["path"]
+        if not os.path.isabs(root):
+            root = os.path.join(os.path.dirname(__file__), root)
+        self.root = root
+        self.flush_rows = flush_rows or ANALYTICS_CONFIG["flush_rows"]
+        self.flush_interval = flush_interval or ANALYTICS_CONFIG["flush_interval"]
+        self.compact_files = compact_files or ANALYTICS_CONFIG["compact_files"]
+        # Guards the buffer only; files are written outside it. Reentrant, as
+        # the SIGTERM handler may interrupt a thread that holds it.
+        self._lock = threading.RLock()
+        self._buffer = []
+        self._last_flush = time.monotonic()
+        self._flushing = set()          # ids of the threads inside `flush`
+        self._terminating = None        # a SIGTERM deferred until the interrupted flush is done
+        atexit.register(self.flush)
+        self._flush_on_sigterm()
+
+    def record(self, run_record: dict, latency: float = None, engine: str = None) -> dict:
+        """
+        Scores, tags and appends one agent run.
+
+        Args:
+            run_record (dict): The record returned by `SupplyChainAnalystAgent.analyze`.
+            latency (float): Wall-clock seconds the run took.
+            engine (str): The reasoning engine that produced it.
+
+        Returns:
+            dict: The stored row.
+        """
+        observations = run_record["observations"]
+        report = get_scoring_engine().score_run(observations)
+        tags = get_entity_tagger().tag_observations(observations)
+        category_scores = {
+            category: score for category, score in report["category_scores"].items()
+            if score >= ANALYTICS_CONFIG["category_flag_score"]
+        }
+        categories = sorted(category_scores, key=lambda category: -category_scores[category])
+
+        row = {
+            "run_id": uuid.uuid4().hex,
+            "timestamp": datetime.datetime.now(datetime.timezone.utc),
+            "query": run_record["query"],
+            "engine": engine,
+            "steps": run_record["steps"],
+            "tool_calls": len(observations),
+            "latency_seconds": latency,
+            "observation_tokens": sum(obs.get("compression", {}).get("raw_tokens", 0) for obs in observations),
+            "context_tokens": sum(obs.get("compression", {}).get("tokens", 0) for obs in observations),
+            "risk_level": report["risk_level"],
+            "confidence": report["confidence_score"],
+            "sources": report["sources_analyzed"],
+            "snippets": report["snippets_analyzed"],
+            "top_category": categories[0] if categories else None,
+            "categories": categories,
+            "regions": tags["regions"],
+            "ports": sorted(tags["ports"]),
+            "chokepoints": sorted(tags["chokepoints"]),
+            "commodities": sorted(tags["commodities"]),
+        }
+        self.append([row])
+        return row
+
+    def append(self, rows: list):
+        """Buffers rows (dicts following `SCHEMA`), writing them once the batch is due."""
+        with self._lock:
+            self._buffer.extend(rows)
+            metrics.increment("analytics.rows", len(rows))
+            due = (
+                len(self._buffer) >= self.flush_rows
+                or time.monotonic() - self._last_flush >= self.flush_interval
+            )
+        if due:
+            self.flush()
+
+    def flush(self):
+        """
+        Writes the buffered rows, one new file per date partition.
+
+        Afterwards, today's partition is merged into one file once it holds
+        `compact_files` files, and any earlier partition as soon as it holds
+        two, so queries never have to open more than a few files per day.
+        This is file I/O; async callers should run it in a thread.
+        """
+        thread = threading.get_ident()
+        self._flushing.add(thread)
+        try:
+            with self._lock:
+                rows, self._buffer = self._buffer, []
+                self._last_flush = time.monotonic()
+            if not rows:
+                return
+            by_date = {}
+            for row in rows:
+                by_date.setdefault(row["timestamp"].date().isoformat(), []).append(row)
+            for date, date_rows in by_date.items():
+                self._write(date, pa.Table.from_pylist(date_rows, schema=SCHEMA))
+            metrics.increment("analytics.flushes")
+
+            today = utc_today().isoformat()
+            for partition in self._partitions():
+                date = partition.split("=", 1)[1]
+                if len(self._files(partition)) >= (self.compact_files if date >= today else 2):
+                    self._compact_partition(date)
+        finally:
+            self._flushing.discard(thread)
+        if self._terminating is not None and thread == threading.main_thread().ident:
+            signum, self._terminating = self._terminating, None
+            self.flush()
+            self._reraise(signum)
+
+    def load(self, start=None, end=None, columns: list = None) -> pa.Table:
+        """
+        Reads the runs between two dates (inclusive), including buffered rows.
+
+        Only the partitions in range are opened and only `columns` are read.
+
+        Args:
+            start: First date (date, datetime or 'YYYY-MM-DD'); None for no lower bound.
+            end: Last date; None for no upper bound.
+            columns (list): Columns to read; all of `SCHEMA` by default.
+
+        Returns:
+            pa.Table: The matching rows.
+        """
+        start, end = _as_date(start), _as_date(end)
+        columns = columns or SCHEMA.names
+        schema = pa.schema([SCHEMA.field(name) for name in columns])
+
+        tables = []
+        for attempt in range(3):
+            files = []
+            for partition in self._partitions():
+                date = datetime.date.fromisoformat(partition.split("=", 1)[1])
+                if (start is None or date >= start) and (end is None or date <= end):
+                    files.extend(self._files(partition))
+            try:
+                tables = [ds.dataset(files, schema=SCHEMA, format="parquet").to_table(columns=columns)] if files else []
+                break
+            except FileNotFoundError:
+                # Another process compacted a partition while we were listing it.
+                if attempt == 2:
+                    raise
+
+        with self._lock:
+            buffered = [
+                row for row in self._buffer
+                if (start is None or row["timestamp"].date() >= start)
+                and (end is None or row["timestamp"].date() <= end)
+            ]
+        if buffered:
+            tables.append(pa.Table.from_pylist(buffered, schema=SCHEMA).select(columns))
+        return pa.concat_tables(tables) if tables else schema.empty_table()
+
+    def summary(self, start=None, end=None) -> dict:
+        """
+        Headline numbers for a date range.
+
+        Returns:
+            dict: 'runs', 'risk_levels' (count per level), 'avg_confidence',
+                'latency_p50' and 'latency_p95' (seconds), 'avg_sources' and
+                'context_tokens_saved' (tokens removed by observation compression).
+        """
+        table = self.load(start, end, [
+            "risk_level", "confidence", "latency_seconds", "sources", "observation_tokens", "context_tokens"
+        ])
+        if table.num_rows == 0:
+            return {"runs": 0, "risk_levels": {}, "avg_confidence": None, "latency_p50": None,
+                    "latency_p95": None, "avg_sources": None, "context_tokens_saved": 0}
+        latency_p50, latency_p95 = pc.quantile(table["latency_seconds"], q=[0.5, 0.95]).to_pylist()
+        return {
+            "runs": table.num_rows,
+            "risk_levels": self._counts(table["risk_level"]),
+            "avg_confidence": pc.mean(table["confidence"]).as_py(),
+            "latency_p50": latency_p50,
+            "latency_p95": latency_p95,
+            "avg_sources": pc.mean(table["sources"]).as_py(),
+            "context_tokens_saved": (
+                pc.sum(table["observation_tokens"]).as_py() or 0) - (pc.sum(table["context_tokens"]).as_py() or 0),
+        }
+
+    def top_values(self, column: str, start=None, end=None, limit: int = 10) -> list:
+        """
+        The most frequent values of a column, e.g. the regions flagged most often.
+
+        List columns ('categories', 'regions', 'ports', 'chokepoints',
+        'commodities') count every run a value appears in.
+
+        Returns:
+            list: (value, count) tuples, most frequent first.
+        """
+        values = self.load(start, end, [column])[column]
+        if pa.types.is_list(values.type):
+            values = pc.list_flatten(values)
+        counts = self._counts(values)
+        return sorted(counts.items(), key=lambda item: (-item[1], item[0]))[:limit]
+
+    def daily(self, start=None, end=None) -> list:
+        """
+        Per-day aggregates.
+
+        Returns:
+            list: One dict per day with runs: 'date', 'runs', 'high_risk_runs'
+                and 'avg_latency', oldest first.
+        """
+        table = self.load(start, end, ["timestamp", "risk_level", "latency_seconds"])
+        if table.num_rows == 0:
+            return []
+        table = table.append_column("date", pc.cast(table["timestamp"], pa.date32()))
+        table = table.append_column("high_risk", pc.cast(pc.equal(table["risk_level"], "High"), pa.int32()))
+        grouped = table.group_by("date").aggregate([
+            ("date", "count"), ("high_risk", "sum"), ("latency_seconds", "mean")
+        ]).sort_by("date")
+        return [
+            {"date": row["date"], "runs": row["date_count"], "high_risk_runs": row["high_risk_sum"],
+             "avg_latency": row["latency_seconds_mean"]}
+            for row in grouped.to_pylist()
+        ]
+
+    def compact(self, before=None) -> int:
+        """
+        Merges each partition's files into a single file.
+
+        Flushes already do this as partitions grow; this forces it for every
+        partition. Today's partition is skipped unless `before` says
+        otherwise, since it is still growing.
+
+        Args:
+            before: Only partitions strictly before this date are compacted.
+                Defaults to today.
+
+        Returns:
+            int: The number of partitions compacted.
+        """
+        self.flush()
+        before = _as_date(before) or utc_today()
+        compacted = 0
+        for partition in self._partitions():
+            date = partition.split("=", 1)[1]
+            if datetime.date.fromisoformat(date) < before and self._compact_partition(date):
+                compacted += 1
+        return compacted
+
+    def _compact_partition(self, date: str) -> bool:
+        """
+        Merges a partition's files into one, unless another process is already at it.
+
+        The merged file is published before the old files are removed, so a
+        reader never misses rows (it may briefly count a few twice).
+
+        Returns:
+            bool: Whether the partition was compacted.
+        """
+        directory = os.path.join(self.root, f"date={date}")
+        lock_path = os.path.join(directory, ".compacting")
+        try:
+            os.close(os.open(lock_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+        except FileExistsError:
+            try:
+                # A lock left behind by a crashed process expires.
+                if time.time() - os.path.getmtime(lock_path) > ANALYTICS_CONFIG["compact_lock_timeout"]:
+                    os.remove(lock_path)
+            except FileNotFoundError:
+                pass
+            return False
+
+        try:
+            files = self._files(f"date={date}")
+            if len(files) < 2:
+                return False
+            table = ds.dataset(files, schema=SCHEMA, format="parquet").to_table().sort_by("timestamp")
+            self._write(date, table)
+            for path in files:
+                os.remove(path)
+        finally:
+            os.remove(lock_path)
+        metrics.increment("analytics.compactions")
+        return True
+
+    def _flush_on_sigterm(self):
+        """
+        Flushes before the process is terminated, since atexit does not run on SIGTERM.
+
+        Only installed from the main thread and only over the default
+        handler: servers and the worker fleet handle SIGTERM themselves and
+        shut down cleanly, which runs the atexit flush or their own.
+        """
+        if threading.current_thread() is not threading.main_thread():
+            return
+        if signal.getsignal(signal.SIGTERM) is not signal.SIG_DFL:
+            return
+
+        def handle_sigterm(signum, frame):
+            if threading.get_ident() in self._flushing:
+                # The signal interrupted a flush on this thread; flushing again
+                # here would race it, so it finishes and re-raises the signal.
+                self._terminating = signum
+                return
+            self.flush()
+            self._reraise(signum)
+
+        signal.signal(signal.SIGTERM, handle_sigterm)
+
+    @staticmethod
+    def _reraise(signum: int):
+        """Terminates the process with a signal, as its default handler would."""
+        signal.signal(signum, signal.SIG_DFL)
+        os.kill(os.getpid(), signum)
+
+    def _files(self, partition: str) -> list:
+        """The data files of a 'date=YYYY-MM-DD' partition."""
+        return sorted(glob.glob(os.path.join(self.root, partition, "*.parquet")))
+
+    def _partitions(self) -> list:
+        """The 'date=YYYY-MM-DD' directory names, oldest first."""
+        if not os.path.isdir(self.root):
+            return []
+        return sorted(name for name in os.listdir(self.root) if name.startswith("date="))
+
+    def _write(self, date: str, table: pa.Table):
+        """Writes a table as a new file in a date partition, atomically."""
+        directory = os.path.join(self.root, f"date={date}")
+        os.makedirs(directory, exist_ok=True)
+        name = f"part-{time.time_ns()}-{os.getpid()}-{uuid.uuid4().hex[:8]}.parquet"
+        # Readers only pick up *.parquet, so a half-written file is never seen.
+        temporary_path = os.path.join(directory, f".{name}.tmp")
+        pq.write_table(table, temporary_path, compression="zstd")
+        os.replace(temporary_path, os.path.join(directory, name))
+
+    @staticmethod
+    def _counts(values) -> dict:
+        """Counts the non-null values of an array."""
+        return {
+            item["values"]: item["counts"]
+            for item in pc.value_counts(values).to_pylist() if item["values"] is not None
+        }
+
+
+@lru_cache(maxsize=None)
+def get_analytics_store() -> AnalyticsStore:
+    """Returns the shared analytics store."""
+    return AnalyticsStore()
+
+
+def main():
+    """Command line entry point for inspecting and compacting the store."""
+    parser = argparse.ArgumentParser(description="Supply Chain Risk Analyst AI - analytics store")
+    parser.add_argument("--path", default=ANALYTICS_CONFIG["path"], help="Analytics store directory")
+    commands = parser.add_subparsers(dest="command", required=True)
+    summary_parser = commands.add_parser("summary", help="Aggregate recent analyses")
+    summary_parser.add_argument("--days", type=int, default=30)
+    commands.add_parser("compact", help="Merge each past day's files into one (flushes also do this)")
+    args = parser.parse_args()
+
+    store = AnalyticsStore(args.path)
+    if args.command == "compact":
+        print(f"Compacted {store.compact()} partition(s).")
+        return
+
+    start = utc_today() - datetime.timedelta(days=args.days - 1)
+    started = time.perf_counter()
+    summary = store.summary(start)
+    regions = store.top_values("regions", start)
+    categories = store.top_values("categories", start)
+    elapsed = time.perf_counter() - started
+    print(f"Last {args.days} days: {summary['runs']} analyses (aggregated in {elapsed * 1000:.0f} ms)")
+    if summary["runs"]:
+        print(f"  Risk levels: {summary['risk_levels']}")
+        print(f"  Latency p50 {summary['latency_p50']:.1f}s, p95 {summary['latency_p95']:.1f}s")
+        print(f"  Most flagged regions: {', '.join(f'{name} ({count})' for name, count in regions)}")
+        print(f"  Most flagged categories: {', '.join(f'{name} ({count})' for name, count in categories)}")
+
+
+if __name__ == "__main__":
+    main()
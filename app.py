@@ -1,10 +1,19 @@
 import streamlit as st
 import asyncio
 from agent import SupplyChainAnalystAgent
+from analytics_store import get_analytics_store, utc_today
+from app_config import APP_CONFIG, HISTORY_CONFIG, RISK_CATEGORIES, THEME_CONFIG
+from cancellation import CancellationToken
 from config import load_config
+from entity_tagging import get_entity_tagger
+from history_store import SessionHistoryStore
+from metrics import metrics
+from risk_scoring import get_scoring_engine
+from session_memory import SessionMemory
 import time
 import json
-from datetime import datetime
+import uuid
+from datetime import datetime, timedelta
 import plotly.graph_objects as go
 import plotly.express as px
 from typing import List, Dict, Any
@@ -212,8 +221,9 @@ class StreamlitSupplyChainAgent:
         
         st.markdown('</div>', unsafe_allow_html=True)
     
-    async def run_with_thinking_steps(self, query: str) -> str:
-        """Run the agent with thinking steps visualization"""
+    async def run_with_thinking_steps(self, query: str, cancel_token: CancellationToken = None,
+                                      memory: SessionMemory = None) -> dict:
+        """Run the agent with thinking steps visualization and return its run record"""
         self.thinking_steps = []
         
         # Step 1: Query Analysis
@@ -247,7 +257,7 @@ class StreamlitSupplyChainAgent:
         )
         
         # Run the actual agent
-        result = await self.agent.run(query)
+        run_record = await self.agent.analyze(query, cancel_token=cancel_token, memory=memory)
         
         # Final step
         self.add_thinking_step(
@@ -256,59 +266,121 @@ class StreamlitSupplyChainAgent:
             "complete"
         )
         
-        return result
+        return run_record
 
-def create_metrics_dashboard(result: str):
-    """Create a metrics dashboard based on the analysis result"""
+async def run_until_interrupted(work, cancel_token: CancellationToken, status) -> dict:
+    """
+    Run an analysis while watching for the Stop button or a rerun.
+
+    Streamlit only delivers stop and rerun requests inside `st` calls, which a
+    running analysis never makes. Updating the `status` placeholder every
+    `stop_check_interval` seconds gives Streamlit that chance; its control
+    exception then cancels the analysis, so the model and search requests
+    stop instead of running to completion for an answer nobody will see.
+    """
+    task = asyncio.ensure_future(work)
+    started = time.monotonic()
+    try:
+        while not task.done():
+            await asyncio.wait({task}, timeout=APP_CONFIG["stop_check_interval"])
+            if not task.done():
+                status.caption(f"⏳ Analyzing for {time.monotonic() - started:.0f}s. Press Stop to cancel.")
+    except BaseException:
+        # Stop, rerun or shutdown: abort the run and let it unwind before leaving
+        cancel_token.cancel("the analysis was stopped or replaced by a new request")
+        await asyncio.gather(task, return_exceptions=True)
+        raise
+    status.empty()
+    return task.result()
+
+def build_risk_report(run_record: dict) -> tuple:
+    """Score and tag the observations of an agent run for the analytics dashboard"""
+    report = get_scoring_engine().score_run(run_record["observations"])
+    tags = get_entity_tagger().tag_observations(run_record["observations"])
+    report["regions_affected"] = len(tags["regions"])
+    return report, tags
+
+def create_entity_summary(tags: dict):
+    """Show the regions, ports, chokepoints and commodities tagged in the latest analysis"""
+    labels = {
+        "regions": "🌍 Regions",
+        "ports": "⚓ Ports",
+        "chokepoints": "🚢 Chokepoints",
+        "commodities": "📦 Commodities"
+    }
+    lines = []
+    for key, label in labels.items():
+        names = tags[key] if key == "regions" else sorted(tags[key], key=lambda name: -tags[key][name])
+        if names:
+            lines.append(f"**{label}:** {', '.join(names[:8])}")
+    if lines:
+        st.markdown("  \n".join(lines))
+
+def create_metrics_dashboard(report: dict):
+    """Create a metrics dashboard based on the risk report of the latest analysis"""
     col1, col2, col3, col4 = st.columns(4)
     
+    level_colors = {
+        "High": THEME_CONFIG["danger_color"],
+        "Medium": THEME_CONFIG["accent_color"],
+        "Low": THEME_CONFIG["success_color"]
+    }
+    risk_level = report["risk_level"]
+    
     with col1:
-        st.markdown("""
+        st.markdown(f"""
         <div class="metric-card">
             <h3 style="color: #667eea; margin-bottom: 0.5rem;">Risk Level</h3>
-            <h2 style="color: #e74c3c; margin: 0;">Medium</h2>
+            <h2 style="color: {level_colors.get(risk_level, THEME_CONFIG["muted_color"])}; margin: 0;">{risk_level}</h2>
             <p style="color: #7f8c8d; font-size: 0.9em;">Based on current data</p>
         </div>
         """, unsafe_allow_html=True)
     
     with col2:
-        st.markdown("""
+        st.markdown(f"""
         <div class="metric-card">
             <h3 style="color: #667eea; margin-bottom: 0.5rem;">Sources</h3>
-            <h2 style="color: #27ae60; margin: 0;">12</h2>
+            <h2 style="color: #27ae60; margin: 0;">{report["sources_analyzed"]}</h2>
             <p style="color: #7f8c8d; font-size: 0.9em;">News & Reports</p>
         </div>
         """, unsafe_allow_html=True)
     
     with col3:
-        st.markdown("""
+        st.markdown(f"""
         <div class="metric-card">
             <h3 style="color: #667eea; margin-bottom: 0.5rem;">Regions</h3>
-            <h2 style="color: #f39c12; margin: 0;">5</h2>
+            <h2 style="color: #f39c12; margin: 0;">{report["regions_affected"]}</h2>
             <p style="color: #7f8c8d; font-size: 0.9em;">Affected areas</p>
         </div>
         """, unsafe_allow_html=True)
     
     with col4:
-        st.markdown("""
+        st.markdown(f"""
         <div class="metric-card">
             <h3 style="color: #667eea; margin-bottom: 0.5rem;">Confidence</h3>
-            <h2 style="color: #3498db; margin: 0;">85%</h2>
-            <p style="color: #7f8c8d; font-size: 0.9em;">Analysis accuracy</p>
+            <h2 style="color: #3498db; margin: 0;">{report["confidence_score"]}%</h2>
+            <p style="color: #7f8c8d; font-size: 0.9em;">Evidence coverage</p>
         </div>
         """, unsafe_allow_html=True)
 
-def create_risk_visualization():
-    """Create risk visualization charts"""
-    # Sample data for demonstration
-    risk_categories = ['Geopolitical', 'Weather', 'Economic', 'Infrastructure', 'Regulatory']
-    risk_levels = [75, 60, 45, 30, 55]
+def create_risk_visualization(report: dict):
+    """Create risk visualization charts from the category scores of a risk report"""
+    category_scores = report["category_scores"]
+    risk_categories = [category for category in RISK_CATEGORIES if category in category_scores]
+    risk_levels = [category_scores[category] for category in risk_categories]
+    
+    def bar_color(score):
+        if score >= 60:
+            return THEME_CONFIG["danger_color"]
+        if score >= 30:
+            return THEME_CONFIG["accent_color"]
+        return THEME_CONFIG["success_color"]
     
     fig = go.Figure(data=[
         go.Bar(
             x=risk_categories,
             y=risk_levels,
-            marker_color=['#e74c3c', '#f39c12', '#f1c40f', '#27ae60', '#3498db']
+            marker_color=[bar_color(score) for score in risk_levels]
         )
     ])
     
@@ -316,6 +388,7 @@ def create_risk_visualization():
         title="Supply Chain Risk Assessment by Category",
         xaxis_title="Risk Categories",
         yaxis_title="Risk Level (%)",
+        yaxis_range=[0, 100],
         plot_bgcolor='rgba(0,0,0,0)',
         paper_bgcolor='rgba(0,0,0,0)',
         font=dict(family="Inter", size=12),
@@ -324,22 +397,90 @@ def create_risk_visualization():
     
     st.plotly_chart(fig, use_container_width=True)
 
+def create_backend_health():
+    """Show search backend health: circuit breaker state, latency and hedging"""
+    snapshot = metrics.snapshot()
+    counters = snapshot["counters"]
+    breaker_state = snapshot["gauges"].get("search.breaker_state", "closed")
+    state_icons = {"closed": "🟢", "half_open": "🟡", "open": "🔴"}
+    st.markdown(f"**Circuit breaker:** {state_icons.get(breaker_state, '⚪')} {breaker_state.replace('_', ' ')}")
+    
+    latency = snapshot["latencies"].get("search.attempt_latency")
+    if latency:
+        st.caption(f"Search latency p50 {latency['p50']:.2f}s · p95 {latency['p95']:.2f}s ({latency['count']} samples)")
+    st.caption(
+        f"Hedges fired {counters.get('search.hedges_fired', 0)} · won {counters.get('search.hedges_won', 0)} · "
+        f"served from cache {counters.get('search.served_from_cache', 0)} · "
+        f"failed fast {counters.get('search.failed_fast', 0)}"
+    )
+
+def create_history_dashboard(days: int):
+    """Aggregate every recorded analysis of the last `days` days (all sessions, UTC dates)"""
+    store = get_analytics_store()
+    start = utc_today() - timedelta(days=days - 1)
+    summary = store.summary(start)
+    if not summary["runs"]:
+        st.info("No analyses recorded in this period")
+        return
+    
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        st.metric("Analyses", summary["runs"])
+    with col2:
+        st.metric("High Risk", summary["risk_levels"].get("High", 0))
+    with col3:
+        st.metric("p95 Latency", f"{summary['latency_p95']:.1f}s" if summary["latency_p95"] is not None else "-")
+    
+    regions = store.top_values("regions", start, limit=8)
+    if regions:
+        names, counts = zip(*reversed(regions))
+        fig = go.Figure(data=[go.Bar(x=counts, y=names, orientation="h", marker_color=THEME_CONFIG["primary_color"])])
+        fig.update_layout(
+            title="Most Flagged Regions",
+            xaxis_title="Analyses",
+            height=320,
+            margin=dict(l=10, r=10, t=40, b=10),
+            plot_bgcolor='rgba(0,0,0,0)',
+            paper_bgcolor='rgba(0,0,0,0)',
+            font=dict(family="Inter", size=12)
+        )
+        st.plotly_chart(fig, use_container_width=True)
+    
+    categories = store.top_values("categories", start, limit=3)
+    if categories:
+        st.caption("Most flagged categories: " + " · ".join(f"{name} ({count})" for name, count in categories))
+
+@st.cache_resource
+def get_history_store() -> SessionHistoryStore:
+    """Chat history store shared by all sessions of this server process"""
+    return SessionHistoryStore()
+
 def initialize_session_state():
     """Initialize session state variables"""
-    if 'messages' not in st.session_state:
-        st.session_state.messages = []
+    if 'session_id' not in st.session_state:
+        st.session_state.session_id = uuid.uuid4().hex
+    if 'older_pages' not in st.session_state:
+        st.session_state.older_pages = 0
     if 'agent' not in st.session_state:
         st.session_state.agent = StreamlitSupplyChainAgent()
     if 'thinking_mode' not in st.session_state:
         st.session_state.thinking_mode = True
+    if 'memory' not in st.session_state:
+        # Evidence found earlier in this conversation, reused by follow-up questions
+        st.session_state.memory = SessionMemory()
 
 def main():
     """Main Streamlit application"""
     # Load configuration
     load_config()
     
+    # Build the shared gazetteer tagger once per server process
+    get_entity_tagger()
+    
     # Initialize session state
     initialize_session_state()
+    history = get_history_store()
+    session_id = st.session_state.session_id
     
     # Header
     st.markdown("""
@@ -357,12 +498,27 @@ def main():
         thinking_mode = st.toggle("Show Thinking Process", value=st.session_state.thinking_mode)
         st.session_state.thinking_mode = thinking_mode
         
+        engine_labels = {"react": "Step-by-step (ReAct)", "plan": "Fast (plan & execute)"}
+        analyst = st.session_state.agent.agent
+        analyst.engine = st.radio(
+            "Reasoning Engine",
+            options=list(engine_labels),
+            format_func=engine_labels.get,
+            index=list(engine_labels).index(analyst.engine),
+            help="Plan & execute runs all searches in parallel and needs only two model calls for most questions."
+        )
+        
         st.markdown("### 📊 Quick Stats")
-        st.metric("Total Queries", len(st.session_state.messages))
+        st.metric("Total Queries", history.count(session_id))
         st.metric("Session Duration", "15 mins")
         
+        st.markdown("### 🩺 Search Backend")
+        create_backend_health()
+        
         if st.button("🗑️ Clear Chat History"):
-            st.session_state.messages = []
+            history.clear(session_id)
+            st.session_state.older_pages = 0
+            st.session_state.memory = SessionMemory()
             st.rerun()
         
         st.markdown("### 🔍 Sample Queries")
@@ -386,8 +542,21 @@ def main():
     with col1:
         st.markdown("### 💬 Chat Interface")
         
-        # Display chat history
-        for message in st.session_state.messages:
+        # Display chat history: the recent window comes from memory, earlier
+        # messages are read from disk one page at a time on request
+        recent_messages = history.recent(session_id)
+        first_seq = recent_messages[0][0] if recent_messages else 0
+        older_messages = []
+        if st.session_state.older_pages:
+            older_messages = history.load_older(
+                session_id, first_seq, st.session_state.older_pages * HISTORY_CONFIG["page_size"]
+            )
+        oldest_shown = older_messages[0][0] if older_messages else first_seq
+        if oldest_shown > 0 and st.button("⬆️ Load earlier messages"):
+            st.session_state.older_pages += 1
+            st.rerun()
+        
+        for _, message in older_messages + recent_messages:
             with st.chat_message(message["role"]):
                 st.markdown(message["content"])
         
@@ -401,29 +570,47 @@ def main():
             delattr(st.session_state, 'current_query')
             
             # Add user message
-            st.session_state.messages.append({"role": "user", "content": query})
+            history.append(session_id, {"role": "user", "content": query})
             with st.chat_message("user"):
                 st.markdown(query)
             
             # Process query
             with st.chat_message("assistant"):
                 with st.spinner("Analyzing supply chain risks..."):
-                    if st.session_state.thinking_mode:
-                        thinking_placeholder = st.empty()
-                        
-                        # Show thinking process
-                        async def run_analysis():
-                            result = await st.session_state.agent.run_with_thinking_steps(query)
-                            return result
-                        
-                        # Run the analysis
-                        result = asyncio.run(run_analysis())
-                        
-                        # Display thinking steps
-                        with thinking_placeholder.container():
-                            st.session_state.agent.display_thinking_steps()
-                    else:
-                        result = asyncio.run(st.session_state.agent.agent.run(query))
+                    cancel_token = CancellationToken()
+                    status = st.empty()
+                    try:
+                        if st.session_state.thinking_mode:
+                            thinking_placeholder = st.empty()
+                            
+                            # Show thinking process
+                            async def run_analysis():
+                                run_record = await st.session_state.agent.run_with_thinking_steps(
+                                    query, cancel_token, st.session_state.memory
+                                )
+                                return run_record
+                            
+                            # Run the analysis
+                            run_record = asyncio.run(run_until_interrupted(run_analysis(), cancel_token, status))
+                            
+                            # Display thinking steps
+                            with thinking_placeholder.container():
+                                st.session_state.agent.display_thinking_steps()
+                        else:
+                            run_record = asyncio.run(run_until_interrupted(
+                                st.session_state.agent.agent.analyze(
+                                    query, cancel_token=cancel_token, memory=st.session_state.memory
+                                ),
+                                cancel_token, status
+                            ))
+                    except BaseException:
+                        # Keep the conversation readable after a stopped analysis
+                        if cancel_token.cancelled:
+                            history.append(session_id, {"role": "assistant", "content": "_Analysis cancelled._"})
+                        raise
+                    
+                    result = run_record["answer"]
+                    report, tags = build_risk_report(run_record)
                     
                     # Display result
                     st.markdown(f"""
@@ -436,23 +623,36 @@ def main():
                     """, unsafe_allow_html=True)
                     
                     # Add assistant message
-                    st.session_state.messages.append({"role": "assistant", "content": result})
+                    history.append(
+                        session_id,
+                        {"role": "assistant", "content": result, "report": report, "tags": tags}
+                    )
     
     with col2:
         st.markdown("### 📈 Analytics Dashboard")
         
-        # Metrics dashboard
-        if st.session_state.messages:
-            create_metrics_dashboard(st.session_state.messages[-1]["content"] if st.session_state.messages else "")
+        # Metrics dashboard for the most recent analysis
+        recent_messages = [message for _, message in history.recent(session_id)]
+        latest_analysis = next(
+            (msg for msg in reversed(recent_messages) if msg.get("report")),
+            None
+        )
+        latest_report = latest_analysis["report"] if latest_analysis else None
+        if latest_report:
+            create_metrics_dashboard(latest_report)
+            create_entity_summary(latest_analysis["tags"])
         
         # Risk visualization
         st.markdown("### 🎯 Risk Visualization")
-        create_risk_visualization()
+        if latest_report:
+            create_risk_visualization(latest_report)
+        else:
+            st.info("Run an analysis to see risk scores by category")
         
         # Recent activity
         st.markdown("### 🕐 Recent Activity")
-        if st.session_state.messages:
-            for i, msg in enumerate(st.session_state.messages[-3:]):
+        if recent_messages:
+            for i, msg in enumerate(recent_messages[-3:]):
                 role_icon = "👤" if msg["role"] == "user" else "🤖"
                 st.markdown(f"""
                 <div class="chat-message">
@@ -462,6 +662,16 @@ def main():
                 """, unsafe_allow_html=True)
         else:
             st.info("No recent activity")
+        
+        # Aggregates over every recorded analysis, not just this session
+        st.markdown("### 🗂️ Analysis History")
+        history_days = st.selectbox(
+            "Period",
+            options=[7, 30, 90],
+            index=1,
+            format_func=lambda days: f"Last {days} days"
+        )
+        create_history_dashboard(history_days)
 
 if __name__ == "__main__":
     main()
@@ -22,7 +22,9 @@ APP_CONFIG = {
     "subtitle": "Advanced AI-powered supply chain risk assessment and intelligence platform",
     "icon": "🔗",
     "layout": "wide",
-    "initial_sidebar_state": "expanded"
+    "initial_sidebar_state": "expanded",
+    # Seconds between checks for the Stop button while an analysis runs
+    "stop_check_interval": 0.5
 }
 
 # Thinking steps configuration
@@ -57,6 +59,58 @@ RISK_CATEGORIES = [
     "Environmental"
 ]
 
+# Keyword lexicons used to score observations against each risk category.
+# Terms are matched on lowercase word boundaries and may be one or two words long.
+RISK_LEXICONS = {
+    "Geopolitical": [
+        "geopolitical", "sanctions", "sanction", "tariff", "tariffs", "war", "conflict",
+        "military", "embargo", "export controls", "trade war", "tensions", "blockade",
+        "invasion", "diplomatic", "retaliation", "trade restrictions", "houthi",
+    ],
+    "Weather & Natural Disasters": [
+        "typhoon", "hurricane", "cyclone", "earthquake", "flood", "flooding", "drought",
+        "wildfire", "storm", "tsunami", "heatwave", "extreme weather", "el nino",
+        "la nina", "snowstorm", "landslide", "natural disaster", "low water",
+    ],
+    "Economic & Financial": [
+        "inflation", "recession", "interest rates", "currency", "exchange rate",
+        "bankruptcy", "insolvency", "demand", "prices", "price", "costs", "freight rates",
+        "shortage", "shortages", "credit", "commodity prices", "volatility", "debt",
+    ],
+    "Infrastructure": [
+        "port", "ports", "congestion", "canal", "rail", "railway", "bridge", "terminal",
+        "power outage", "blackout", "grid", "pipeline", "warehouse", "capacity",
+        "container", "containers", "backlog", "closure", "road", "airport",
+    ],
+    "Regulatory & Legal": [
+        "regulation", "regulations", "regulatory", "compliance", "law", "legislation",
+        "lawsuit", "court", "ban", "customs", "antitrust", "license", "licence",
+        "due diligence", "reporting requirements", "audit", "fine", "penalty",
+    ],
+    "Cybersecurity": [
+        "cyber", "cyberattack", "cybersecurity", "ransomware", "malware", "hack",
+        "hacked", "breach", "data breach", "phishing", "vulnerability", "outage",
+        "it systems", "ddos", "exploit", "threat actors",
+    ],
+    "Labor & Social": [
+        "strike", "strikes", "labor", "labour", "union", "unions", "workers",
+        "walkout", "protest", "protests", "labor shortage", "wages", "layoffs",
+        "forced labor", "human rights", "unrest", "workforce",
+    ],
+    "Environmental": [
+        "emissions", "carbon", "pollution", "climate", "climate change", "environmental",
+        "sustainability", "deforestation", "spill", "water scarcity", "esg",
+        "decarbonization", "waste", "contamination", "biodiversity",
+    ],
+}
+
+# Thresholds (0-100 category score) used to label the overall risk level
+RISK_LEVEL_THRESHOLDS = {
+    "High": 60,
+    "Medium": 30,
+    "Low": 0
+}
+
 # Default metrics for dashboard
 DEFAULT_METRICS = {
     "risk_level": "Medium",
@@ -73,6 +127,139 @@ API_CONFIG = {
     "timeout": 30
 }
 
+# Search backend (Tavily) resilience settings
+SEARCH_CONFIG = {
+    "url": "https://api.tavily.com/search",
+    "request_timeout": 20,            # seconds per attempt
+    "hedge_percentile": 95,           # fire a second attempt after this latency percentile
+    "hedge_min_samples": 20,          # latency samples needed before the percentile is trusted
+    "hedge_default_delay": 3.0,       # seconds, used until enough samples exist
+    "hedge_min_delay": 0.5,
+    "hedge_max_delay": 8.0,
+    "breaker_failure_threshold": 5,   # consecutive failures that open the circuit
+    "breaker_recovery_timeout": 30,   # seconds before a probe request is allowed
+    "breaker_probe_timeout": 60,      # seconds after which an unanswered probe is given up on
+    "cache_size": 256,                # recent results kept to serve while the circuit is open
+    "cache_ttl": 1800                 # seconds a cached result may be served
+}
+
+# Full-article fetching (ArticleFetchTool in tools.py)
+FETCH_CONFIG = {
+    "max_urls": 5,                     # URLs fetched per call
+    "max_connections": 10,             # pooled connections per call
+    "per_host_limit": 2,               # concurrent requests to one host
+    "connect_timeout": 5,              # seconds
+    "article_timeout": 8,              # seconds per article; text received so far is kept
+    "max_bytes": 1_000_000,            # bytes read per article; the rest is never downloaded
+    "max_chars": 6000,                 # extracted characters kept per article
+    "min_block_chars": 40,             # shorter text blocks (menus, captions) are dropped
+    "max_redirects": 5,                # each hop's host is checked before it is requested
+    "user_agent": "Mozilla/5.0 (compatible; SupplyChainRiskAnalyst/1.0)"
+}
+
+# Adaptive search depth and result-count policy
+SEARCH_POLICY_CONFIG = {
+    "default_max_results": 5,          # used when the caller passes no token budget
+    "min_results": 2,
+    "max_results_cap": 6,
+    "default_tokens_per_result": {"basic": 150, "advanced": 220},  # until measured
+    "escalate_below_results": 3,       # escalate to advanced depth with fewer basic results
+    "escalate_below_score": 0.5,       # ... or when the best relevance score is lower
+    # Per-tier outcomes for tuning, e.g. "search_outcomes-{pid}.jsonl"; None disables
+    "outcome_log_path": None,
+    "outcome_log_max_bytes": 10_000_000,  # the log is rotated at this size
+    "outcome_log_backups": 3              # rotated files kept
+}
+
+# Tool registry (see tool_registry.py). Tools are referenced as "module:Class" and
+# constructed on first use; an entry may override the limits the tool class declares
+# ("max_concurrency", "timeout", "cacheable", "cost_class"). Installed packages can
+# contribute more tools through the entry point group.
+TOOL_CONFIG = {
+    "tools": [
+        {"factory": "tools:SupplyChainNewsSearchTool"},
+        {"factory": "tools:ArticleFetchTool"}
+    ],
+    "entry_point_group": "supply_chain_analyst.tools",
+    "cost_class_limits": {"cheap": None, "standard": 8, "expensive": 2},  # concurrent calls per class; None = unlimited
+    "cache_size": 256,                 # results kept per cacheable tool
+    "cache_ttl": 600                   # seconds a cached tool result is reused
+}
+
+# Extractive compression of search observations before they reach the LLM
+COMPRESSION_CONFIG = {
+    "enabled": True,
+    "observation_token_budget": 600,   # upper bound per observation; the step budget may lower it
+    "min_sentence_chars": 20           # shorter snippet fragments are treated as noise
+}
+
+# Per-session evidence memory for follow-up questions (see session_memory.py)
+MEMORY_CONFIG = {
+    "enabled": True,
+    "max_results": 200,                # search results remembered per session
+    "max_age": 1800,                   # seconds before remembered evidence is searched again
+    "recall_results": 8,               # prior results a follow-up question is seeded with
+    "recall_token_budget": 1200,       # prompt tokens the seeded evidence may take
+    "recall_answers": 2,               # earlier answers included with the evidence
+    "max_answer_chars": 1200,          # earlier answers are cut to this length
+    "reuse_similarity": 0.8,           # word overlap at which a search counts as a repeat
+    "max_session_bytes": 2 * 1024 * 1024,   # memory cap for one session's evidence
+    "max_total_bytes": 64 * 1024 * 1024     # memory cap across all sessions
+}
+
+# Agent reasoning loop settings
+AGENT_CONFIG = {
+    "context_token_budget": 8000,      # prompt tokens one run may grow to; split across steps
+    "engine": "react",                 # "react" (think/search loop) or "plan" (plan-and-execute)
+    "plan_max_queries": 6,             # searches per planning or follow-up round
+    "plan_follow_up_rounds": 1         # extra research rounds the synthesis step may request
+}
+
+# Interactive command line (see main.py)
+CLI_CONFIG = {
+    "max_concurrent_queries": 3,       # background analyses running at once; more are queued
+    "show_progress": True              # stream each job's steps while it runs
+}
+
+# Background worker fleet and its durable job queue (see worker.py)
+WORKER_CONFIG = {
+    "db_path": "jobs.db",
+    "workers": None,                   # worker processes; None uses one per CPU core
+    "concurrency": 2,                  # jobs each worker process runs at once
+    "lease_seconds": 120,              # a job is handed to another worker if not heartbeated for this long
+    "heartbeat_interval": 30,          # seconds between lease renewals
+    "max_attempts": 3,
+    "retry_backoff": 10,               # seconds before the first retry; doubles per attempt
+    "poll_interval": 1.0               # seconds between queue polls when idle
+}
+
+# Watchlist monitoring (see watchlist.py)
+WATCHLIST_CONFIG = {
+    "db_path": "watchlist.db",
+    "refresh_concurrency": 4,          # watchlist items refreshed at once
+    "max_new_evidence": 15             # new results passed to one update call
+}
+
+# Columnar store of past analyses (see analytics_store.py)
+ANALYTICS_CONFIG = {
+    "enabled": True,
+    "path": "analytics",               # Parquet files partitioned by date
+    "flush_rows": 50,                  # buffered runs written per batch
+    "flush_interval": 60,              # seconds; older buffered runs are written on the next run
+    "compact_files": 8,                # files in today's partition that trigger a merge
+    "compact_lock_timeout": 300,       # seconds after which a stale compaction lock is ignored
+    "category_flag_score": 30          # category score at which a run counts as flagging it
+}
+
+# Chat history storage: messages live on disk, only a small window stays in memory
+HISTORY_CONFIG = {
+    "db_path": "history.db",
+    "window_size": 6,                     # recent messages kept in memory per session
+    "page_size": 10,                      # older messages loaded per "load earlier" click
+    "max_session_bytes": 256 * 1024,      # memory cap for one session's window
+    "max_total_bytes": 64 * 1024 * 1024   # memory cap across all sessions
+}
+
 # Streamlit specific configuration
 STREAMLIT_CONFIG = {
     "page_title": APP_CONFIG["title"],
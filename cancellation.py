@@ -0,0 +1,144 @@
+# cancellation.py
+# Structured cancellation for agent runs.
+# A CancellationToken is created per run by the front end (Streamlit, CLI,
+# worker) and handed to the agent. Cancelling it — from any thread — cancels the
+# asyncio tasks attached to it, so the in-flight OpenAI and search requests are
+# aborted right away (their httpx connections are closed as the cancellation
+# unwinds) instead of running to completion. The run then ends with
+# `RunCancelled`, and the work it wasted or saved is published to the metrics.
+
+import asyncio
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+
+from metrics import metrics
+
+
+class RunCancelled(Exception):
+    """Raised by an agent run whose cancellation token was cancelled."""
+
+    def __init__(self, reason: str, run_record: dict = None):
+        """
+        Args:
+            reason (str): Why the run was cancelled.
+            run_record (dict): What the run had gathered before it was cancelled.
+        """
+        super().__init__(reason)
+        self.reason = reason
+        self.run_record = run_record
+
+
+class CancellationToken:
+    """
+    A thread-safe cancellation signal shared by one run and the work it starts.
+
+    Tasks attach themselves with `attach()`; `cancel()` cancels every attached
+    task on its own event loop. The token also counts the LLM and tool calls of
+    the run, so a cancelled run can report how much work was thrown away.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._tasks = {}            # task -> (event loop, attach count)
+        self.reason = None
+        self.created_at = time.monotonic()
+        self.cancelled_at = None
+        self.completed = defaultdict(int)
+        self.aborted = defaultdict(int)
+
+    @property
+    def cancelled(self) -> bool:
+        """Whether `cancel` has been called."""
+        return self.cancelled_at is not None
+
+    def cancel(self, reason: str = "cancelled"):
+        """
+        Cancels the run. Safe to call from any thread, and more than once.
+
+        Args:
+            reason (str): Why the run is cancelled; shown to the user.
+        """
+        with self._lock:
+            if self.cancelled:
+                return
+            self.reason = reason
+            self.cancelled_at = time.monotonic()
+            tasks = list(self._tasks.items())
+        metrics.increment("cancellation.requests")
+        for task, (loop, _) in tasks:
+            if not loop.is_closed():
+                loop.call_soon_threadsafe(self._cancel_task, task)
+
+    def _cancel_task(self, task: asyncio.Task):
+        """Cancels a task on its own loop, unless it has detached in the meantime."""
+        with self._lock:
+            attached = task in self._tasks
+        if attached:
+            task.cancel()
+
+    def raise_if_cancelled(self, run_record: dict = None):
+        """Raises `RunCancelled` if the token was cancelled; call before starting new work."""
+        if self.cancelled:
+            raise RunCancelled(self.reason, run_record)
+
+    @contextmanager
+    def attach(self):
+        """
+        Ties the current task to the token for the duration of the block.
+
+        A cancellation of the token surfaces inside the block as
+        `RunCancelled` rather than `asyncio.CancelledError`; cancellations
+        from elsewhere propagate unchanged. Blocks may be nested.
+        """
+        task = asyncio.current_task()
+        with self._lock:
+            loop, count = self._tasks.get(task, (asyncio.get_running_loop(), 0))
+            self._tasks[task] = (loop, count + 1)
+        try:
+            self.raise_if_cancelled()
+            yield self
+        except asyncio.CancelledError:
+            if not self.cancelled:
+                raise
+            if hasattr(task, "uncancel"):
+                # Python 3.11+: the cancellation is handled here.
+                task.uncancel()
+            raise RunCancelled(self.reason) from None
+        finally:
+            with self._lock:
+                loop, count = self._tasks.pop(task)
+                if count > 1:
+                    self._tasks[task] = (loop, count - 1)
+
+    @contextmanager
+    def tracking(self, kind: str):
+        """Counts a call of the given kind ('llm' or 'tool') as completed or aborted."""
+        try:
+            yield
+        except asyncio.CancelledError:
+            self.aborted[kind] += 1
+            raise
+        self.completed[kind] += 1
+
+    def publish(self, saved_steps: int = 0):
+        """
+        Records the outcome of a cancelled run in the metrics.
+
+        Wasted work is the calls that completed or were cut short for an
+        answer nobody will see; saved work is the steps the run would still
+        have been allowed to take (an upper bound).
+
+        Args:
+            saved_steps (int): Steps the run did not get to.
+        """
+        metrics.increment("cancellation.runs")
+        for kind in ("llm", "tool"):
+            metrics.increment(f"cancellation.wasted_{kind}_calls", self.completed[kind])
+            metrics.increment(f"cancellation.aborted_{kind}_calls", self.aborted[kind])
+        metrics.increment("cancellation.saved_steps", max(0, saved_steps))
+        if self.cancelled:
+            metrics.observe("cancellation.wasted_seconds", self.cancelled_at - self.created_at)
+            # How long the run took to unwind after being cancelled.
+            metrics.observe("cancellation.cleanup_latency", time.monotonic() - self.cancelled_at)
@@ -0,0 +1,305 @@
+# cassette.py
+# Record/replay harness for the agent's external traffic.
+# In record mode every chat-completion request/response and every tool
+# input/output is captured, with its latency, into a gzip-compressed JSON-lines
+# cassette. In replay mode the cassette is served back deterministically, so
+# agent runs can be profiled and regression-tested offline.
+#
+# Usage:
+#   python cassette.py record cassettes/taiwan.jsonl.gz "What are the risks for Taiwan?"
+#   python cassette.py replay cassettes/taiwan.jsonl.gz [--latency] [--profile]
+
+import argparse
+import asyncio
+import gzip
+import hashlib
+import json
+import os
+import time
+from collections import defaultdict, deque
+from contextlib import contextmanager
+from types import SimpleNamespace
+
+from tool_registry import LIMIT_ATTRIBUTES, ToolRegistry
+from tools import BaseTool
+
+CASSETTE_VERSION = 1
+
+
+class CassetteMiss(KeyError):
+    """Raised in replay mode when a request was never recorded."""
+
+
+class Cassette:
+    """
+    An ordered collection of recorded interactions.
+
+    Interactions are looked up by kind ('llm' or 'tool') and a hash of the
+    request. Identical requests are served in the order they were recorded.
+    """
+
+    def __init__(self, meta: dict = None, interactions: list = None):
+        """
+        Args:
+            meta (dict): Free-form information about the recorded run.
+            interactions (list): Previously recorded interactions.
+        """
+        self.meta = meta or {}
+        self.interactions = interactions or []
+        self._queues = defaultdict(deque)
+        for interaction in self.interactions:
+            self._queues[(interaction["kind"], interaction["key"])].append(interaction)
+
+    def add(self, kind: str, key: str, request: dict, response, latency: float):
+        """Appends a recorded interaction."""
+        interaction = {
+            "kind": kind, "key": key, "request": request, "response": response, "latency": round(latency, 4)
+        }
+        self.interactions.append(interaction)
+        self._queues[(kind, key)].append(interaction)
+
+    def next(self, kind: str, key: str, description: str) -> dict:
+        """
+        Returns the next recorded interaction for a request.
+
+        Raises:
+            CassetteMiss: If the request was not recorded (or was already consumed).
+        """
+        queue = self._queues.get((kind, key))
+        if not queue:
+            raise CassetteMiss(f"No recorded {kind} interaction for {description}")
+        return queue.popleft()
+
+    def save(self, path: str):
+        """Writes the cassette as gzip-compressed JSON lines."""
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with gzip.open(path, "wt", encoding="utf-8") as cassette_file:
+            cassette_file.write(json.dumps({"version": CASSETTE_VERSION, "meta": self.meta}) + "\n")
+            for interaction in self.interactions:
+                cassette_file.write(json.dumps(interaction, separators=(",", ":")) + "\n")
+
+    @classmethod
+    def load(cls, path: str) -> "Cassette":
+        """Reads a cassette written by `save`."""
+        with gzip.open(path, "rt", encoding="utf-8") as cassette_file:
+            header = json.loads(cassette_file.readline())
+            if header.get("version") != CASSETTE_VERSION:
+                raise ValueError(f"Unsupported cassette version in {path}: {header.get('version')}")
+            interactions = [json.loads(line) for line in cassette_file if line.strip()]
+        return cls(header.get("meta"), interactions)
+
+
+def _request_key(payload) -> str:
+    """A stable hash of a request payload."""
+    encoded = json.dumps(payload, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(encoded.encode("utf-8")).hexdigest()[:32]
+
+
+def _llm_request(kwargs: dict) -> dict:
+    """The parts of a chat-completion request that determine its response."""
+    return {
+        "model": kwargs.get("model"),
+        "temperature": kwargs.get("temperature"),
+        "messages": [
+            {"role": message["role"], "content": message["content"]} for message in kwargs.get("messages", [])
+        ],
+    }
+
+
+def _response_object(recorded: dict) -> SimpleNamespace:
+    """Rebuilds the attributes of an OpenAI chat-completion response that the agent reads."""
+    usage = recorded.get("usage")
+    return SimpleNamespace(
+        choices=[SimpleNamespace(message=SimpleNamespace(role="assistant", content=recorded["content"]))],
+        usage=SimpleNamespace(**usage) if usage else None,
+        model=recorded.get("model"),
+    )
+
+
+class _Completions:
+    """Stands in for `client.chat.completions` in record and replay mode."""
+
+    def __init__(self, cassette: Cassette, client=None, replay_latency: bool = False):
+        self._cassette = cassette
+        self._client = client
+        self._replay_latency = replay_latency
+
+    async def create(self, **kwargs):
+        request = _llm_request(kwargs)
+        key = _request_key(request)
+        if self._client is None:
+            recorded = self._cassette.next("llm", key, f"a chat completion with {len(request['messages'])} messages")
+            if self._replay_latency:
+                await asyncio.sleep(recorded["latency"])
+            return _response_object(recorded["response"])
+
+        started = time.perf_counter()
+        response = await self._client.chat.completions.create(**kwargs)
+        latency = time.perf_counter() - started
+        usage = getattr(response, "usage", None)
+        self._cassette.add("llm", key, request, {
+            "content": response.choices[0].message.content,
+            "model": getattr(response, "model", None),
+            "usage": {
+                "prompt_tokens": usage.prompt_tokens,
+                "completion_tokens": usage.completion_tokens,
+                "total_tokens": usage.total_tokens,
+            } if usage else None,
+        }, latency)
+        return response
+
+
+class CassetteChatClient:
+    """
+    An OpenAI-compatible client that records through a real client, or replays
+    from the cassette when no real client is given.
+    """
+
+    def __init__(self, cassette: Cassette, client=None, replay_latency: bool = False):
+        """
+        Args:
+            cassette (Cassette): Where interactions are recorded to or replayed from.
+            client: The real AsyncOpenAI client (record mode), or None (replay mode).
+            replay_latency (bool): In replay mode, sleep for the recorded latency.
+        """
+        self.chat = SimpleNamespace(completions=_Completions(cassette, client, replay_latency))
+
+
+class CassetteTool(BaseTool):
+    """Wraps a tool so its inputs and outputs are recorded or replayed."""
+
+    def __init__(self, tool: BaseTool, cassette: Cassette, replay: bool, replay_latency: bool = False):
+        """
+        Args:
+            tool (BaseTool): The wrapped tool; only called in record mode.
+            cassette (Cassette): Where interactions are recorded to or replayed from.
+            replay (bool): Serve outputs from the cassette instead of calling the tool.
+            replay_latency (bool): In replay mode, sleep for the recorded latency.
+        """
+        self.tool = tool
+        self.name = tool.name
+        self.description = tool.description
+        self.details = tool.details
+        # Limits and policies such as `known_urls_only` must hold in both modes,
+        # or a cassette run would behave differently from a live one.
+        for attribute in LIMIT_ATTRIBUTES:
+            setattr(self, attribute, getattr(tool, attribute))
+        self._cassette = cassette
+        self._replay = replay
+        self._replay_latency = replay_latency
+
+    async def use(self, tool_input: str, token_budget: int = None) -> str:
+        # The budget is recorded but not part of the key, so small changes in
+        # prompt assembly do not invalidate recorded tool traffic.
+        key = _request_key({"tool": self.name, "input": tool_input})
+        if self._replay:
+            recorded = self._cassette.next("tool", key, f"{self.name}('{tool_input}')")
+            if self._replay_latency:
+                await asyncio.sleep(recorded["latency"])
+            return recorded["response"]
+
+        started = time.perf_counter()
+        output = await self.tool.use(tool_input, token_budget=token_budget)
+        self._cassette.add(
+            "tool", key, {"tool": self.name, "input": tool_input, "token_budget": token_budget},
+            output, time.perf_counter() - started
+        )
+        return output
+
+
+@contextmanager
+def use_cassette(agent, path: str, mode: str, replay_latency: bool = False, meta: dict = None):
+    """
+    Routes an agent's LLM and tool traffic through a cassette.
+
+    In 'record' mode the real client and tools are called and the cassette is
+    written to `path` on exit. In 'replay' mode nothing leaves the process and
+    runs are not recorded in the analytics store.
+
+    Args:
+        agent (SupplyChainAnalystAgent): The agent to instrument.
+        path (str): The cassette file.
+        mode (str): 'record' or 'replay'.
+        replay_latency (bool): In replay mode, reproduce the recorded latencies.
+        meta (dict): Information stored in the cassette header when recording.
+
+    Yields:
+        Cassette: The cassette in use.
+    """
+    if mode not in ("record", "replay"):
+        raise ValueError(f"Unknown cassette mode '{mode}'; expected 'record' or 'replay'.")
+    replay = mode == "replay"
+    cassette = Cassette.load(path) if replay else Cassette(meta)
+
+    original_client, original_tools, original_analytics = agent.client, agent.tools, agent.analytics
+    agent.client = CassetteChatClient(cassette, None if replay else original_client, replay_latency)
+    if replay:
+        # Replayed runs are not new analyses.
+        agent.analytics = None
+    agent.tools = ToolRegistry(
+        [CassetteTool(tool, cassette, replay, replay_latency) for tool in original_tools], entry_point_group=""
+    )
+    try:
+        yield cassette
+    finally:
+        agent.client, agent.tools, agent.analytics = original_client, original_tools, original_analytics
+        if not replay:
+            cassette.save(path)
+
+
+async def _record(path: str, query: str, max_steps: int):
+    """Runs the agent against the live services and records the traffic."""
+    from agent import SupplyChainAnalystAgent
+    from config import load_config
+
+    load_config()
+    agent = SupplyChainAnalystAgent()
+    with use_cassette(agent, path, "record", meta={"query": query, "max_steps": max_steps, "model": agent.model}):
+        answer = await agent.run(query, max_steps=max_steps)
+    print(f"\n--- Recorded to {path} ---\n{answer}")
+
+
+async def _replay(path: str, replay_latency: bool):
+    """Replays a cassette offline and reports where the time went."""
+    from agent import SupplyChainAnalystAgent
+
+    meta = Cassette.load(path).meta
+    # The client is replaced by the cassette, so no API key is needed.
+    agent = SupplyChainAnalystAgent(model=meta.get("model", "gpt-4o"), client=CassetteChatClient(Cassette()))
+    started = time.perf_counter()
+    with use_cassette(agent, path, "replay", replay_latency=replay_latency):
+        answer = await agent.run(meta["query"], max_steps=meta.get("max_steps", 5))
+    print(f"\n--- Replayed {path} in {time.perf_counter() - started:.3f}s ---\n{answer}")
+
+
+def main():
+    """Command line entry point for recording and replaying cassettes."""
+    parser = argparse.ArgumentParser(description="Record or replay agent traffic")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    record_parser = commands.add_parser("record", help="Run against live services and record")
+    record_parser.add_argument("path")
+    record_parser.add_argument("query")
+    record_parser.add_argument("--max-steps", type=int, default=5)
+
+    replay_parser = commands.add_parser("replay", help="Replay a cassette offline")
+    replay_parser.add_argument("path")
+    replay_parser.add_argument("--latency", action="store_true", help="Reproduce recorded latencies")
+    replay_parser.add_argument("--profile", action="store_true", help="Print a cProfile report")
+
+    args = parser.parse_args()
+    if args.command == "record":
+        asyncio.run(_record(args.path, args.query, args.max_steps))
+    elif args.profile:
+        import cProfile
+        import pstats
+
+        profiler = cProfile.Profile()
+        profiler.runcall(asyncio.run, _replay(args.path, args.latency))
+        pstats.Stats(profiler).sort_stats("cumulative").print_stats(25)
+    else:
+        asyncio.run(_replay(args.path, args.latency))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,143 @@
+# compression.py
+# Local, CPU-only extractive compression of search observations.
+# Snippet sentences are ranked against the tool input with BM25, computed in a
+# few vectorized NumPy operations, and only the best sentences that fit the
+# observation's token budget are passed on to the LLM. Titles and URLs are
+# always kept so the answer can still cite its sources.
+
+import re
+from functools import lru_cache
+
+import numpy as np
+
+from app_config import COMPRESSION_CONFIG
+from metrics import metrics
+from text_processing import estimate_tokens, hash_tokens
+from tools import format_results, parse_results
+
+_SENTENCE_BOUNDARY = re.compile(r"(?<=[.!?])\s+|\s*\n+\s*|\s+\|\s+|\s*\.\.\.\s*")
+
+
+def split_sentences(text: str) -> list:
+    """Splits snippet text into sentences (and list items or table cells)."""
+    return [sentence.strip() for sentence in _SENTENCE_BOUNDARY.split(text) if sentence and sentence.strip()]
+
+
+class ObservationCompressor:
+    """
+    Ranks snippet sentences with BM25 against the query and keeps the best ones.
+
+    Every result keeps at least its single best sentence (when the budget
+    allows), so compression removes boilerplate without dropping sources.
+    """
+
+    def __init__(self, k1: float = 1.5, b: float = 0.75, min_sentence_chars: int = None):
+        """
+        Args:
+            k1 (float): BM25 term-frequency saturation.
+            b (float): BM25 length normalization.
+            min_sentence_chars (int): Shorter fragments are dropped as noise.
+        """
+        self.k1 = k1
+        self.b = b
+        self.min_sentence_chars = min_sentence_chars or COMPRESSION_CONFIG["min_sentence_chars"]
+
+    def bm25_scores(self, query: str, sentences: list) -> np.ndarray:
+        """
+        Scores sentences against a query with BM25, treating each sentence as a document.
+
+        Args:
+            query (str): The search query.
+            sentences (list): The candidate sentences.
+
+        Returns:
+            np.ndarray: One score per sentence.
+        """
+        query_hashes = np.unique(hash_tokens([query])[0])
+        hashes, doc_ids = hash_tokens(sentences)
+        n_docs, n_terms = len(sentences), len(query_hashes)
+        if n_docs == 0 or n_terms == 0 or len(hashes) == 0:
+            return np.zeros(n_docs)
+
+        lengths = np.bincount(doc_ids, minlength=n_docs).astype(float)
+        positions = np.minimum(np.searchsorted(query_hashes, hashes), n_terms - 1)
+        is_query_term = query_hashes[positions] == hashes
+        term_freq = np.bincount(
+            doc_ids[is_query_term] * n_terms + positions[is_query_term], minlength=n_docs * n_terms
+        ).reshape(n_docs, n_terms).astype(float)
+
+        doc_freq = (term_freq > 0).sum(axis=0)
+        idf = np.log1p((n_docs - doc_freq + 0.5) / (doc_freq + 0.5))
+        norm = self.k1 * (1 - self.b + self.b * lengths / max(lengths.mean(), 1.0))
+        return (term_freq * (self.k1 + 1) / (term_freq + norm[:, None])) @ idf
+
+    def compress(self, query: str, tool_output: str, token_budget: int) -> tuple:
+        """
+        Compresses a formatted search observation to fit a token budget.
+
+        Args:
+            query (str): What the kept sentences should be relevant to.
+            tool_output (str): The tool's formatted results.
+            token_budget (int): Tokens the compressed observation may take.
+
+        Returns:
+            tuple: (compressed text, stats dict with 'raw_tokens', 'tokens'
+                and 'ratio' = tokens / raw_tokens). Outputs without search
+                results, or already within budget, are returned unchanged.
+        """
+        raw_tokens = estimate_tokens(tool_output)
+        results = parse_results(tool_output)
+        if not results or raw_tokens <= token_budget:
+            return tool_output, {"raw_tokens": raw_tokens, "tokens": raw_tokens, "ratio": 1.0}
+
+        sentences, owners, seen = [], [], set()
+        for index, result in enumerate(results):
+            for sentence in split_sentences(result["content"]):
+                # Syndicated snippets repeat the same boilerplate; keep one copy.
+                if len(sentence) >= self.min_sentence_chars and sentence not in seen:
+                    seen.add(sentence)
+                    sentences.append(sentence)
+                    owners.append(index)
+        scores = self.bm25_scores(query, sentences)
+        owners = np.array(owners, dtype=np.int64)
+
+        # Titles and URLs are always kept; sentences share what is left.
+        skeleton_tokens = estimate_tokens(format_results([dict(result, content="") for result in results]))
+        remaining = token_budget - skeleton_tokens
+        sentence_tokens = [estimate_tokens(sentence) + 1 for sentence in sentences]
+        order = np.argsort(-scores, kind="stable")
+
+        keep = np.zeros(len(sentences), dtype=bool)
+        covered = set()
+        # First pass: the best sentence of each result; second pass: the best
+        # remaining sentences overall, as long as they match the query at all.
+        for first_pass in (True, False):
+            for index in order.tolist():
+                if keep[index] or (first_pass and owners[index] in covered):
+                    continue
+                if not first_pass and scores[index] <= 0:
+                    break
+                if sentence_tokens[index] > remaining:
+                    continue
+                keep[index] = True
+                covered.add(owners[index])
+                remaining -= sentence_tokens[index]
+
+        kept = {index: [] for index in range(len(results))}
+        for index in np.flatnonzero(keep).tolist():
+            kept[owners[index]].append(sentences[index])
+        compressed = format_results([
+            dict(result, content=" ".join(kept[index])) for index, result in enumerate(results)
+        ])
+
+        tokens = estimate_tokens(compressed)
+        ratio = tokens / raw_tokens if raw_tokens else 1.0
+        metrics.observe("compression.ratio", ratio)
+        metrics.increment("compression.tokens_saved", raw_tokens - tokens)
+        return compressed, {"raw_tokens": raw_tokens, "tokens": tokens, "ratio": round(ratio, 3)}
+
+
+@lru_cache(maxsize=None)
+def get_compressor() -> ObservationCompressor:
+    """Returns the shared compressor."""
+    return ObservationCompressor()
@@ -0,0 +1,205 @@
+# entity_tagging.py
+# Tags tool observations with the countries, ports, chokepoints and commodities
+# they mention. All gazetteer aliases are compiled into sorted tables of packed
+# word-id n-grams, so texts are matched with a handful of vectorized lookups
+# no matter how many aliases the gazetteer holds.
+
+from functools import lru_cache
+
+import numpy as np
+
+from gazetteer import CHOKEPOINTS, COMMODITIES, COUNTRIES, EXCLUSIONS, PORTS
+from text_processing import hash_tokens
+from tools import parse_results
+
+ENTITY_TYPES = ("countries", "ports", "chokepoints", "commodities")
+
+
+class EntityTagger:
+    """
+    Multi-pattern matcher over the bundled gazetteer.
+
+    Matching runs over tokens rather than characters and never loops over
+    tokens in Python: texts are tokenized and hashed in bulk with NumPy, every
+    gazetteer word is interned as a small integer id, and the token ids of
+    each n-gram (up to the longest alias) are packed into one integer key
+    that is looked up with `searchsorted` in a sorted table of alias keys.
+    Overlapping matches are resolved in favour of the longest alias, leftmost
+    first ("palm oil" over "oil").
+    """
+
+    def __init__(self):
+        """Compiles every gazetteer alias into per-length tables of n-gram keys."""
+        self.port_countries = {name: country for name, (country, _) in PORTS.items()}
+        entries = [("countries", name, aliases) for name, aliases in COUNTRIES.items()]
+        entries += [("ports", name, aliases) for name, (_, aliases) in PORTS.items()]
+        entries += [("chokepoints", name, aliases) for name, aliases in CHOKEPOINTS.items()]
+        entries += [("commodities", name, aliases) for name, aliases in COMMODITIES.items()]
+        # Exclusions match like aliases but carry no entity type; see `find`.
+        entries += [(None, phrase, [phrase]) for phrase in EXCLUSIONS]
+
+        symbols = {}
+        patterns = []
+        for entity_type, name, aliases in entries:
+            for alias in aliases:
+                words, _ = hash_tokens([alias])
+                if len(words) == 0:
+                    continue
+                sequence = tuple(symbols.setdefault(int(word), len(symbols)) for word in words)
+                patterns.append((sequence, (entity_type, name)))
+
+        alphabet = sorted(symbols.items())
+        self._symbol_hashes = np.array([word for word, _ in alphabet], dtype=np.uint64)
+        self._symbol_ids = np.array([symbol for _, symbol in alphabet], dtype=np.int64)
+        self._build_tables(patterns, len(symbols))
+
+    def _build_tables(self, patterns: list, n_symbols: int):
+        """Packs each alias's symbol ids into one integer key, in a sorted table per alias length."""
+        self._base = n_symbols
+        self._max_length = max(len(sequence) for sequence, _ in patterns)
+        if self._base ** self._max_length >= 2 ** 63:
+            raise ValueError("Gazetteer aliases are too long to pack into 64-bit n-gram keys.")
+
+        by_key = {}
+        for sequence, entity in patterns:
+            key = 0
+            for symbol in sequence:
+                key = key * self._base + symbol
+            current = by_key.get((len(sequence), key))
+            # The same words under two names: exclusions win, then the first name in sort order.
+            if current is None or (current[0] is not None and (entity[0] is None or entity < current)):
+                by_key[(len(sequence), key)] = entity
+
+        self._entities = sorted(set(by_key.values()), key=lambda entity: (entity[0] or "", entity[1]))
+        entity_index = {entity: index for index, entity in enumerate(self._entities)}
+        self._tables = {}
+        for length in range(1, self._max_length + 1):
+            items = sorted((key, entity_index[entity]) for (size, key), entity in by_key.items() if size == length)
+            if items:
+                keys, entities = zip(*items)
+                self._tables[length] = (np.array(keys, dtype=np.int64), np.array(entities, dtype=np.int64))
+
+    def find(self, texts: list) -> list:
+        """
+        Finds every gazetteer mention in the given texts.
+
+        Args:
+            texts (list): The texts to scan.
+
+        Returns:
+            list: (doc_index, entity_type, canonical_name) tuples, one per
+                non-overlapping mention, in text order.
+        """
+        hashes, doc_ids = hash_tokens(texts)
+        if len(hashes) == 0:
+            return []
+
+        n_symbols = len(self._symbol_hashes)
+        positions = np.minimum(np.searchsorted(self._symbol_hashes, hashes), n_symbols - 1)
+        symbols = np.where(self._symbol_hashes[positions] == hashes, self._symbol_ids[positions], -1)
+
+        # Grow n-grams one token at a time from every gazetteer word. An n-gram
+        # stops growing at a non-gazetteer word or a document boundary.
+        starts = np.flatnonzero(symbols >= 0)
+        keys = symbols[starts]
+        match_starts, match_lengths, match_entities = [], [], []
+        for length in range(1, self._max_length + 1):
+            if length > 1:
+                ends = starts + (length - 1)
+                extendable = ends < len(symbols)
+                starts, keys, ends = starts[extendable], keys[extendable], ends[extendable]
+                extendable = (symbols[ends] >= 0) & (doc_ids[ends] == doc_ids[starts])
+                starts, keys = starts[extendable], keys[extendable] * self._base + symbols[ends[extendable]]
+            if len(starts) == 0:
+                break
+            if length not in self._tables:
+                continue
+            table_keys, table_entities = self._tables[length]
+            slots = np.minimum(np.searchsorted(table_keys, keys), len(table_keys) - 1)
+            hits = table_keys[slots] == keys
+            match_starts.append(starts[hits])
+            match_lengths.append(np.full(int(hits.sum()), length, dtype=np.int64))
+            match_entities.append(table_entities[slots[hits]])
+        if not match_starts:
+            return []
+        match_starts = np.concatenate(match_starts)
+        if len(match_starts) == 0:
+            return []
+        match_lengths = np.concatenate(match_lengths)
+        match_entities = np.concatenate(match_entities)
+
+        # The longest alias at each start, then leftmost-longest selection: a
+        # match is kept unless a kept match further left still covers it. Each
+        # round settles at least the next undecided match; overlaps are short,
+        # so a few rounds suffice.
+        order = np.lexsort((-match_lengths, match_starts))
+        match_starts, match_lengths, match_entities = (
+            match_starts[order], match_lengths[order], match_entities[order]
+        )
+        first = np.ones(len(match_starts), dtype=bool)
+        first[1:] = match_starts[1:] != match_starts[:-1]
+        match_starts, match_lengths, match_entities = match_starts[first], match_lengths[first], match_entities[first]
+        match_ends = match_starts + match_lengths - 1
+
+        kept = np.ones(len(match_starts), dtype=bool)
+        while True:
+            covered_until = np.maximum.accumulate(np.where(kept, match_ends, -1))
+            previous = np.concatenate(([-1], covered_until[:-1]))
+            settled = match_starts > previous
+            if np.array_equal(settled, kept):
+                break
+            kept = settled
+
+        entities = self._entities
+        return [
+            (doc, entities[entity][0], entities[entity][1])
+            for doc, entity in zip(doc_ids[match_starts[kept]].tolist(), match_entities[kept].tolist())
+            if entities[entity][0] is not None
+        ]
+
+    def tag(self, texts: list) -> dict:
+        """
+        Aggregates the gazetteer mentions found in the given texts.
+
+        Args:
+            texts (list): The texts to scan.
+
+        Returns:
+            dict: Mention counts per canonical name for each entity type in
+                `ENTITY_TYPES`, plus 'regions': the affected countries and
+                chokepoints (ports count towards their country), most
+                mentioned first.
+        """
+        tags = {entity_type: {} for entity_type in ENTITY_TYPES}
+        regions = {}
+        for _, entity_type, name in self.find(texts):
+            tags[entity_type][name] = tags[entity_type].get(name, 0) + 1
+            if entity_type == "commodities":
+                continue
+            region = self.port_countries[name] if entity_type == "ports" else name
+            regions[region] = regions.get(region, 0) + 1
+        tags["regions"] = sorted(regions, key=lambda region: (-regions[region], region))
+        return tags
+
+    def tag_observations(self, observations: list) -> dict:
+        """
+        Tags the search results contained in the observations of an agent run.
+
+        Args:
+            observations (list): Tool outputs, either raw strings or the
+                observation dicts recorded by `SupplyChainAnalystAgent.analyze`.
+
+        Returns:
+            dict: The aggregated tags, as returned by `tag`.
+        """
+        texts = []
+        for observation in observations:
+            text = observation["output"] if isinstance(observation, dict) else observation
+            texts.extend(f"{result['title']}\n{result['content']}" for result in parse_results(text))
+        return self.tag(texts)
+
+
+@lru_cache(maxsize=None)
+def get_entity_tagger() -> EntityTagger:
+    """Returns the shared tagger, building its match tables on first use."""
+    return EntityTagger()
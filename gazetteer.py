@@ -0,0 +1,181 @@
+# gazetteer.py
+# Bundled gazetteer of places and goods that matter for supply chain risk.
+# Each entry maps a canonical name to the aliases it is recognized by. Ports carry
+# the country they belong to so that port mentions count towards affected regions.
+
+COUNTRIES = {
+    "United States": ["united states", "usa", "u s", "america"],
+    "Canada": ["canada"],
+    "Mexico": ["mexico"],
+    "Brazil": ["brazil"],
+    "Argentina": ["argentina"],
+    "Chile": ["chile"],
+    "Peru": ["peru"],
+    "Colombia": ["colombia"],
+    "Panama": ["panama"],
+    "United Kingdom": ["united kingdom", "uk", "britain", "great britain"],
+    "Germany": ["germany"],
+    "France": ["france"],
+    "Italy": ["italy"],
+    "Spain": ["spain"],
+    "Netherlands": ["netherlands", "holland"],
+    "Belgium": ["belgium"],
+    "Poland": ["poland"],
+    "Sweden": ["sweden"],
+    "Norway": ["norway"],
+    "Finland": ["finland"],
+    "Greece": ["greece"],
+    "Ukraine": ["ukraine"],
+    "Russia": ["russia", "russian federation"],
+    "Turkey": ["turkey", "turkiye"],
+    "Egypt": ["egypt"],
+    "Morocco": ["morocco"],
+    "Nigeria": ["nigeria"],
+    "South Africa": ["south africa"],
+    "Kenya": ["kenya"],
+    "Ethiopia": ["ethiopia"],
+    "Democratic Republic of the Congo": ["democratic republic of the congo", "dr congo", "drc"],
+    "Saudi Arabia": ["saudi arabia"],
+    "United Arab Emirates": ["united arab emirates", "uae"],
+    "Qatar": ["qatar"],
+    "Iran": ["iran"],
+    "Iraq": ["iraq"],
+    "Israel": ["israel"],
+    "Yemen": ["yemen"],
+    "India": ["india"],
+    "Pakistan": ["pakistan"],
+    "Bangladesh": ["bangladesh"],
+    "Sri Lanka": ["sri lanka"],
+    "China": ["china", "prc", "mainland china"],
+    "Taiwan": ["taiwan"],
+    "Hong Kong": ["hong kong"],
+    "Japan": ["japan"],
+    "South Korea": ["south korea", "korea"],
+    "North Korea": ["north korea"],
+    "Vietnam": ["vietnam", "viet nam"],
+    "Thailand": ["thailand"],
+    "Malaysia": ["malaysia"],
+    "Singapore": ["singapore"],
+    "Indonesia": ["indonesia"],
+    "Philippines": ["philippines"],
+    "Myanmar": ["myanmar", "burma"],
+    "Australia": ["australia"],
+    "New Zealand": ["new zealand"],
+    "Kazakhstan": ["kazakhstan"],
+}
+
+PORTS = {
+    "Port of Shanghai": ("China", ["port of shanghai", "shanghai", "yangshan"]),
+    "Port of Ningbo-Zhoushan": ("China", ["ningbo", "zhoushan", "ningbo zhoushan"]),
+    "Port of Shenzhen": ("China", ["shenzhen", "yantian"]),
+    "Port of Guangzhou": ("China", ["guangzhou", "nansha"]),
+    "Port of Qingdao": ("China", ["qingdao"]),
+    "Port of Tianjin": ("China", ["tianjin"]),
+    "Port of Hong Kong": ("Hong Kong", ["port of hong kong", "kwai tsing"]),
+    "Port of Kaohsiung": ("Taiwan", ["kaohsiung"]),
+    "Port of Busan": ("South Korea", ["busan", "pusan"]),
+    "Port of Singapore": ("Singapore", ["port of singapore", "tanjong pagar", "tuas port"]),
+    "Port Klang": ("Malaysia", ["port klang"]),
+    "Port of Tanjung Pelepas": ("Malaysia", ["tanjung pelepas"]),
+    "Port of Laem Chabang": ("Thailand", ["laem chabang"]),
+    "Port of Ho Chi Minh City": ("Vietnam", ["ho chi minh city", "cat lai"]),
+    "Port of Tokyo": ("Japan", ["port of tokyo"]),
+    "Port of Yokohama": ("Japan", ["yokohama"]),
+    "Jawaharlal Nehru Port": ("India", ["jawaharlal nehru port", "nhava sheva", "jnpt"]),
+    "Port of Mundra": ("India", ["mundra"]),
+    "Port of Colombo": ("Sri Lanka", ["colombo"]),
+    "Port of Jebel Ali": ("United Arab Emirates", ["jebel ali"]),
+    "Port of Jeddah": ("Saudi Arabia", ["jeddah"]),
+    "Port Said": ("Egypt", ["port said"]),
+    "Port of Piraeus": ("Greece", ["piraeus"]),
+    "Port of Rotterdam": ("Netherlands", ["rotterdam"]),
+    "Port of Antwerp-Bruges": ("Belgium", ["antwerp", "zeebrugge"]),
+    "Port of Hamburg": ("Germany", ["hamburg"]),
+    "Port of Bremerhaven": ("Germany", ["bremerhaven"]),
+    "Port of Felixstowe": ("United Kingdom", ["felixstowe"]),
+    "Port of Valencia": ("Spain", ["port of valencia"]),
+    "Port of Algeciras": ("Spain", ["algeciras"]),
+    "Port of Le Havre": ("France", ["le havre"]),
+    "Port of Genoa": ("Italy", ["port of genoa"]),
+    "Port Tangier Med": ("Morocco", ["tanger med", "tangier med"]),
+    "Port of Durban": ("South Africa", ["durban"]),
+    "Port of Mombasa": ("Kenya", ["mombasa"]),
+    "Port of Los Angeles": ("United States", ["port of los angeles"]),
+    "Port of Long Beach": ("United States", ["long beach"]),
+    "Port of Oakland": ("United States", ["port of oakland"]),
+    "Port of Seattle-Tacoma": ("United States", ["tacoma", "port of seattle"]),
+    "Port of New York and New Jersey": ("United States", ["port of new york", "port newark", "new york new jersey"]),
+    "Port of Savannah": ("United States", ["savannah"]),
+    "Port of Houston": ("United States", ["port of houston"]),
+    "Port of Baltimore": ("United States", ["port of baltimore"]),
+    "Port of Vancouver": ("Canada", ["port of vancouver"]),
+    "Port of Prince Rupert": ("Canada", ["prince rupert"]),
+    "Port of Manzanillo": ("Mexico", ["manzanillo"]),
+    "Port of Santos": ("Brazil", ["port of santos", "santos port", "santos terminal"]),
+    "Port of Callao": ("Peru", ["callao"]),
+    "Port of Melbourne": ("Australia", ["port of melbourne"]),
+}
+
+CHOKEPOINTS = {
+    "Suez Canal": ["suez canal", "suez"],
+    "Panama Canal": ["panama canal"],
+    "Strait of Hormuz": ["strait of hormuz", "hormuz"],
+    "Strait of Malacca": ["strait of malacca", "malacca strait", "malacca"],
+    "Bab el-Mandeb": ["bab el mandeb", "bab al mandab"],
+    "Red Sea": ["red sea"],
+    "Taiwan Strait": ["taiwan strait"],
+    "Bosphorus": ["bosphorus", "turkish straits"],
+    "Strait of Gibraltar": ["strait of gibraltar", "gibraltar"],
+    "English Channel": ["english channel"],
+    "Cape of Good Hope": ["cape of good hope"],
+    "Black Sea": ["black sea"],
+    "South China Sea": ["south china sea"],
+    "Rhine River": ["rhine"],
+    "Mississippi River": ["mississippi river"],
+    "Danish Straits": ["danish straits", "oresund"],
+}
+
+COMMODITIES = {
+    "Semiconductors": ["semiconductor", "semiconductors", "microchips", "chips", "wafers"],
+    "Rare Earths": ["rare earth", "rare earths", "rare earth elements"],
+    "Lithium": ["lithium"],
+    "Cobalt": ["cobalt"],
+    "Nickel": ["nickel"],
+    "Copper": ["copper"],
+    "Aluminium": ["aluminium", "aluminum"],
+    "Steel": ["steel"],
+    "Iron Ore": ["iron ore"],
+    "Gallium": ["gallium"],
+    "Germanium": ["germanium"],
+    "Neon": ["neon gas", "neon"],
+    "Helium": ["helium"],
+    "Crude Oil": ["crude oil", "brent crude", "wti crude", "crude prices", "crude exports", "crude imports",
+                  "crude tanker", "crude tankers", "oil"],
+    "Natural Gas": ["natural gas", "lng", "liquefied natural gas"],
+    "Coal": ["coal"],
+    "Diesel": ["diesel"],
+    "Jet Fuel": ["jet fuel"],
+    "Wheat": ["wheat"],
+    "Corn": ["corn", "maize"],
+    "Soybeans": ["soybean", "soybeans", "soy"],
+    "Rice": ["rice"],
+    "Coffee": ["coffee"],
+    "Cocoa": ["cocoa"],
+    "Sugar": ["sugar"],
+    "Palm Oil": ["palm oil"],
+    "Cotton": ["cotton"],
+    "Fertilizer": ["fertilizer", "fertilizers", "fertiliser", "potash", "urea"],
+    "Timber": ["timber", "lumber"],
+    "Rubber": ["rubber"],
+    "Pharmaceuticals": ["pharmaceuticals", "active pharmaceutical ingredients", "pharmaceutical ingredients"],
+    "Batteries": ["battery", "batteries"],
+    "Solar Panels": ["solar panels", "solar modules", "polysilicon"],
+}
+
+# Phrases that contain one of the aliases above but name something else. They
+# are matched like aliases, so the longest-match rule lets them win over the
+# shorter alias, and then produce no tag ("south america" is not "america").
+EXCLUSIONS = [
+    "south america", "latin america", "central america", "north america", "bank of america",
+    "potato chips", "blue chips", "bargaining chips", "wood chips",
+]
@@ -0,0 +1,208 @@
+# history_store.py
+# Disk-backed chat history for the Streamlit app.
+# Every message is written to SQLite; only a small window of recent messages per
+# session stays in memory, bounded both per session and across all sessions, so
+# the server's memory does not grow with the length or number of conversations.
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+from app_config import HISTORY_CONFIG
+
+
+class SessionHistoryStore:
+    """
+    Stores chat messages for many browser sessions with bounded memory use.
+
+    Messages are dicts with at least 'role' and 'content'; any extra keys (such
+    as the risk report and tags of an answer) are stored alongside as JSON.
+    Each session keeps an in-memory window of its latest messages. Windows are
+    trimmed to `max_session_bytes`, and whole windows of the least recently
+    used sessions are dropped when the total exceeds `max_total_bytes`. Dropped
+    messages are never lost: they are reloaded from disk when needed.
+    """
+
+    def __init__(self, db_path: str = None, window_size: int = None,
+                 max_session_bytes: int = None, max_total_bytes: int = None):
+        """
+        Opens (or creates) the history database.
+
+        Args:
+            db_path (str): Path of the SQLite file. Relative paths are resolved
+                against the application directory.
+            window_size (int): Number of recent messages kept in memory per session.
+            max_session_bytes (int): Memory cap for one session's window.
+            max_total_bytes (int): Memory cap for all windows together.
+        """
+        db_path = db_path or HISTORY_CONFIG["db_path"]
+        if db_path != ":memory:" and not os.path.isabs(db_path):
+            db_path = os.path.join(os.path.dirname(__file__), db_path)
+        self.window_size = window_size or HISTORY_CONFIG["window_size"]
+        self.max_session_bytes = max_session_bytes or HISTORY_CONFIG["max_session_bytes"]
+        self.max_total_bytes = max_total_bytes or HISTORY_CONFIG["max_total_bytes"]
+
+        # Streamlit serves each session from its own thread, so one connection
+        # is shared behind a lock.
+        self._lock = threading.RLock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS messages ("
+            " session_id TEXT NOT NULL,"
+            " seq INTEGER NOT NULL,"
+            " role TEXT NOT NULL,"
+            " content TEXT NOT NULL,"
+            " extra TEXT,"
+            " created_at REAL NOT NULL,"
+            " PRIMARY KEY (session_id, seq))"
+        )
+        self._conn.commit()
+
+        # session_id -> {"messages": [(seq, message, size)], "bytes": int, "count": int}
+        self._windows = OrderedDict()
+        self._total_bytes = 0
+
+    def append(self, session_id: str, message: dict) -> int:
+        """
+        Persists a message and adds it to the session's in-memory window.
+
+        Args:
+            session_id (str): The browser session the message belongs to.
+            message (dict): The message, with 'role' and 'content' keys.
+
+        Returns:
+            int: The sequence number of the stored message within the session.
+        """
+        extra = {key: value for key, value in message.items() if key not in ("role", "content")}
+        extra_json = json.dumps(extra) if extra else None
+        with self._lock:
+            window = self._window(session_id)
+            seq = window["count"]
+            with self._conn:
+                self._conn.execute(
+                    "INSERT INTO messages (session_id, seq, role, content, extra, created_at)"
+                    " VALUES (?, ?, ?, ?, ?, ?)",
+                    (session_id, seq, message["role"], message["content"], extra_json, time.time()),
+                )
+            window["count"] += 1
+            self._add_to_window(window, seq, dict(message), self._size(message["content"], extra_json))
+            self._enforce_global_cap(keep=session_id)
+            return seq
+
+    def recent(self, session_id: str) -> list:
+        """
+        Returns the session's in-memory window of recent messages, oldest first.
+
+        Args:
+            session_id (str): The browser session.
+
+        Returns:
+            list: (seq, message) tuples.
+        """
+        with self._lock:
+            window = self._window(session_id)
+            self._enforce_global_cap(keep=session_id)
+            return [(seq, message) for seq, message, _ in window["messages"]]
+
+    def load_older(self, session_id: str, before_seq: int, limit: int) -> list:
+        """
+        Reads messages older than a given sequence number straight from disk.
+
+        The result is not cached, so paging back through a long conversation
+        does not grow the server's memory.
+
+        Args:
+            session_id (str): The browser session.
+            before_seq (int): Only messages with a lower sequence number are returned.
+            limit (int): Maximum number of messages to return.
+
+        Returns:
+            list: (seq, message) tuples, oldest first.
+        """
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT seq, role, content, extra FROM messages"
+                " WHERE session_id = ? AND seq < ? ORDER BY seq DESC LIMIT ?",
+                (session_id, before_seq, limit),
+            ).fetchall()
+        return [(seq, self._to_message(role, content, extra)) for seq, role, content, extra in reversed(rows)]
+
+    def count(self, session_id: str) -> int:
+        """Returns the total number of messages stored for a session."""
+        with self._lock:
+            return self._window(session_id)["count"]
+
+    def clear(self, session_id: str):
+        """Deletes a session's messages from memory and disk."""
+        with self._lock:
+            window = self._windows.pop(session_id, None)
+            if window:
+                self._total_bytes -= window["bytes"]
+            with self._conn:
+                self._conn.execute("DELETE FROM messages WHERE session_id = ?", (session_id,))
+
+    def memory_usage(self) -> dict:
+        """Returns the number of sessions held in memory and their total window size in bytes."""
+        with self._lock:
+            return {"sessions": len(self._windows), "bytes": self._total_bytes}
+
+    def _window(self, session_id: str) -> dict:
+        """Returns the session's window, reloading it from disk if it was evicted."""
+        window = self._windows.get(session_id)
+        if window is not None:
+            self._windows.move_to_end(session_id)
+            return window
+
+        window = {"messages": [], "bytes": 0, "count": 0}
+        self._windows[session_id] = window
+        (count,) = self._conn.execute(
+            "SELECT COALESCE(MAX(seq) + 1, 0) FROM messages WHERE session_id = ?", (session_id,)
+        ).fetchone()
+        window["count"] = count
+        rows = self._conn.execute(
+            "SELECT seq, role, content, extra FROM messages"
+            " WHERE session_id = ? ORDER BY seq DESC LIMIT ?",
+            (session_id, self.window_size),
+        ).fetchall()
+        for seq, role, content, extra in reversed(rows):
+            self._add_to_window(window, seq, self._to_message(role, content, extra), self._size(content, extra))
+        return window
+
+    def _add_to_window(self, window: dict, seq: int, message: dict, size: int):
+        """Appends a message to a window and trims it to the per-session limits."""
+        window["messages"].append((seq, message, size))
+        window["bytes"] += size
+        self._total_bytes += size
+        # The newest message always stays, even if it alone exceeds the cap.
+        while len(window["messages"]) > 1 and (
+            len(window["messages"]) > self.window_size or window["bytes"] > self.max_session_bytes
+        ):
+            _, _, dropped = window["messages"].pop(0)
+            window["bytes"] -= dropped
+            self._total_bytes -= dropped
+
+    def _enforce_global_cap(self, keep: str):
+        """Evicts the least recently used windows until the global cap holds."""
+        while self._total_bytes > self.max_total_bytes and len(self._windows) > 1:
+            session_id = next(iter(self._windows))
+            if session_id == keep:
+                self._windows.move_to_end(session_id)
+                continue
+            self._total_bytes -= self._windows.pop(session_id)["bytes"]
+
+    @staticmethod
+    def _size(content: str, extra_json: str) -> int:
+        """Approximates the memory held by one message."""
+        return len(content.encode("utf-8")) + (len(extra_json) if extra_json else 0)
+
+    @staticmethod
+    def _to_message(role: str, content: str, extra: str) -> dict:
+        """Rebuilds a message dict from its stored columns."""
+        message = {"role": role, "content": content}
+        if extra:
+            message.update(json.loads(extra))
+        return message
@@ -0,0 +1,227 @@
+# job_queue.py
+# Durable local job queue for analysis requests, backed by SQLite.
+# Jobs are leased to workers for a limited time and kept alive with heartbeats;
+# a job whose worker dies is picked up again once its lease expires, and failed
+# jobs are retried with a backoff until they run out of attempts.
+
+import json
+import os
+import sqlite3
+import time
+
+from app_config import WORKER_CONFIG
+
+QUEUED = "queued"
+LEASED = "leased"
+DONE = "done"
+FAILED = "failed"
+
+
+class JobQueue:
+    """
+    SQLite-backed queue that is safe to share between processes.
+
+    Every process opens its own `JobQueue` on the same database file. State
+    changes run inside `BEGIN IMMEDIATE` transactions, so two workers can never
+    lease the same job.
+    """
+
+    def __init__(self, db_path: str = None):
+        """
+        Opens (or creates) the queue database.
+
+        Args:
+            db_path (str): Path of the SQLite file. Relative paths are resolved
+                against the application directory.
+        """
+        db_path = db_path or WORKER_CONFIG["db_path"]
+        if not os.path.isabs(db_path):
+            db_path = os.path.join(os.path.dirname(__file__), db_path)
+        self.db_path = db_path
+        self._conn = sqlite3.connect(db_path, timeout=30, isolation_level=None)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS jobs ("
+            " id INTEGER PRIMARY KEY AUTOINCREMENT,"
+            " query TEXT NOT NULL,"
+            " params TEXT NOT NULL,"
+            " status TEXT NOT NULL,"
+            " attempts INTEGER NOT NULL DEFAULT 0,"
+            " max_attempts INTEGER NOT NULL,"
+            " available_at REAL NOT NULL,"
+            " lease_owner TEXT,"
+            " lease_expires REAL,"
+            " result TEXT,"
+            " error TEXT,"
+            " created_at REAL NOT NULL,"
+            " updated_at REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, available_at)")
+
+    def submit(self, query: str, params: dict = None, max_attempts: int = None) -> int:
+        """
+        Adds an analysis request to the queue.
+
+        Args:
+            query (str): The question to analyze.
+            params (dict): Extra keyword arguments for the agent (e.g. max_steps).
+            max_attempts (int): How often the job may be tried before it fails.
+
+        Returns:
+            int: The job id.
+        """
+        now = time.time()
+        cursor = self._conn.execute(
+            "INSERT INTO jobs (query, params, status, max_attempts, available_at, created_at, updated_at)"
+            " VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (query, json.dumps(params or {}), QUEUED, max_attempts or WORKER_CONFIG["max_attempts"],
+             now, now, now),
+        )
+        return cursor.lastrowid
+
+    def lease(self, owner: str, lease_seconds: float = None) -> dict:
+        """
+        Leases the oldest runnable job to a worker.
+
+        Runnable jobs are queued jobs whose backoff has elapsed and leased jobs
+        whose lease expired (their worker stopped heartbeating). Expired jobs
+        that have used up their attempts are marked failed instead.
+
+        Args:
+            owner (str): Identifier of the leasing worker.
+            lease_seconds (float): How long the lease lasts without a heartbeat.
+
+        Returns:
+            dict: The leased job, or None if nothing is runnable.
+        """
+        lease_seconds = lease_seconds or WORKER_CONFIG["lease_seconds"]
+        now = time.time()
+        with self._transaction():
+            self._conn.execute(
+                "UPDATE jobs SET status = ?, error = 'Lease expired on the final attempt.', updated_at = ?"
+                " WHERE status = ? AND lease_expires < ? AND attempts >= max_attempts",
+                (FAILED, now, LEASED, now),
+            )
+            row = self._conn.execute(
+                "SELECT * FROM jobs"
+                " WHERE (status = ? AND available_at <= ?) OR (status = ? AND lease_expires < ?)"
+                " ORDER BY id LIMIT 1",
+                (QUEUED, now, LEASED, now),
+            ).fetchone()
+            if row is None:
+                return None
+            self._conn.execute(
+                "UPDATE jobs SET status = ?, attempts = attempts + 1, lease_owner = ?, lease_expires = ?,"
+                " updated_at = ? WHERE id = ?",
+                (LEASED, owner, now + lease_seconds, now, row["id"]),
+            )
+        job = self._to_job(row)
+        job.update(status=LEASED, attempts=row["attempts"] + 1, lease_owner=owner)
+        return job
+
+    def heartbeat(self, job_id: int, owner: str, lease_seconds: float = None) -> bool:
+        """
+        Extends a lease.
+
+        Returns:
+            bool: False if the worker no longer holds the lease (it expired and
+                the job was handed to someone else), in which case the worker
+                should abandon the job.
+        """
+        lease_seconds = lease_seconds or WORKER_CONFIG["lease_seconds"]
+        now = time.time()
+        cursor = self._conn.execute(
+            "UPDATE jobs SET lease_expires = ?, updated_at = ?"
+            " WHERE id = ? AND status = ? AND lease_owner = ?",
+            (now + lease_seconds, now, job_id, LEASED, owner),
+        )
+        return cursor.rowcount == 1
+
+    def complete(self, job_id: int, owner: str, result: dict) -> bool:
+        """Stores a job's result; returns False if the lease was lost meanwhile."""
+        cursor = self._conn.execute(
+            "UPDATE jobs SET status = ?, result = ?, error = NULL, lease_expires = NULL, updated_at = ?"
+            " WHERE id = ? AND status = ? AND lease_owner = ?",
+            (DONE, json.dumps(result), time.time(), job_id, LEASED, owner),
+        )
+        return cursor.rowcount == 1
+
+    def fail(self, job_id: int, owner: str, error: str) -> bool:
+        """
+        Records a failed attempt. The job is requeued with an exponential backoff
+        while it has attempts left, and marked failed otherwise.
+
+        Returns:
+            bool: False if the lease was lost meanwhile.
+        """
+        now = time.time()
+        with self._transaction():
+            row = self._conn.execute(
+                "SELECT attempts, max_attempts FROM jobs WHERE id = ? AND status = ? AND lease_owner = ?",
+                (job_id, LEASED, owner),
+            ).fetchone()
+            if row is None:
+                return False
+            if row["attempts"] < row["max_attempts"]:
+                backoff = WORKER_CONFIG["retry_backoff"] * 2 ** (row["attempts"] - 1)
+                status, available_at = QUEUED, now + backoff
+            else:
+                status, available_at = FAILED, now
+            self._conn.execute(
+                "UPDATE jobs SET status = ?, error = ?, available_at = ?, lease_owner = NULL,"
+                " lease_expires = NULL, updated_at = ? WHERE id = ?",
+                (status, error, available_at, now, job_id),
+            )
+        return True
+
+    def get(self, job_id: int) -> dict:
+        """Returns a job by id, or None."""
+        row = self._conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return self._to_job(row) if row else None
+
+    def list(self, status: str = None, limit: int = 50) -> list:
+        """Returns the most recent jobs, optionally filtered by status."""
+        if status:
+            rows = self._conn.execute(
+                "SELECT * FROM jobs WHERE status = ? ORDER BY id DESC LIMIT ?", (status, limit)
+            ).fetchall()
+        else:
+            rows = self._conn.execute("SELECT * FROM jobs ORDER BY id DESC LIMIT ?", (limit,)).fetchall()
+        return [self._to_job(row) for row in rows]
+
+    def stats(self) -> dict:
+        """Returns the number of jobs per status."""
+        rows = self._conn.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall()
+        return {status: count for status, count in rows}
+
+    def close(self):
+        """Closes the database connection."""
+        self._conn.close()
+
+    def _transaction(self):
+        """A write transaction that takes the database lock up front."""
+        return _ImmediateTransaction(self._conn)
+
+    @staticmethod
+    def _to_job(row: sqlite3.Row) -> dict:
+        """Converts a database row into a job dict."""
+        job = dict(row)
+        job["params"] = json.loads(job["params"])
+        job["result"] = json.loads(job["result"]) if job["result"] else None
+        return job
+
+
+class _ImmediateTransaction:
+    """Context manager for BEGIN IMMEDIATE ... COMMIT/ROLLBACK."""
+
+    def __init__(self, conn: sqlite3.Connection):
+        self._conn = conn
+
+    def __enter__(self):
+        self._conn.execute("BEGIN IMMEDIATE")
+        return self._conn
+
+    def __exit__(self, exc_type, exc, traceback):
+        self._conn.execute("ROLLBACK" if exc_type else "COMMIT")
+        return False
@@ -1,10 +1,40 @@
 # main.py
 # This is the main entry point for the Supply Chain Risk Analyst AI.
 # It handles the user interaction loop, takes user queries, and uses the agent to find answers.
+# Questions run as background jobs, so the prompt stays responsive: several
+# analyses can run at once, their progress and answers are printed as they
+# arrive, and running jobs can be listed and cancelled.
 
 import asyncio
+import sys
+import threading
+import time
 from agent import SupplyChainAnalystAgent
+from app_config import CLI_CONFIG
+from cancellation import CancellationToken, RunCancelled
 from config import load_config
+from session_memory import SessionMemory
+
+HELP_TEXT = """Commands:
+  <question>        start analyzing a question in the background
+  jobs              list jobs and their status
+  show <id>         print a finished job's answer again
+  cancel <id|all>   cancel a queued or running job
+  progress on|off   stream job progress while jobs run
+  help              show this help
+  exit / quit       cancel running jobs and leave
+A question may not start with a command word."""
+
+# Usage of every command, printed when one is given the wrong arguments
+COMMAND_USAGE = {
+    "jobs": "jobs",
+    "show": "show <id>",
+    "cancel": "cancel <id|all>",
+    "progress": "progress on|off",
+    "help": "help",
+    "exit": "exit",
+    "quit": "quit",
+}
 
 def display_welcome_message():
     """Prints a welcome message and instructions for the user."""
@@ -12,53 +42,221 @@ def display_welcome_message():
     print("Welcome! I am an AI agent designed to help you analyze supply chain risks.")
     print("You can ask me questions about potential disruptions, geopolitical impacts, port status, and more.")
     print("For example: 'What are the current supply chain risks for semiconductor manufacturing in Taiwan?'")
-    print("Type 'exit' or 'quit' to end the session.\n")
+    print("Questions run in the background, so you can keep asking while earlier ones are analyzed.")
+    print("Type 'help' for the job commands, or 'exit' or 'quit' to end the session.\n")
+
+class StdinReader:
+    """
+    Reads lines from stdin on a daemon thread and hands them to the event loop.
+
+    `input()` would block the whole event loop while waiting for the user. A
+    daemon thread (rather than the default executor) is used because a pending
+    read must not keep the process alive after the user quits.
+    """
+
+    def __init__(self):
+        """Starts the reader thread; must be called from within the event loop."""
+        self._loop = asyncio.get_running_loop()
+        self._lines = asyncio.Queue()
+        threading.Thread(target=self._read, name="stdin-reader", daemon=True).start()
+
+    def _read(self):
+        """Thread body: forwards every line, then None at end of input."""
+        try:
+            for line in iter(sys.stdin.readline, ""):
+                self._loop.call_soon_threadsafe(self._lines.put_nowait, line)
+            self._loop.call_soon_threadsafe(self._lines.put_nowait, None)
+        except RuntimeError:
+            # The event loop closed while we were waiting for input.
+            pass
+
+    async def readline(self):
+        """Returns the next line without its newline, or None at end of input."""
+        line = await self._lines.get()
+        return None if line is None else line.rstrip("\n")
+
+class BackgroundQueries:
+    """Runs questions as concurrent background jobs and keeps track of them."""
+
+    def __init__(self, agent: SupplyChainAnalystAgent, max_concurrent: int = 3, show_progress: bool = True):
+        """
+        Args:
+            agent (SupplyChainAnalystAgent): The agent that answers the questions.
+            max_concurrent (int): Jobs analyzed at once; later jobs wait for a slot.
+            show_progress (bool): Print each job's progress messages as they arrive.
+        """
+        self.agent = agent
+        self.show_progress = show_progress
+        # Follow-up questions build on the evidence earlier jobs found.
+        self.memory = SessionMemory()
+        self.jobs = {}
+        self._next_id = 1
+        self._slots = asyncio.Semaphore(max_concurrent)
+
+    def submit(self, query: str) -> int:
+        """Starts a job for a question and returns its id."""
+        job_id = self._next_id
+        self._next_id += 1
+        job = {"id": job_id, "query": query, "status": "queued", "started": None,
+               "finished": None, "answer": None, "error": None, "token": CancellationToken()}
+        job["task"] = asyncio.ensure_future(self._run(job))
+        self.jobs[job_id] = job
+        return job_id
+
+    def cancel(self, job_id: int, reason: str = "cancelled by user") -> bool:
+        """
+        Cancels a queued or running job, aborting its in-flight model and search
+        requests. Returns False if it had already finished.
+        """
+        job = self.jobs.get(job_id)
+        if job is None or job["task"].done():
+            return False
+        job["token"].cancel(reason)
+        return True
+
+    def running(self) -> list:
+        """The jobs that are still queued or running."""
+        return [job for job in self.jobs.values() if not job["task"].done()]
+
+    async def shutdown(self):
+        """Cancels every unfinished job and waits for them to wind down."""
+        pending = self.running()
+        for job in pending:
+            job["token"].cancel("session ended")
+        await asyncio.gather(*(job["task"] for job in pending), return_exceptions=True)
+
+    async def _run(self, job: dict):
+        """Runs one job, printing its progress and then its answer."""
+        def report(message):
+            if self.show_progress:
+                print(f"[job {job['id']}] {message}")
+
+        try:
+            # Attached while queued too, so a waiting job can be cancelled.
+            with job["token"].attach():
+                async with self._slots:
+                    job["status"] = "running"
+                    job["started"] = time.monotonic()
+                    job["answer"] = await self.agent.run(
+                        job["query"], on_progress=report, cancel_token=job["token"], memory=self.memory
+                    )
+            job["status"] = "done"
+            print(f"\n--- Analysis [job {job['id']}]: {job['query']} ---")
+            print(job["answer"])
+            print("-" * 20 + "\n")
+        except RunCancelled as e:
+            job["status"] = "cancelled"
+            job["error"] = e.reason
+            print(f"[job {job['id']}] Cancelled ({e.reason}).")
+        except Exception as e:
+            job["status"] = "failed"
+            job["error"] = str(e)
+            print(f"\n[job {job['id']}] An unexpected error occurred: {e}")
+        finally:
+            job["finished"] = time.monotonic()
+
+def format_job(job: dict) -> str:
+    """One line of the 'jobs' listing."""
+    end = job["finished"] or time.monotonic()
+    elapsed = f"{end - job['started']:.1f}s" if job["started"] else "-"
+    query = job["query"] if len(job["query"]) <= 60 else job["query"][:57] + "..."
+    return f"  #{job['id']:<4} {job['status']:<9} {elapsed:>7}  {query}"
+
+def handle_command(command: str, queries: BackgroundQueries) -> bool:
+    """
+    Executes one line of user input.
+
+    Returns:
+        bool: False when the user asked to leave.
+    """
+    word, _, argument = command.partition(" ")
+    word, argument = word.lower(), argument.strip()
+
+    # Check for exit commands
+    if command.lower() in ["exit", "quit"]:
+        return False
+    if command.lower() == "help":
+        print(HELP_TEXT)
+    elif command.lower() == "jobs":
+        if not queries.jobs:
+            print("No jobs yet.")
+        for job in queries.jobs.values():
+            print(format_job(job))
+    elif word == "show" and argument.isdigit():
+        job = queries.jobs.get(int(argument))
+        if job is None:
+            print(f"Job {argument} not found.")
+        elif job["status"] == "done":
+            print(job["answer"])
+        else:
+            print(f"Job {job['id']} is {job['status']}. {job['error'] or ''}")
+    elif word == "cancel" and argument == "all":
+        pending = queries.running()
+        for job in pending:
+            queries.cancel(job["id"])
+        print(f"Cancelling {len(pending)} job(s).")
+    elif word == "cancel" and argument.isdigit():
+        if not queries.cancel(int(argument)):
+            print(f"Job {argument} is not running.")
+    elif word == "progress" and argument in ("on", "off"):
+        queries.show_progress = argument == "on"
+        print(f"Progress output {argument}.")
+    elif word in COMMAND_USAGE:
+        # A mistyped command such as "cancel 3 4" must not start a (paid) analysis.
+        print(f"Usage: {COMMAND_USAGE[word]}")
+        print("To ask a question, start it with a word that is not a command.")
+    else:
+        # Anything else is a question for the agent
+        job_id = queries.submit(command)
+        print(f"Started job {job_id}. Type 'jobs' to see its status.")
+    return True
 
 async def main():
     """
     The main asynchronous function to run the agent.
-    Initializes the agent and enters a loop to process user queries.
+    Initializes the agent and reads commands while questions are analyzed in the background.
     """
     # Load configuration (e.g., API keys)
     load_config()
 
     # Create an instance of our specialized agent
     analyst_agent = SupplyChainAnalystAgent()
+    queries = BackgroundQueries(
+        analyst_agent,
+        max_concurrent=CLI_CONFIG["max_concurrent_queries"],
+        show_progress=CLI_CONFIG["show_progress"]
+    )
 
     # Display the initial welcome message to the user
     display_welcome_message()
 
-    while True:
-        try:
-            # Prompt the user for their question
-            user_query = input("Ask a question > ")
+    stdin = StdinReader()
+    try:
+        while True:
+            print("Ask a question > ", end="", flush=True)
+            user_query = await stdin.readline()
 
-            # Check for exit commands
-            if user_query.lower() in ["exit", "quit"]:
-                print("Thank you for using the Supply Chain Analyst AI. Goodbye!")
+            # End of input (e.g. Ctrl+D or a piped script): let queued questions finish
+            if user_query is None:
+                await asyncio.gather(*(job["task"] for job in queries.running()), return_exceptions=True)
                 break
 
             # If the query is empty, prompt again
+            user_query = user_query.strip()
             if not user_query:
                 continue
 
-            # Run the agent with the user's query and print the result
-            print("\nThinking...")
-            result = await analyst_agent.run(user_query)
-            print("\n--- Analysis ---")
-            print(result)
-            print("-" * 20 + "\n")
-
-        except KeyboardInterrupt:
-            print("\nSession interrupted by user. Exiting.")
-            break
-        except Exception as e:
-            print(f"\nAn unexpected error occurred: {e}")
-            print("Please try again.")
+            if not handle_command(user_query, queries):
+                break
+    finally:
+        if queries.running():
+            print(f"Cancelling {len(queries.running())} unfinished job(s).")
+        await queries.shutdown()
+    print("Thank you for using the Supply Chain Analyst AI. Goodbye!")
 
 if __name__ == "__main__":
     # Run the main asynchronous event loop
     try:
         asyncio.run(main())
     except KeyboardInterrupt:
-        print("\nProgram terminated.")
+        print("\nSession interrupted by user. Exiting.")
@@ -0,0 +1,97 @@
+# metrics.py
+# A small in-process metrics registry shared by the agent, the tools and the UIs.
+# It keeps counters, gauges and bounded latency samples so components can report
+# health and performance without any external monitoring dependency.
+
+import threading
+from collections import deque
+
+
+class MetricsRegistry:
+    """
+    Thread-safe store of counters, gauges and latency samples.
+
+    Latency samples are kept in fixed-size windows, so percentiles reflect
+    recent behaviour and memory use stays constant.
+    """
+
+    def __init__(self, window: int = 512):
+        """
+        Initializes an empty registry.
+
+        Args:
+            window (int): Number of recent samples kept per latency series.
+        """
+        self.window = window
+        self._lock = threading.Lock()
+        self._counters = {}
+        self._gauges = {}
+        self._samples = {}
+
+    def increment(self, name: str, value: float = 1):
+        """Adds `value` to a counter."""
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + value
+
+    def set_gauge(self, name: str, value):
+        """Sets a gauge to its current value (numbers or short state strings)."""
+        with self._lock:
+            self._gauges[name] = value
+
+    def observe(self, name: str, value: float):
+        """Records one sample (for example a latency in seconds) for a series."""
+        with self._lock:
+            samples = self._samples.get(name)
+            if samples is None:
+                samples = self._samples[name] = deque(maxlen=self.window)
+            samples.append(value)
+
+    def sample_count(self, name: str) -> int:
+        """Returns the number of samples currently held for a series."""
+        with self._lock:
+            return len(self._samples.get(name, ()))
+
+    def percentile(self, name: str, percentile: float, default: float = None) -> float:
+        """
+        Returns a percentile of the recent samples of a series.
+
+        Args:
+            name (str): The series name.
+            percentile (float): The percentile to compute, between 0 and 100.
+            default (float): Returned when the series has no samples.
+
+        Returns:
+            float: The nearest-rank percentile, or `default`.
+        """
+        with self._lock:
+            samples = sorted(self._samples.get(name, ()))
+        if not samples:
+            return default
+        rank = min(len(samples) - 1, max(0, int(round(percentile / 100.0 * len(samples))) - 1))
+        return samples[rank]
+
+    def snapshot(self) -> dict:
+        """
+        Returns a copy of all metrics.
+
+        Returns:
+            dict: 'counters' and 'gauges' as plain dicts, and 'latencies' with
+                count, p50 and p95 for every sample series.
+        """
+        with self._lock:
+            counters = dict(self._counters)
+            gauges = dict(self._gauges)
+            names = list(self._samples)
+        latencies = {
+            name: {
+                "count": self.sample_count(name),
+                "p50": self.percentile(name, 50),
+                "p95": self.percentile(name, 95),
+            }
+            for name in names
+        }
+        return {"counters": counters, "gauges": gauges, "latencies": latencies}
+
+
+# The process-wide registry used throughout the application.
+metrics = MetricsRegistry()
@@ -0,0 +1,184 @@
+# planner.py
+# Plan-and-execute engine for the analyst agent.
+# Instead of the serial think/search loop, the model is asked once for a full
+# research plan, all planned searches run concurrently through the tool layer,
+# and a single synthesis call writes the answer. An optional, bounded follow-up
+# round covers gaps the synthesis step identifies. For typical questions this
+# puts two LLM round trips on the critical path instead of one per step.
+
+import asyncio
+import re
+
+from cancellation import CancellationToken
+from prompts import (
+    PLANNER_PROMPT_TEMPLATE,
+    SYNTHESIS_FOLLOW_UP_INSTRUCTIONS,
+    SYNTHESIS_PROMPT_TEMPLATE,
+)
+from tools import parse_results
+
+_CALL_PATTERN = re.compile(
+    r"<call>\s*<tool>(?P<tool>.*?)</tool>\s*<tool_input>(?P<input>.*?)</tool_input>\s*</call>", re.DOTALL
+)
+
+
+def parse_calls(text: str) -> list:
+    """
+    Extracts the planned tool calls from a model reply.
+
+    Args:
+        text (str): The reply containing <call> elements.
+
+    Returns:
+        list: Unique (tool, input) tuples in the order they were planned.
+    """
+    calls = []
+    for match in _CALL_PATTERN.finditer(text):
+        call = (match.group("tool").strip(), match.group("input").strip())
+        if call[1] and call not in calls:
+            calls.append(call)
+    return calls
+
+
+class PlanAndExecuteEngine:
+    """
+    Runs an analysis as plan -> parallel tool calls -> synthesis.
+
+    The engine borrows the client, tools and helpers of a
+    `SupplyChainAnalystAgent`, and returns the same run record as
+    `SupplyChainAnalystAgent.analyze`.
+    """
+
+    def __init__(self, agent, max_queries: int = 6, follow_up_rounds: int = 1):
+        """
+        Args:
+            agent (SupplyChainAnalystAgent): Provides the model client and tools.
+            max_queries (int): Maximum tool calls per planning or follow-up round.
+            follow_up_rounds (int): Extra research rounds the synthesis step may request.
+        """
+        self.agent = agent
+        self.max_queries = max_queries
+        self.follow_up_rounds = follow_up_rounds
+
+    async def analyze(self, query: str, token_budget: int = None, on_progress=None,
+                      cancel_token: CancellationToken = None, run_record: dict = None, memory=None) -> dict:
+        """
+        Answers a query with one planning call and one synthesis call per round.
+
+        Args:
+            query (str): The user's question.
+            token_budget (int): Prompt tokens all observations together may take.
+            on_progress (callable): Receives each progress message; defaults to print.
+            cancel_token (CancellationToken): Checked before every round; the
+                caller attaches it to the task running the analysis.
+            run_record (dict): A record to fill in, so the caller keeps what
+                was gathered if the run is cancelled. Its 'evidence', if any,
+                is shown to both the planning and the synthesis call.
+            memory (SessionMemory): Answers planned calls that repeat an
+                earlier search of the conversation.
+
+        Returns:
+            dict: The run record ('query', 'answer', 'steps', 'observations');
+                'steps' counts LLM calls.
+        """
+        if run_record is None:
+            run_record = {"query": query, "answer": "", "steps": 0, "observations": [], "evidence": ""}
+        cancel_token = cancel_token or CancellationToken()
+        report = on_progress or print
+
+        report("--- Planning ---")
+        tools = self._planning_tools(run_record)
+        plan_prompt = PLANNER_PROMPT_TEMPLATE.format(
+            max_queries=self.max_queries,
+            tools_summary=self.agent._get_tools_summary(tools),
+            tools_details=self.agent._get_tools_details(tools),
+        )
+        with cancel_token.tracking("llm"):
+            plan = await self.agent.complete([
+                {"role": "system", "content": plan_prompt},
+                {"role": "user", "content": self.agent.question_message(run_record)},
+            ])
+        run_record["steps"] += 1
+        withheld = {tool.name for tool in self.agent.tools} - {tool.name for tool in tools}
+        calls = [call for call in parse_calls(plan) if call[0] not in withheld]
+        calls = calls[:self.max_queries] or [(self._default_tool(), query)]
+
+        follow_ups_left = self.follow_up_rounds
+        while True:
+            cancel_token.raise_if_cancelled()
+            await self._execute(calls, run_record, token_budget, report, cancel_token, memory)
+
+            cancel_token.raise_if_cancelled()
+            can_follow_up = follow_ups_left > 0
+            report("--- Synthesizing ---")
+            with cancel_token.tracking("llm"):
+                reply = await self.agent.complete([{"role": "user", "content": self._synthesis_prompt(
+                    query, run_record["observations"], can_follow_up, run_record.get("evidence", "")
+                )}])
+            run_record["steps"] += 1
+
+            if "<answer>" in reply:
+                run_record["answer"] = self.agent._extract_content(reply, "answer")
+                return run_record
+
+            already_run = {(obs["tool"], obs["input"]) for obs in run_record["observations"]}
+            calls = [call for call in parse_calls(reply) if call not in already_run][:self.max_queries]
+            if not can_follow_up or not calls:
+                # A reply without the expected tags is still the model's best answer.
+                run_record["answer"] = reply.strip() or "The agent could not synthesize an answer."
+                return run_record
+            follow_ups_left -= 1
+            report(f"Synthesis requested {len(calls)} follow-up search(es).")
+
+    async def _execute(self, calls: list, run_record: dict, token_budget: int = None, report=print,
+                       cancel_token: CancellationToken = None, memory=None):
+        """Runs a round of tool calls concurrently and records their observations."""
+        cancel_token = cancel_token or CancellationToken()
+        per_call_budget = token_budget // len(calls) if token_budget else None
+
+        async def execute(tool_name, tool_input):
+            tool = self.agent.find_tool(tool_name)
+            if tool is None:
+                return f"Tool '{tool_name}' not found.", False, tool_input
+            report(f"Running tool: {tool_name} with input: '{tool_input}'")
+            return await self.agent.use_tool(
+                tool, tool_input, per_call_budget, cancel_token, memory, report, run_record
+            )
+
+        outputs = await asyncio.gather(*(execute(tool_name, tool_input) for tool_name, tool_input in calls))
+        for (tool_name, _), (output, reused, tool_input) in zip(calls, outputs):
+            context, compression = self.agent.compress_observation(
+                f"{run_record['query']} {tool_input}", output, per_call_budget
+            )
+            run_record["observations"].append({
+                "tool": tool_name, "input": tool_input, "output": output,
+                "context": context, "compression": compression, "reused": reused
+            })
+
+    def _planning_tools(self, run_record: dict) -> list:
+        """
+        The tools offered to the planning call.
+
+        Tools declaring `known_urls_only` are left out unless the run's
+        evidence already holds results: the plan runs before any observation,
+        so a call to them could only be refused.
+        """
+        if parse_results(run_record.get("evidence") or ""):
+            return list(self.agent.tools)
+        return [tool for tool in self.agent.tools if not tool.known_urls_only]
+
+    def _synthesis_prompt(self, query: str, observations: list, can_follow_up: bool, evidence: str = "") -> str:
+        """Builds the synthesis prompt from the prior evidence and every observation gathered so far."""
+        blocks = [f"<earlier_evidence>\n{evidence}\n</earlier_evidence>"] if evidence else []
+        blocks += [
+            f"<observation tool='{obs['tool']}' input='{obs['input']}'>\n{obs['context']}\n</observation>"
+            for obs in observations
+        ]
+        follow_up = SYNTHESIS_FOLLOW_UP_INSTRUCTIONS.format(max_queries=self.max_queries) if can_follow_up else ""
+        return SYNTHESIS_PROMPT_TEMPLATE.format(
+            query=query, observations="\n\n".join(blocks), follow_up_instructions=follow_up
+        )
+
+    def _default_tool(self) -> str:
+        """The tool used for the whole question when the plan could not be parsed."""
+        return self.agent.tools.names()[0]
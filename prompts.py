@@ -34,3 +34,90 @@ Here are the detailed specifications for each tool:
 
 Begin your response with a `<thought>` tag.
 """
+
+# Used by the watchlist to revise a previous answer when new evidence appears,
+# instead of repeating the full multi-step analysis.
+WATCHLIST_UPDATE_PROMPT_TEMPLATE = """
+You are a professional AI assistant, acting as an expert Supply Chain Risk Analyst.
+You previously answered a monitoring question. New search results have appeared since then.
+
+**Monitoring question:**
+{query}
+
+**Your previous answer:**
+{previous_answer}
+
+**New or changed evidence:**
+{new_evidence}
+
+**Your Task:**
+1.  Decide what the new evidence changes about the risk picture.
+2.  Rewrite the answer so it reflects the current situation, keeping the parts that still hold.
+3.  Cite the sources you used, including the new ones.
+4.  Start the answer with a short "What changed" paragraph summarizing the update.
+
+Provide the updated answer inside an `<answer>` tag.
+"""
+
+# Added to a follow-up question: evidence the same conversation already gathered.
+SESSION_EVIDENCE_TEMPLATE = """
+
+**Evidence gathered earlier in this conversation:**
+<earlier_evidence>
+{evidence}
+</earlier_evidence>
+
+Build on this evidence and cite it where it is relevant. Only search for what it does not already cover;
+if it fully answers the question, you may answer right away.
+"""
+
+# Used by the plan-and-execute engine: one call plans every search up front.
+PLANNER_PROMPT_TEMPLATE = """
+You are a professional AI assistant, acting as an expert Supply Chain Risk Analyst.
+Plan the research needed to answer the user's question about global supply chain risks.
+
+**Your Task:**
+1.  Break the question down into independent, specific sub-questions.
+2.  Write one tool call for each sub-question. All of them will be run at the same time,
+    so no call may depend on the result of another.
+3.  Use at most {max_queries} tool calls, and fewer when the question is simple.
+
+**Available Tools:**
+{tools_summary}
+
+**Tool Details:**
+{tools_details}
+
+Respond with the plan only, in this exact format:
+<plan>
+<call><tool>tool_name</tool><tool_input>specific query</tool_input></call>
+...
+</plan>
+"""
+
+# Used by the plan-and-execute engine: one call turns all observations into the answer.
+SYNTHESIS_PROMPT_TEMPLATE = """
+You are a professional AI assistant, acting as an expert Supply Chain Risk Analyst.
+Answer the user's question using the research results below.
+
+**User question:**
+{query}
+
+**Research results:**
+{observations}
+
+**Your Task:**
+Synthesize the results into a clear, concise and well-supported answer, and cite the sources you used.
+{follow_up_instructions}
+Provide the final answer inside an `<answer>` tag.
+"""
+
+# Appended to the synthesis prompt while a follow-up research round is still allowed.
+SYNTHESIS_FOLLOW_UP_INSTRUCTIONS = """
+If the results leave an important gap that prevents a sound answer, you may instead request
+one more round of research: respond with up to {max_queries} tool calls in the format
+<follow_up>
+<call><tool>tool_name</tool><tool_input>specific query</tool_input></call>
+</follow_up>
+and nothing else. Only do this when the gap really matters.
+"""
@@ -0,0 +1,211 @@
+# resilience.py
+# Building blocks that keep the agent responsive when an external backend is
+# slow or failing: a circuit breaker, hedged requests and a small result cache
+# to fall back on while a backend is unavailable.
+
+import asyncio
+import threading
+import time
+from collections import OrderedDict
+
+from metrics import metrics
+
+
+class CircuitBreaker:
+    """
+    Classic three-state circuit breaker.
+
+    - closed: calls go through; consecutive failures are counted.
+    - open: after `failure_threshold` consecutive failures, calls are rejected
+      immediately for `recovery_timeout` seconds.
+    - half_open: after the timeout, a single probe call is let through. Success
+      closes the breaker, failure opens it again. A probe that is cancelled must
+      be released with `release_probe`; one that never reports back is given up
+      on after `probe_timeout` seconds, so the breaker cannot get stuck.
+
+    The current state is published as the gauge '<name>.breaker_state'.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, name: str, failure_threshold: int = 5, recovery_timeout: float = 30.0,
+                 probe_timeout: float = 60.0):
+        """
+        Initializes a closed breaker.
+
+        Args:
+            name (str): Prefix used for the breaker's metrics.
+            failure_threshold (int): Consecutive failures that open the breaker.
+            recovery_timeout (float): Seconds to stay open before probing again.
+            probe_timeout (float): Seconds after which an unanswered probe no
+                longer blocks the next one.
+        """
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self.probe_timeout = probe_timeout
+        self._lock = threading.Lock()
+        self._state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+        self._probe_started = 0.0
+        metrics.set_gauge(f"{self.name}.breaker_state", self._state)
+
+    @property
+    def state(self) -> str:
+        """The current state, taking an elapsed recovery timeout into account."""
+        with self._lock:
+            if self._state == self.OPEN and time.monotonic() - self._opened_at >= self.recovery_timeout:
+                self._set_state(self.HALF_OPEN)
+            return self._state
+
+    def allow_request(self) -> bool:
+        """
+        Decides whether a call may go to the backend right now.
+
+        Returns:
+            bool: False while the breaker is open, or while a half-open probe
+                is already in flight.
+        """
+        state = self.state
+        with self._lock:
+            if state == self.CLOSED:
+                return True
+            if state == self.HALF_OPEN and self._probe_in_flight:
+                if time.monotonic() - self._probe_started >= self.probe_timeout:
+                    self._probe_in_flight = False
+                    metrics.increment(f"{self.name}.breaker_probe_timeouts")
+            if state == self.HALF_OPEN and not self._probe_in_flight:
+                self._probe_in_flight = True
+                self._probe_started = time.monotonic()
+                return True
+        metrics.increment(f"{self.name}.breaker_rejections")
+        return False
+
+    def record_success(self):
+        """Reports a successful call."""
+        with self._lock:
+            self._failures = 0
+            self._probe_in_flight = False
+            if self._state != self.CLOSED:
+                self._set_state(self.CLOSED)
+
+    def release_probe(self):
+        """Reports a call that ended without an outcome (e.g. cancelled); frees the probe slot."""
+        with self._lock:
+            self._probe_in_flight = False
+
+    def record_failure(self):
+        """Reports a failed call; may open the breaker."""
+        with self._lock:
+            self._failures += 1
+            self._probe_in_flight = False
+            if self._state == self.HALF_OPEN or self._failures >= self.failure_threshold:
+                self._opened_at = time.monotonic()
+                if self._state != self.OPEN:
+                    self._set_state(self.OPEN)
+                    metrics.increment(f"{self.name}.breaker_opened")
+
+    def _set_state(self, state: str):
+        """Changes state and publishes it. Must be called with the lock held."""
+        self._state = state
+        metrics.set_gauge(f"{self.name}.breaker_state", state)
+
+
+async def hedged_call(make_attempt, hedge_delay: float, name: str, latency_metric: str = None):
+    """
+    Runs an attempt and, if it is still pending after `hedge_delay` seconds,
+    starts a second identical attempt. The first attempt to succeed wins and
+    the other one is cancelled.
+
+    Only the first attempt's latency is sampled, since that is the latency
+    the hedge delay is a percentile of. When it is cancelled (the hedge won,
+    or the caller gave up), the time it had run so far is sampled as a lower
+    bound. Leaving those slow attempts out would pull the percentile, and
+    with it the delay, down until hedges fire far more often than intended.
+
+    Args:
+        make_attempt: A zero-argument callable returning a new coroutine per attempt.
+        hedge_delay (float): Seconds to wait before firing the hedge.
+        name (str): Prefix used for the hedging metrics.
+        latency_metric (str): Metric that receives the first attempt's latency.
+
+    Returns:
+        The result of the first successful attempt.
+
+    Raises:
+        Exception: The error of the last attempt if every attempt failed.
+    """
+    started = time.perf_counter()
+    attempts = [asyncio.ensure_future(make_attempt())]
+    if latency_metric:
+        def observe(task):
+            # Failed attempts are not latency samples; cancelled ones are lower bounds.
+            if task.cancelled() or task.exception() is None:
+                metrics.observe(latency_metric, time.perf_counter() - started)
+
+        attempts[0].add_done_callback(observe)
+    try:
+        done, _ = await asyncio.wait(attempts, timeout=hedge_delay)
+        if done:
+            return attempts[0].result()
+
+        metrics.increment(f"{name}.hedges_fired")
+        attempts.append(asyncio.ensure_future(make_attempt()))
+        pending = set(attempts)
+        error = None
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is None:
+                    if task is attempts[1]:
+                        metrics.increment(f"{name}.hedges_won")
+                    return task.result()
+                error = task.exception()
+        raise error
+    finally:
+        # Also reached when the caller is cancelled: never leave an attempt running.
+        for task in attempts:
+            if not task.done():
+                task.cancel()
+
+
+class TTLCache:
+    """Bounded LRU cache whose entries expire after `ttl` seconds."""
+
+    def __init__(self, max_entries: int = 256, ttl: float = 900.0):
+        """
+        Initializes an empty cache.
+
+        Args:
+            max_entries (int): Maximum number of entries kept.
+            ttl (float): Seconds after which an entry expires.
+        """
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+
+    def get(self, key):
+        """Returns the cached value for a key, or None if it is absent or expired."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            stored_at, value = entry
+            if time.monotonic() - stored_at > self.ttl:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        """Stores a value, evicting the least recently used entry if full."""
+        with self._lock:
+            self._entries[key] = (time.monotonic(), value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
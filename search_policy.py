@@ -0,0 +1,150 @@
+# search_policy.py
+# Decides how expensive each search should be. Searches start at the cheap
+# "basic" depth and escalate to "advanced" only when the results are sparse or
+# weakly relevant; the number of results is sized from the token budget of the
+# current agent step. Every tier's latency and quality is recorded so the
+# thresholds can be tuned from real traffic.
+
+import atexit
+import json
+import logging
+import os
+import time
+from functools import lru_cache
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+from queue import SimpleQueue
+
+from app_config import SEARCH_POLICY_CONFIG
+from metrics import metrics
+
+TIERS = ("basic", "advanced")
+
+
+@lru_cache(maxsize=None)
+def _outcome_logger(path: str, max_bytes: int, backups: int) -> logging.Logger:
+    """
+    Returns a logger that appends outcome lines to `path`, rotating the file.
+
+    Records are only queued on the caller's thread (the event loop); a
+    background listener thread does the file I/O. One logger per path is
+    shared by every policy in the process.
+    """
+    file_handler = RotatingFileHandler(path, maxBytes=max_bytes, backupCount=backups, encoding="utf-8", delay=True)
+    file_handler.setFormatter(logging.Formatter("%(message)s"))
+    records = SimpleQueue()
+    listener = QueueListener(records, file_handler)
+    listener.start()
+    atexit.register(listener.stop)
+
+    logger = logging.getLogger(f"search_outcomes.{path}")
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+    logger.addHandler(QueueHandler(records))
+    return logger
+
+
+class SearchPolicy:
+    """
+    Adaptive depth and result-count policy for the news search tool.
+
+    Outcomes are published as metrics under 'search.tier.<tier>.*' and, when
+    `outcome_log_path` is configured, appended one JSON object per line so
+    the thresholds in `SEARCH_POLICY_CONFIG` can be tuned offline. The log is
+    off by default, written off the event loop and rotated by size; a
+    "{pid}" in the path gives each worker process its own file.
+    """
+
+    def __init__(self, config: dict = None):
+        """
+        Initializes the policy.
+
+        Args:
+            config (dict): Overrides for `SEARCH_POLICY_CONFIG`.
+        """
+        self.config = dict(SEARCH_POLICY_CONFIG, **(config or {}))
+        log_path = self.config.get("outcome_log_path")
+        if log_path and not os.path.isabs(log_path):
+            log_path = os.path.join(os.path.dirname(__file__), log_path)
+        self.outcome_log_path = log_path.format(pid=os.getpid()) if log_path else None
+        self._outcome_log = _outcome_logger(
+            self.outcome_log_path, self.config["outcome_log_max_bytes"], self.config["outcome_log_backups"]
+        ) if self.outcome_log_path else None
+
+    def max_results(self, tier: str, token_budget: int = None) -> int:
+        """
+        Sizes the result count so the observation fits the step's token budget.
+
+        Args:
+            tier (str): The search depth the results are requested at.
+            token_budget (int): Tokens available for this step's observation,
+                or None when the caller has no budget.
+
+        Returns:
+            int: The number of results to request.
+        """
+        if token_budget is None:
+            return self.config["default_max_results"]
+        per_result = metrics.percentile(
+            f"search.tier.{tier}.tokens_per_result", 50,
+            default=self.config["default_tokens_per_result"][tier]
+        )
+        fitting = int(token_budget // max(per_result, 1))
+        return max(self.config["min_results"], min(self.config["max_results_cap"], fitting))
+
+    def should_escalate(self, results: list) -> bool:
+        """
+        Decides whether basic-depth results are too thin to use.
+
+        Args:
+            results (list): The raw results of the basic search.
+
+        Returns:
+            bool: True when there are too few results or their best relevance
+                score is below the configured threshold.
+        """
+        if len(results) < self.config["escalate_below_results"]:
+            return True
+        return self._top_score(results) < self.config["escalate_below_score"]
+
+    def record(self, tier: str, query: str, latency: float, results: list, observation_tokens: int,
+               escalated: bool = False):
+        """
+        Records the latency and quality outcome of one search tier.
+
+        Args:
+            tier (str): The search depth used.
+            query (str): The search query.
+            latency (float): Seconds the tier took, including any hedge.
+            results (list): The raw results returned.
+            observation_tokens (int): Estimated prompt tokens of the formatted results.
+            escalated (bool): Whether these results triggered an escalation.
+        """
+        prefix = f"search.tier.{tier}"
+        top_score = self._top_score(results)
+        metrics.increment(f"{prefix}.calls")
+        metrics.observe(f"{prefix}.latency", latency)
+        metrics.observe(f"{prefix}.top_score", top_score)
+        metrics.observe(f"{prefix}.result_count", len(results))
+        if results:
+            metrics.observe(f"{prefix}.tokens_per_result", observation_tokens / len(results))
+        if escalated:
+            metrics.increment(f"{prefix}.escalations")
+
+        if self._outcome_log is None:
+            return
+        record = {
+            "timestamp": time.time(),
+            "tier": tier,
+            "query": query,
+            "latency": round(latency, 4),
+            "result_count": len(results),
+            "top_score": round(top_score, 4),
+            "observation_tokens": observation_tokens,
+            "escalated": escalated,
+        }
+        self._outcome_log.info(json.dumps(record))
+
+    @staticmethod
+    def _top_score(results: list) -> float:
+        """The best relevance score among the results (0 when there are none)."""
+        return max((float(result.get("score") or 0.0) for result in results), default=0.0)
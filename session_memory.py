@@ -0,0 +1,240 @@
+# session_memory.py
+# Evidence memory for one conversation.
+# Every search result and answer of a session's earlier runs is kept in a small
+# index. A follow-up question ("what about the automotive impact?") is seeded
+# with the most relevant prior evidence, ranked with the same BM25 scorer as
+# observation compression, and tool calls that repeat an earlier search are
+# answered from memory instead of hitting the search backend again.
+# Like the chat history windows, memories are bounded by age, per session and
+# across all sessions of the process.
+
+import threading
+import time
+import weakref
+
+import numpy as np
+
+from app_config import MEMORY_CONFIG
+from compression import get_compressor
+from metrics import metrics
+from text_processing import estimate_tokens, hash_tokens
+from tools import format_results, parse_results
+
+# Every live memory of this process, for the cap across sessions. Memories of
+# ended sessions drop out as they are garbage collected.
+_memories = weakref.WeakSet()
+_memories_lock = threading.Lock()
+
+
+def memory_usage() -> dict:
+    """Returns the number of session memories in this process and the bytes they hold."""
+    with _memories_lock:
+        memories = list(_memories)
+    return {"sessions": len(memories), "bytes": sum(memory.bytes for memory in memories)}
+
+
+def _size(*texts: str) -> int:
+    """Approximates the memory held by an entry's text."""
+    return sum(len(text.encode("utf-8")) for text in texts)
+
+
+def _input_key(tool_input: str) -> str:
+    """Normalizes a tool input for exact-repeat detection."""
+    return " ".join(tool_input.lower().split())
+
+
+def _token_set(text: str) -> np.ndarray:
+    """The distinct token hashes of a text."""
+    return np.unique(hash_tokens([text])[0])
+
+
+class SessionMemory:
+    """
+    Search results, tool calls and answers gathered earlier in one session.
+
+    A memory belongs to exactly one conversation (a Streamlit session or a CLI
+    session); it is never shared between users, and entries older than
+    MEMORY_CONFIG["max_age"] are ignored so stale news is searched again.
+
+    Expired entries are dropped whenever a run is added, the oldest entries
+    are dropped once the memory exceeds `max_session_bytes`, and the memories
+    of the least recently used sessions are emptied when all memories of the
+    process together exceed `max_total_bytes`.
+    """
+
+    def __init__(self, max_results: int = None, max_age: float = None,
+                 max_session_bytes: int = None, max_total_bytes: int = None):
+        """
+        Args:
+            max_results (int): Search results kept; the oldest are dropped first.
+            max_age (float): Seconds after which remembered evidence is dropped.
+            max_session_bytes (int): Memory cap for this session's entries.
+            max_total_bytes (int): Memory cap for all session memories together.
+        """
+        self.max_results = max_results or MEMORY_CONFIG["max_results"]
+        self.max_age = max_age or MEMORY_CONFIG["max_age"]
+        self.max_session_bytes = max_session_bytes or MEMORY_CONFIG["max_session_bytes"]
+        self.max_total_bytes = max_total_bytes or MEMORY_CONFIG["max_total_bytes"]
+        # Oldest first; re-added entries move to the end.
+        self.results = []       # {"title", "url", "content", "added", "size"}
+        self.calls = {}         # (tool, normalized input) -> {"output", "tokens", "added", "size"}
+        self.turns = []         # {"query", "answer", "added", "size"}
+        self.bytes = 0
+        self.last_used = time.monotonic()
+        self._lock = threading.Lock()
+        with _memories_lock:
+            _memories.add(self)
+
+    def __len__(self):
+        return len(self.results)
+
+    def add_run(self, run_record: dict):
+        """
+        Remembers the evidence and answer of a finished (or cancelled) run.
+
+        Observations that were themselves served from memory are skipped.
+        """
+        now = time.time()
+        with self._lock:
+            fresh = self._fresh_since()
+            results = {result["url"]: result for result in self.results if result["added"] >= fresh}
+            calls = {key: call for key, call in self.calls.items() if call["added"] >= fresh}
+            turns = [turn for turn in self.turns if turn["added"] >= fresh]
+
+            for obs in run_record["observations"]:
+                if obs.get("reused"):
+                    continue
+                parsed = parse_results(obs["output"])
+                if not parsed:
+                    # Errors and empty searches are worth repeating later.
+                    continue
+                key = (obs["tool"], _input_key(obs["input"]))
+                calls.pop(key, None)
+                calls[key] = {"output": obs["output"], "tokens": _token_set(obs["input"]),
+                              "added": now, "size": _size(obs["input"], obs["output"])}
+                for result in parsed:
+                    # A newer copy of the same page replaces the old one.
+                    results.pop(result["url"], None)
+                    results[result["url"]] = dict(
+                        result, added=now, size=_size(result["title"], result["url"], result["content"])
+                    )
+            if run_record["answer"]:
+                turns.append({"query": run_record["query"], "answer": run_record["answer"], "added": now,
+                              "size": _size(run_record["query"], run_record["answer"])})
+
+            self.results = list(results.values())[-self.max_results:]
+            self.calls = calls
+            self.turns = turns[-MEMORY_CONFIG["recall_answers"]:]
+            self._trim()
+            self.last_used = time.monotonic()
+        self._enforce_global_cap()
+        metrics.set_gauge("memory.bytes", memory_usage()["bytes"])
+
+    def clear(self):
+        """Forgets everything this session remembered."""
+        with self._lock:
+            self.results, self.calls, self.turns, self.bytes = [], {}, [], 0
+
+    def lookup(self, tool_name: str, tool_input: str):
+        """
+        Returns the remembered output of an equivalent earlier tool call, or None.
+
+        A call is equivalent when it used the same tool and its input matches
+        after normalization, or shares at least MEMORY_CONFIG["reuse_similarity"]
+        of its distinct words (Jaccard) with the earlier input.
+        """
+        fresh = self._fresh_since()
+        call = self.calls.get((tool_name, _input_key(tool_input)))
+        if call is None:
+            tokens = _token_set(tool_input)
+            best = 0.0
+            for (name, _), candidate in self.calls.items():
+                if name != tool_name or candidate["added"] < fresh:
+                    continue
+                union = len(np.union1d(tokens, candidate["tokens"]))
+                similarity = len(np.intersect1d(tokens, candidate["tokens"])) / union if union else 0.0
+                if similarity > best:
+                    best, call = similarity, candidate
+            if best < MEMORY_CONFIG["reuse_similarity"]:
+                call = None
+        if call is None or call["added"] < fresh:
+            return None
+        metrics.increment("memory.reused_calls")
+        return call["output"]
+
+    def recall(self, query: str, token_budget: int = None) -> tuple:
+        """
+        Selects the prior evidence most relevant to a new question.
+
+        Results are ranked with BM25 against the question together with the
+        previous question, since follow-ups are often elliptical.
+
+        Args:
+            query (str): The new question.
+            token_budget (int): Tokens the evidence may take. Defaults to
+                MEMORY_CONFIG["recall_token_budget"].
+
+        Returns:
+            tuple: (evidence text, or "" when nothing relevant is remembered;
+                number of search results included).
+        """
+        token_budget = token_budget or MEMORY_CONFIG["recall_token_budget"]
+        fresh = self._fresh_since()
+        turns = [turn for turn in self.turns if turn["added"] >= fresh]
+        candidates = [result for result in self.results if result["added"] >= fresh]
+        if not turns and not candidates:
+            return "", 0
+        self.last_used = time.monotonic()
+
+        blocks = []
+        for turn in turns:
+            answer = turn["answer"]
+            if len(answer) > MEMORY_CONFIG["max_answer_chars"]:
+                answer = answer[:MEMORY_CONFIG["max_answer_chars"]].rsplit(" ", 1)[0] + " ..."
+            blocks.append(f"Earlier question: {turn['query']}\nEarlier answer: {answer}")
+        remaining = token_budget - sum(estimate_tokens(block) for block in blocks)
+
+        focus = f"{query} {turns[-1]['query']}" if turns else query
+        compressor = get_compressor()
+        scores = compressor.bm25_scores(focus, [f"{result['title']} {result['content']}" for result in candidates])
+        order = np.argsort(-scores, kind="stable")[:MEMORY_CONFIG["recall_results"]]
+        selected = [candidates[index] for index in order.tolist() if scores[index] > 0]
+        if selected and remaining > 0:
+            # Fetched articles are long; keep only their sentences about the question.
+            evidence, _ = compressor.compress(focus, format_results(selected), remaining)
+            blocks.append(evidence)
+        else:
+            selected = []
+
+        metrics.increment("memory.recalls")
+        metrics.increment("memory.recalled_results", len(selected))
+        return "\n\n".join(blocks), len(selected)
+
+    def _trim(self):
+        """Drops the oldest results and calls until the session cap holds; the caller holds the lock."""
+        self.bytes = sum(entry["size"] for entries in (self.results, self.calls.values(), self.turns)
+                         for entry in entries)
+        calls = list(self.calls.items())
+        while self.bytes > self.max_session_bytes and (self.results or calls):
+            if calls and (not self.results or calls[0][1]["added"] <= self.results[0]["added"]):
+                _, dropped = calls.pop(0)
+            else:
+                dropped = self.results.pop(0)
+            self.bytes -= dropped["size"]
+        self.calls = dict(calls)
+
+    def _enforce_global_cap(self):
+        """Empties the least recently used other memories until the cap across sessions holds."""
+        with _memories_lock:
+            others = sorted((memory for memory in _memories if memory is not self), key=lambda m: m.last_used)
+            total = self.bytes + sum(memory.bytes for memory in others)
+            for memory in others:
+                if total <= self.max_total_bytes:
+                    break
+                total -= memory.bytes
+                memory.clear()
+                metrics.increment("memory.evicted_sessions")
+
+    def _fresh_since(self) -> float:
+        """The oldest timestamp still considered fresh."""
+        return time.time() - self.max_age
@@ -0,0 +1,101 @@
+# tests/conftest.py
+# Makes the application modules importable from the tests and provides the
+# scripted LLM client, canned tools and network guard the agent tests use.
+
+import os
+import socket
+import sys
+from types import SimpleNamespace
+
+import httpx
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app_config import ANALYTICS_CONFIG  # noqa: E402
+from tool_registry import ToolRegistry  # noqa: E402
+from tools import ArticleFetchTool, BaseTool, format_results  # noqa: E402
+
+PARAGRAPH = "<p>Port congestion in Rotterdam is delaying container vessels by several days this week.</p>"
+
+
+def observation_count(messages: list) -> int:
+    """How many tool observations a ReAct conversation holds so far."""
+    return sum(1 for message in messages if message["role"] == "user" and message["content"].startswith("<observation>"))
+
+
+def tool_call(tool: str, tool_input: str) -> str:
+    """A ReAct reply calling a tool."""
+    return f"<thought>I need more information.</thought><tool>{tool}</tool><tool_input>{tool_input}</tool_input>"
+
+
+class ScriptedClient:
+    """An OpenAI-compatible client whose replies come from `script(messages)`."""
+
+    def __init__(self, script):
+        self.script = script
+        self.requests = []
+        self.chat = SimpleNamespace(completions=self)
+
+    async def create(self, **kwargs):
+        self.requests.append(kwargs)
+        return SimpleNamespace(
+            choices=[SimpleNamespace(message=SimpleNamespace(role="assistant", content=self.script(kwargs["messages"])))],
+            usage=SimpleNamespace(prompt_tokens=100, completion_tokens=20, total_tokens=120),
+            model="scripted",
+        )
+
+
+class StubSearchTool(BaseTool):
+    """Answers every search with the same results."""
+    name = "supply_chain_news_search"
+    description = "Searches supply chain news."
+    details = "<tool_details><name>supply_chain_news_search</name></tool_details>"
+
+    def __init__(self, results: list):
+        self.results = results
+        self.calls = []
+
+    async def use(self, tool_input: str, token_budget: int = None) -> str:
+        self.calls.append(tool_input)
+        return format_results(self.results)
+
+
+class FakeWeb:
+    """An in-memory web for ArticleFetchTool: every public host serves one article."""
+
+    def __init__(self):
+        self.requested = []
+
+    async def resolve(self, host: str) -> list:
+        return ["93.184.216.34"]
+
+    def handler(self, request: httpx.Request) -> httpx.Response:
+        self.requested.append(f"{request.url.scheme}://{request.headers['host']}{request.url.raw_path.decode()}")
+        return httpx.Response(200, headers={"content-type": "text/html; charset=utf-8"},
+                              content=f"<html><head><title>Port news</title></head><body>{PARAGRAPH}</body></html>")
+
+    def fetch_tool(self) -> ArticleFetchTool:
+        return ArticleFetchTool(transport=httpx.MockTransport(self.handler), resolver=self.resolve)
+
+
+def registry(*tools) -> ToolRegistry:
+    """A tool registry holding exactly the given tools."""
+    return ToolRegistry(list(tools), entry_point_group="")
+
+
+@pytest.fixture(autouse=True)
+def no_analytics(monkeypatch):
+    """Keeps test runs out of the analytics store."""
+    monkeypatch.setitem(ANALYTICS_CONFIG, "enabled", False)
+
+
+@pytest.fixture
+def no_network(monkeypatch):
+    """Fails any attempt to open a network connection or resolve a host."""
+    def refuse(*args, **kwargs):
+        raise AssertionError("unexpected network access")
+
+    monkeypatch.setattr(socket.socket, "connect", refuse)
+    monkeypatch.setattr(socket.socket, "connect_ex", refuse)
+    monkeypatch.setattr(socket, "getaddrinfo", refuse)
@@ -0,0 +1,72 @@
+# tests/test_agent.py
+# The agent-side URL allowlist for tools declaring `known_urls_only`: only
+# URLs of earlier results may be fetched, and the filtered input is recorded.
+
+import asyncio
+
+from agent import SupplyChainAnalystAgent
+from session_memory import SessionMemory
+from tools import format_results
+from conftest import FakeWeb, ScriptedClient, StubSearchTool, observation_count, registry, tool_call
+
+RESULTS = [
+    {"title": "Port strike in Rotterdam", "url": "https://news.example/a",
+     "content": "Dock workers walked out; see http://evil.example/x for the union statement."},
+    {"title": "Typhoon closes Kaohsiung", "url": "https://news.example/b", "content": "Vessels are waiting offshore."},
+]
+
+
+def run_agent(fetch_input: str, engine: str = "react"):
+    web = FakeWeb()
+
+    def script(messages):
+        step = observation_count(messages)
+        if step == 0:
+            return tool_call("supply_chain_news_search", "port strike Rotterdam")
+        if step == 1:
+            return tool_call("fetch_articles", fetch_input)
+        return "<thought>Done.</thought><answer>Rotterdam is congested.</answer>"
+
+    agent = SupplyChainAnalystAgent(client=ScriptedClient(script), engine=engine,
+                                    tools=registry(StubSearchTool(RESULTS), web.fetch_tool()))
+    run_record = asyncio.run(agent.analyze("Risks in Rotterdam?", on_progress=lambda message: None))
+    return run_record, web
+
+
+def test_result_urls_are_fetched():
+    run_record, web = run_agent("https://news.example/a")
+    assert web.requested == ["https://news.example/a"]
+    assert "Rotterdam" in run_record["observations"][1]["output"]
+
+
+def test_url_mentioned_only_in_a_snippet_is_refused():
+    run_record, web = run_agent("http://evil.example/x")
+    assert web.requested == []
+    assert run_record["observations"][1]["output"].startswith("Error: Only URLs of results")
+    assert run_record["observations"][1]["input"] == ""
+
+
+def test_unknown_urls_are_dropped_and_the_filtered_input_recorded():
+    run_record, web = run_agent("https://news.example/a http://other.example/ http://127.0.0.1/admin")
+    observation = run_record["observations"][1]
+    assert web.requested == ["https://news.example/a"]
+    assert observation["input"] == "https://news.example/a"
+    assert observation["output"].startswith("Skipped 2 URL(s)")
+
+
+def test_url_from_remembered_evidence_is_fetched():
+    web = FakeWeb()
+    memory = SessionMemory()
+    memory.add_run({"query": "Port strike?", "answer": "There is a strike.", "observations": [
+        {"tool": "supply_chain_news_search", "input": "port strike", "output": format_results(RESULTS)}
+    ]})
+
+    def script(messages):
+        if observation_count(messages) == 0:
+            return tool_call("fetch_articles", "https://news.example/b")
+        return "<answer>Kaohsiung is closed.</answer>"
+
+    agent = SupplyChainAnalystAgent(client=ScriptedClient(script), engine="react",
+                                    tools=registry(StubSearchTool(RESULTS), web.fetch_tool()))
+    asyncio.run(agent.analyze("What about Kaohsiung port?", on_progress=lambda message: None, memory=memory))
+    assert web.requested == ["https://news.example/b"]
@@ -0,0 +1,104 @@
+# tests/test_analytics_store.py
+# The analytics store: automatic compaction, flushing on SIGTERM (also when
+# the signal interrupts a flush) and recording runs off the event loop.
+
+import asyncio
+import glob
+import os
+import signal
+import subprocess
+import sys
+import time
+
+import pytest
+
+from agent import SupplyChainAnalystAgent
+from analytics_store import AnalyticsStore
+from conftest import ScriptedClient, StubSearchTool, registry
+
+RUN = {"query": "Risks in Rotterdam?", "answer": "Congested.", "observations": [], "steps": 1}
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def files(root) -> list:
+    return glob.glob(os.path.join(str(root), "date=*", "*.parquet"))
+
+
+def test_flushes_compact_todays_partition(tmp_path):
+    store = AnalyticsStore(str(tmp_path), flush_rows=1, flush_interval=1e9, compact_files=4)
+    for _ in range(10):
+        store.record(RUN, latency=1.0, engine="react")
+    assert len(files(tmp_path)) < 4
+    assert store.summary()["runs"] == 10
+
+
+def run_until_terminated(tmp_path, code: str) -> int:
+    """Runs `code` in a child process with a store at `tmp_path`, SIGTERMs it once ready."""
+    child = subprocess.Popen([sys.executable, "-c", f"""
+import sys, time
+sys.path.insert(0, {ROOT!r})
+from analytics_store import AnalyticsStore
+store = AnalyticsStore({str(tmp_path)!r}, flush_rows=1000, flush_interval=1e9)
+run = {RUN!r}
+{code}
+"""], stdout=subprocess.PIPE, text=True)
+    assert child.stdout.readline().strip() == "ready"
+    child.send_signal(signal.SIGTERM)
+    return child.wait(timeout=20)
+
+
+@pytest.mark.skipif(sys.platform == "win32", reason="POSIX signals")
+def test_sigterm_flushes_buffered_rows(tmp_path):
+    exit_code = run_until_terminated(tmp_path, """
+store.record(run, latency=1.0, engine="react")
+print("ready", flush=True)
+time.sleep(30)
+""")
+    assert exit_code == -signal.SIGTERM
+    assert AnalyticsStore(str(tmp_path)).summary()["runs"] == 1
+
+
+@pytest.mark.skipif(sys.platform == "win32", reason="POSIX signals")
+def test_sigterm_during_a_flush_does_not_hang_or_lose_rows(tmp_path):
+    exit_code = run_until_terminated(tmp_path, """
+write = store._write
+def slow_write(date, table):
+    print("ready", flush=True)
+    time.sleep(1)   # the signal arrives here, inside flush
+    write(date, table)
+store._write = slow_write
+store.record(run, latency=1.0, engine="react")
+store.record(run, latency=1.0, engine="react")
+store.flush()
+time.sleep(30)
+""")
+    assert exit_code == -signal.SIGTERM
+    assert AnalyticsStore(str(tmp_path)).summary()["runs"] == 2
+
+
+def test_recording_a_run_does_not_block_the_event_loop(tmp_path):
+    class SlowStore(AnalyticsStore):
+        def record(self, *args, **kwargs):
+            time.sleep(0.5)
+            return super().record(*args, **kwargs)
+
+    store = SlowStore(str(tmp_path), flush_rows=1)
+    agent = SupplyChainAnalystAgent(client=ScriptedClient(lambda messages: "<answer>Congested.</answer>"),
+                                    engine="react", tools=registry(StubSearchTool([])), analytics=store)
+
+    async def main():
+        ticks = 0
+
+        async def ticker():
+            nonlocal ticks
+            while True:
+                await asyncio.sleep(0.05)
+                ticks += 1
+
+        task = asyncio.ensure_future(ticker())
+        await agent.analyze("Risks in Rotterdam?", on_progress=lambda message: None)
+        task.cancel()
+        return ticks
+
+    assert asyncio.run(main()) >= 5
+    assert store.summary()["runs"] == 1
@@ -0,0 +1,88 @@
+# tests/test_cassette.py
+# Record/replay through cassettes: a run recorded against fake services
+# replays offline to the same observations and answer, and tools keep their
+# limits and policies (such as the URL allowlist) under a cassette.
+
+import asyncio
+
+import pytest
+
+from agent import SupplyChainAnalystAgent
+from cassette import Cassette, CassetteChatClient, CassetteMiss, use_cassette
+from conftest import FakeWeb, ScriptedClient, StubSearchTool, observation_count, registry, tool_call
+from tool_registry import LIMIT_ATTRIBUTES
+
+RESULTS = [
+    {"title": "Port strike in Rotterdam", "url": "https://news.example/a",
+     "content": "Dock workers walked out; see http://evil.example/secret for details."},
+]
+
+
+def script(messages):
+    step = observation_count(messages)
+    if step == 0:
+        return tool_call("supply_chain_news_search", "port strike Rotterdam")
+    if step == 1:
+        return tool_call("fetch_articles", "http://evil.example/secret https://news.example/a")
+    return "<thought>Done.</thought><answer>Rotterdam is congested.</answer>"
+
+
+def test_cassette_tools_keep_the_wrapped_limits(tmp_path):
+    web = FakeWeb()
+    agent = SupplyChainAnalystAgent(client=ScriptedClient(script), engine="react",
+                                    tools=registry(StubSearchTool(RESULTS), web.fetch_tool()))
+    originals = {tool.name: tool for tool in agent.tools}
+    with use_cassette(agent, str(tmp_path / "run.jsonl.gz"), "record"):
+        for tool in agent.tools:
+            for name in LIMIT_ATTRIBUTES:
+                assert getattr(tool, name) == getattr(originals[tool.name], name), name
+    assert originals["fetch_articles"].known_urls_only
+
+
+def test_refused_url_is_still_refused_under_a_cassette(tmp_path):
+    web = FakeWeb()
+    agent = SupplyChainAnalystAgent(client=ScriptedClient(script), engine="react",
+                                    tools=registry(StubSearchTool(RESULTS), web.fetch_tool()))
+    with use_cassette(agent, str(tmp_path / "run.jsonl.gz"), "record"):
+        run_record = asyncio.run(agent.analyze("Risks in Rotterdam?", on_progress=lambda message: None))
+    assert web.requested == ["https://news.example/a"]
+    assert run_record["observations"][1]["input"] == "https://news.example/a"
+
+
+def record(path: str, engine: str = "react"):
+    web = FakeWeb()
+    search = StubSearchTool(RESULTS)
+    agent = SupplyChainAnalystAgent(client=ScriptedClient(script), engine=engine,
+                                    tools=registry(search, web.fetch_tool()))
+    with use_cassette(agent, path, "record", meta={"query": "Risks in Rotterdam?"}):
+        run_record = asyncio.run(agent.analyze("Risks in Rotterdam?", on_progress=lambda message: None))
+    return run_record, search, web
+
+
+def replay(path: str, tools, engine: str = "react"):
+    agent = SupplyChainAnalystAgent(client=CassetteChatClient(Cassette()), engine=engine, tools=tools)
+    with use_cassette(agent, path, "replay"):
+        return asyncio.run(agent.analyze("Risks in Rotterdam?", on_progress=lambda message: None))
+
+
+def test_replay_reproduces_the_recorded_run_offline(tmp_path, no_network):
+    path = str(tmp_path / "run.jsonl.gz")
+    recorded, search, web = record(path)
+    calls, requested = list(search.calls), list(web.requested)
+
+    replayed = replay(path, registry(search, web.fetch_tool()))
+    assert replayed["answer"] == recorded["answer"] == "Rotterdam is congested."
+    assert replayed["observations"] == recorded["observations"]
+    assert replayed["steps"] == recorded["steps"]
+    # Nothing was called again: no search, no fetch, no LLM.
+    assert search.calls == calls and web.requested == requested
+
+
+def test_replay_of_an_unrecorded_question_fails_loudly(tmp_path, no_network):
+    path = str(tmp_path / "run.jsonl.gz")
+    record(path)
+    agent = SupplyChainAnalystAgent(client=CassetteChatClient(Cassette()), engine="react",
+                                    tools=registry(StubSearchTool(RESULTS), FakeWeb().fetch_tool()))
+    with use_cassette(agent, path, "replay"):
+        with pytest.raises(CassetteMiss):
+            asyncio.run(agent.analyze("Risks in Shanghai?", on_progress=lambda message: None))
@@ -0,0 +1,24 @@
+# tests/test_entity_tagging.py
+# Gazetteer matching: the longest alias wins, exclusions swallow the aliases
+# they contain, and no match spans two documents.
+
+from entity_tagging import EntityTagger
+
+
+def test_longest_alias_wins_and_exclusions_are_dropped():
+    tagger = EntityTagger()
+    found = tagger.find([
+        "Palm oil from the port of Singapore via Suez.",
+        "Exports to South America and blue chips rallied; oil rose.",
+    ])
+    assert found == [
+        (0, "commodities", "Palm Oil"),
+        (0, "ports", "Port of Singapore"),
+        (0, "chokepoints", "Suez Canal"),
+        (1, "commodities", "Crude Oil"),
+    ]
+
+
+def test_matches_do_not_span_documents():
+    found = EntityTagger().find(["cargo bound for the port of", "singapore"])
+    assert found == [(1, "countries", "Singapore")]
@@ -0,0 +1,146 @@
+# tests/test_fetch.py
+# Drives ArticleFetchTool through an in-memory httpx transport: the byte and
+# time caps, unreadable responses, and the refusal of non-public hosts. The
+# transport sees requests pinned to the checked address; the host name they
+# were made for is in the Host header.
+#
+# Usage:
+#   python -m pytest tests
+
+import asyncio
+
+import httpx
+
+from app_config import FETCH_CONFIG
+from tools import ArticleFetchTool
+
+PARAGRAPH = "<p>Port congestion in Rotterdam is delaying container vessels by several days this week.</p>"
+ADDRESSES = {"news.example": ["93.184.216.34"], "mirror.example": ["93.184.216.35"],
+                    "intranet.example": ["10.0.0.7"], "metadata.example": ["169.254.169.254"],
+                    "mapped.example": ["93.184.216.34", "::ffff:127.0.0.1"]}
+
+
+async def resolve(host: str) -> list:
+    return ADDRESSES.get(host, [host])
+
+
+def fetch(handler, urls: str, resolver=resolve) -> str:
+    tool = ArticleFetchTool(transport=httpx.MockTransport(handler), resolver=resolver)
+    return asyncio.run(tool.use(urls))
+
+
+def requested_url(request: httpx.Request) -> str:
+    return f"{request.url.scheme}://{request.headers['host']}{request.url.raw_path.decode()}"
+
+
+def html(body: str, status: int = 200) -> httpx.Response:
+    return httpx.Response(status, headers={"content-type": "text/html; charset=utf-8"},
+                          content=f"<html><head><title>Port news</title></head><body>{body}</body></html>")
+
+
+def test_fetches_article_text():
+    output = fetch(lambda request: html(PARAGRAPH), "https://news.example/a")
+    assert output.startswith("- Title: Port news\n  URL: https://news.example/a")
+    assert "Rotterdam" in output
+
+
+def test_byte_cap_stops_reading(monkeypatch):
+    monkeypatch.setitem(FETCH_CONFIG, "max_bytes", 2000)
+    served = []
+
+    async def body():
+        yield f"<html><body>{PARAGRAPH}".encode()
+        for index in range(100):
+            served.append(index)
+            yield f"<p>Filler paragraph {index} that should never be read past the byte cap.</p>".encode()
+
+    output = fetch(lambda request: httpx.Response(200, headers={"content-type": "text/html"}, content=body()),
+                   "https://news.example/huge")
+    assert "Rotterdam" in output
+    assert "Filler paragraph 60" not in output
+    assert len(served) < 100
+
+
+def test_time_cap_keeps_text_received_so_far(monkeypatch):
+    monkeypatch.setitem(FETCH_CONFIG, "article_timeout", 0.3)
+
+    async def body():
+        yield f"<html><body>{PARAGRAPH}".encode()
+        await asyncio.sleep(5)
+        yield b"<p>This tail arrives far too late to be included in the article.</p>"
+
+    output = fetch(lambda request: httpx.Response(200, headers={"content-type": "text/html"}, content=body()),
+                   "https://news.example/slow")
+    assert "Rotterdam" in output
+    assert "too late" not in output
+
+
+def test_non_html_is_refused():
+    output = fetch(lambda request: httpx.Response(200, headers={"content-type": "application/pdf"}, content=b"%PDF"),
+                   "https://news.example/report.pdf")
+    assert output.startswith("Could not fetch 1 of 1 URL(s):")
+    assert "unsupported content type application/pdf" in output
+
+
+def test_not_found_is_reported_and_other_urls_still_fetched():
+    def handler(request):
+        return html("gone", status=404) if request.url.path == "/missing" else html(PARAGRAPH)
+
+    output = fetch(handler, "https://news.example/missing https://news.example/a")
+    assert "https://news.example/missing: HTTP status 404" in output
+    assert "Rotterdam" in output
+
+
+def test_private_and_loopback_hosts_are_never_requested():
+    requested = []
+
+    def handler(request):
+        requested.append(requested_url(request))
+        return html(PARAGRAPH)
+
+    output = fetch(handler, "http://127.0.0.1/admin http://intranet.example/wiki http://mapped.example/ "
+                            "http://metadata.example/latest/meta-data")
+    assert requested == []
+    assert output.count("non-public address") == 4
+
+
+def test_redirects_are_checked_hop_by_hop():
+    requested = []
+
+    def handler(request):
+        requested.append(requested_url(request))
+        if request.headers["host"] == "news.example":
+            return httpx.Response(302, headers={"location": "https://mirror.example/a"})
+        if request.headers["host"] == "mirror.example" and request.url.path == "/a":
+            return httpx.Response(301, headers={"location": "http://metadata.example/latest/meta-data"})
+        return html(PARAGRAPH)
+
+    output = fetch(handler, "https://news.example/a")
+    assert requested == ["https://news.example/a", "https://mirror.example/a"]
+    assert "refusing to fetch metadata.example" in output
+
+
+def test_redirect_to_public_host_is_followed():
+    def handler(request):
+        if request.headers["host"] == "news.example":
+            return httpx.Response(302, headers={"location": "https://mirror.example/a"})
+        return html(PARAGRAPH)
+
+    assert "Rotterdam" in fetch(handler, "https://news.example/a")
+
+
+def test_request_goes_to_the_checked_address():
+    answers = iter([["93.184.216.34"], ["127.0.0.1"]])
+
+    async def rebinding_resolver(host):
+        # A second lookup (as the connection would make) answers with loopback.
+        return next(answers)
+
+    connected = []
+
+    def handler(request):
+        connected.append((request.url.host, request.headers["host"], request.extensions.get("sni_hostname")))
+        return html(PARAGRAPH)
+
+    assert "Rotterdam" in fetch(handler, "https://news.example/a", rebinding_resolver)
+    assert connected == [("93.184.216.34", "news.example", "news.example")]
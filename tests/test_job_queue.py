@@ -0,0 +1,116 @@
+# tests/test_job_queue.py
+# Leases, heartbeats, retries and the dead-letter path of the SQLite job queue,
+# against a temporary database and a controllable clock.
+
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+import job_queue
+import worker
+from app_config import WORKER_CONFIG
+from job_queue import DONE, FAILED, LEASED, QUEUED, JobQueue
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = SimpleNamespace(value=1_000_000.0)
+    monkeypatch.setattr(job_queue, "time", SimpleNamespace(time=lambda: now.value))
+    return now
+
+
+@pytest.fixture
+def queue(tmp_path, clock):
+    queue = JobQueue(str(tmp_path / "jobs.db"))
+    yield queue
+    queue.close()
+
+
+def test_expired_lease_is_leased_again(queue, clock):
+    job_id = queue.submit("Risks in Rotterdam?")
+    first = queue.lease("worker-a", lease_seconds=60)
+    assert first["id"] == job_id and first["attempts"] == 1
+    assert queue.lease("worker-b", lease_seconds=60) is None
+
+    clock.value += 61
+    second = queue.lease("worker-b", lease_seconds=60)
+    assert second["id"] == job_id and second["attempts"] == 2 and second["lease_owner"] == "worker-b"
+
+
+def test_heartbeat_keeps_the_lease(queue, clock):
+    queue.submit("Risks in Rotterdam?")
+    job = queue.lease("worker-a", lease_seconds=60)
+    for _ in range(3):
+        clock.value += 45
+        assert queue.heartbeat(job["id"], "worker-a", lease_seconds=60)
+        assert queue.lease("worker-b", lease_seconds=60) is None
+
+
+def test_stale_owner_is_rejected(queue, clock):
+    queue.submit("Risks in Rotterdam?")
+    job = queue.lease("worker-a", lease_seconds=60)
+    clock.value += 61
+    queue.lease("worker-b", lease_seconds=60)
+
+    assert not queue.heartbeat(job["id"], "worker-a")
+    assert not queue.complete(job["id"], "worker-a", {"answer": "stale"})
+    assert not queue.fail(job["id"], "worker-a", "stale")
+    assert queue.get(job["id"])["status"] == LEASED and queue.get(job["id"])["lease_owner"] == "worker-b"
+    assert queue.complete(job["id"], "worker-b", {"answer": "fresh"})
+    assert queue.get(job["id"])["status"] == DONE
+
+
+def test_failures_are_retried_with_backoff_until_max_attempts(queue, clock):
+    job_id = queue.submit("Risks in Rotterdam?", max_attempts=3)
+    for attempt in (1, 2):
+        job = queue.lease("worker-a")
+        assert job["attempts"] == attempt
+        assert queue.fail(job_id, "worker-a", f"error {attempt}")
+        assert queue.get(job_id)["status"] == QUEUED
+        backoff = WORKER_CONFIG["retry_backoff"] * 2 ** (attempt - 1)
+        clock.value += backoff - 1
+        assert queue.lease("worker-a") is None
+        clock.value += 1
+
+    job = queue.lease("worker-a")
+    assert job["attempts"] == 3
+    assert queue.fail(job_id, "worker-a", "error 3")
+    assert queue.get(job_id)["status"] == FAILED and queue.get(job_id)["error"] == "error 3"
+    clock.value += 3600
+    assert queue.lease("worker-a") is None
+
+
+def test_expired_lease_on_the_final_attempt_is_dead_lettered(queue, clock):
+    job_id = queue.submit("Risks in Rotterdam?", max_attempts=2)
+    for _ in range(2):
+        assert queue.lease("worker-a", lease_seconds=60)["id"] == job_id
+        clock.value += 61
+
+    assert queue.lease("worker-b", lease_seconds=60) is None
+    job = queue.get(job_id)
+    assert job["status"] == FAILED and job["attempts"] == 2
+    assert job["error"] == "Lease expired on the final attempt."
+    assert queue.stats() == {FAILED: 1}
+
+
+class StubAgent:
+    def __init__(self, outcome):
+        self.outcome = outcome
+
+    async def analyze(self, query, cancel_token=None, **params):
+        if isinstance(self.outcome, Exception):
+            raise self.outcome
+        return {"query": query, "answer": self.outcome}
+
+
+def test_worker_completes_or_fails_a_job(queue):
+    done_id = queue.submit("Risks in Rotterdam?")
+    asyncio.run(worker.process_job(StubAgent("Congested."), queue, queue.lease("worker-a"), "worker-a"))
+    assert queue.get(done_id)["status"] == DONE
+    assert queue.get(done_id)["result"]["answer"] == "Congested."
+
+    failed_id = queue.submit("Risks in Shanghai?", max_attempts=1)
+    asyncio.run(worker.process_job(StubAgent(RuntimeError("LLM down")), queue, queue.lease("worker-a"), "worker-a"))
+    assert queue.get(failed_id)["status"] == FAILED
+    assert queue.get(failed_id)["error"] == "RuntimeError: LLM down"
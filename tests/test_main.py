@@ -0,0 +1,49 @@
+# tests/test_main.py
+# CLI command parsing: a known command word with the wrong arguments prints
+# its usage and never starts an analysis.
+
+import pytest
+
+from main import handle_command
+
+
+class StubQueries:
+    """Records submitted questions instead of analyzing them."""
+
+    def __init__(self):
+        self.jobs = {}
+        self.submitted = []
+        self.cancelled = []
+        self.show_progress = True
+
+    def submit(self, query: str) -> int:
+        self.submitted.append(query)
+        return len(self.submitted)
+
+    def cancel(self, job_id: int, reason: str = "cancelled by user") -> bool:
+        self.cancelled.append(job_id)
+        return True
+
+    def running(self) -> list:
+        return []
+
+
+@pytest.mark.parametrize("command", [
+    "cancel 3 4", "cancel", "cancel three", "show 1 2", "show me the risks", "progress maybe", "jobs 2", "exit now",
+])
+def test_malformed_commands_print_usage(command, capsys):
+    queries = StubQueries()
+    assert handle_command(command, queries)
+    assert queries.submitted == [] and queries.cancelled == []
+    assert capsys.readouterr().out.startswith("Usage: ")
+
+
+def test_well_formed_commands_and_questions():
+    queries = StubQueries()
+    assert handle_command("cancel 3", queries)
+    assert handle_command("progress off", queries)
+    assert handle_command("What are the risks for Taiwan?", queries)
+    assert not handle_command("quit", queries)
+    assert queries.cancelled == [3]
+    assert queries.show_progress is False
+    assert queries.submitted == ["What are the risks for Taiwan?"]
@@ -0,0 +1,47 @@
+# tests/test_planner.py
+# The first planning round runs before any observation, so tools declaring
+# `known_urls_only` are offered only once results exist.
+
+import asyncio
+
+from agent import SupplyChainAnalystAgent
+from session_memory import SessionMemory
+from tools import format_results
+from conftest import FakeWeb, ScriptedClient, StubSearchTool, registry
+
+RESULTS = [{"title": "Port strike in Rotterdam", "url": "https://news.example/a", "content": "Dock workers walked out."}]
+PLAN = """<plan>
+<call><tool>supply_chain_news_search</tool><tool_input>port strike Rotterdam</tool_input></call>
+<call><tool>fetch_articles</tool><tool_input>https://news.example/a</tool_input></call>
+</plan>"""
+
+
+def run_planner(memory: SessionMemory = None):
+    web = FakeWeb()
+
+    def script(messages):
+        return PLAN if messages[0]["role"] == "system" else "<answer>Rotterdam is congested.</answer>"
+
+    client = ScriptedClient(script)
+    search = StubSearchTool(RESULTS)
+    agent = SupplyChainAnalystAgent(client=client, engine="plan", tools=registry(search, web.fetch_tool()))
+    run_record = asyncio.run(agent.analyze("Risks in Rotterdam?", on_progress=lambda message: None, memory=memory))
+    plan_prompt = client.requests[0]["messages"][0]["content"]
+    return run_record, plan_prompt, web
+
+
+def test_url_only_tools_are_withheld_before_any_result():
+    run_record, plan_prompt, web = run_planner()
+    assert "fetch_articles" not in plan_prompt
+    assert [obs["tool"] for obs in run_record["observations"]] == ["supply_chain_news_search"]
+    assert web.requested == []
+
+
+def test_url_only_tools_are_offered_when_evidence_holds_results():
+    memory = SessionMemory()
+    memory.add_run({"query": "Port strike in Rotterdam?", "answer": "There is a strike.", "observations": [
+        {"tool": "supply_chain_news_search", "input": "port strike", "output": format_results(RESULTS)}
+    ]})
+    run_record, plan_prompt, web = run_planner(memory)
+    assert "fetch_articles" in plan_prompt
+    assert web.requested == ["https://news.example/a"]
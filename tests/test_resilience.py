@@ -0,0 +1,44 @@
+# tests/test_resilience.py
+# Hedged requests: only the first attempt's latency is sampled, and a first
+# attempt cancelled by a winning hedge still counts (as a lower bound), so the
+# hedge delay tracks the real latency percentile.
+
+import asyncio
+import uuid
+
+from metrics import metrics
+from resilience import hedged_call
+
+
+def samples(name: str) -> list:
+    return list(metrics._samples.get(name, ()))
+
+
+def test_first_attempt_latency_is_sampled():
+    name = f"test.{uuid.uuid4().hex}"
+
+    async def attempt():
+        await asyncio.sleep(0.02)
+        return "ok"
+
+    assert asyncio.run(hedged_call(attempt, 1.0, "test", name)) == "ok"
+    assert len(samples(name)) == 1 and samples(name)[0] >= 0.02
+
+
+def test_first_attempt_cancelled_by_the_hedge_is_sampled_as_a_lower_bound():
+    name = f"test.{uuid.uuid4().hex}"
+    delays = iter([1.0, 0.01])
+
+    async def attempt():
+        await asyncio.sleep(next(delays))
+        return "ok"
+
+    async def main():
+        result = await hedged_call(attempt, 0.05, "test", name)
+        await asyncio.sleep(0)  # let the cancelled attempt's callback run
+        return result
+
+    assert asyncio.run(main()) == "ok"
+    # One sample, from the slow first attempt; the fast hedge is not sampled.
+    assert len(samples(name)) == 1 and 0.05 <= samples(name)[0] < 1.0
+
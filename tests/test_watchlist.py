@@ -0,0 +1,34 @@
+# tests/test_watchlist.py
+# Watchlist refreshes repeat only the item's searches, never its article fetches.
+
+import asyncio
+
+from agent import SupplyChainAnalystAgent
+from conftest import FakeWeb, ScriptedClient, StubSearchTool, observation_count, registry, tool_call
+from watchlist import Watchlist
+
+RESULTS = [{"title": "Port strike in Rotterdam", "url": "https://news.example/a", "content": "Dock workers walked out."}]
+
+
+def test_refresh_skips_article_fetches(tmp_path):
+    web = FakeWeb()
+    search = StubSearchTool(RESULTS)
+
+    def script(messages):
+        step = observation_count(messages)
+        if step == 0:
+            return tool_call("supply_chain_news_search", "port strike Rotterdam")
+        if step == 1:
+            return tool_call("fetch_articles", "https://news.example/a http://other.example/")
+        return "<answer>Rotterdam is congested.</answer>"
+
+    agent = SupplyChainAnalystAgent(client=ScriptedClient(script), engine="react",
+                                    tools=registry(search, web.fetch_tool()))
+    watchlist = Watchlist(agent, str(tmp_path / "watchlist.db"))
+    item = asyncio.run(watchlist.add("Risks in Rotterdam?"))
+    assert web.requested == ["https://news.example/a"]
+
+    outcome = asyncio.run(watchlist.refresh(item["id"]))
+    assert outcome["changed"] is False
+    assert search.calls == ["port strike Rotterdam", "port strike Rotterdam"]
+    assert web.requested == ["https://news.example/a"]
@@ -0,0 +1,48 @@
+# tests/test_worker.py
+# Worker shutdown: SIGTERM unwinds the worker loop and flushes analytics,
+# also on event loops without signal-handler support (Windows).
+
+import asyncio
+import os
+import signal
+import sys
+
+import pytest
+
+import agent
+import config
+import worker
+from analytics_store import AnalyticsStore
+from conftest import ScriptedClient, StubSearchTool, registry
+
+
+@pytest.mark.skipif(sys.platform == "win32", reason="POSIX signals")
+@pytest.mark.parametrize("loop_signals", [True, False], ids=["loop-handler", "no-loop-handlers"])
+def test_sigterm_stops_the_worker_and_flushes_analytics(tmp_path, monkeypatch, loop_signals):
+    store = AnalyticsStore(str(tmp_path / "analytics"), flush_rows=1000, flush_interval=1e9)
+    store.record({"query": "q", "answer": "a", "observations": [], "steps": 1}, latency=1.0, engine="react")
+    agent_class = agent.SupplyChainAnalystAgent
+    monkeypatch.setattr(agent, "SupplyChainAnalystAgent", lambda: agent_class(
+        client=ScriptedClient(lambda messages: "<answer>a</answer>"), tools=registry(StubSearchTool([])),
+        analytics=store))
+    monkeypatch.setattr(config, "load_config", lambda: None)
+    if not loop_signals:
+        def unsupported(self, *args):
+            raise NotImplementedError
+        monkeypatch.setattr(asyncio.SelectorEventLoop, "add_signal_handler", unsupported)
+
+    previous = signal.getsignal(signal.SIGTERM)
+
+    async def main():
+        loop_task = asyncio.ensure_future(worker.worker_loop(0, str(tmp_path / "jobs.db"), 1))
+        await asyncio.sleep(0.2)
+        os.kill(os.getpid(), signal.SIGTERM)
+        with pytest.raises(asyncio.CancelledError):
+            await loop_task
+
+    try:
+        asyncio.run(main())
+    finally:
+        signal.signal(signal.SIGTERM, previous)
+    assert len(store._buffer) == 0
+    assert AnalyticsStore(str(tmp_path / "analytics")).summary()["runs"] == 1
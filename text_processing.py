@@ -0,0 +1,63 @@
+# text_processing.py
+# Shared, vectorized text primitives used by the scoring and tagging stages.
+# Tokenization happens on raw bytes with NumPy so large batches of observations
+# never pay a per-token Python cost.
+
+import numpy as np
+
+# Byte-level lookup tables: ASCII letters are lowercased, and every byte that is
+# not an ASCII letter or digit (or part of a UTF-8 sequence) separates tokens.
+_LOWER = np.arange(256, dtype=np.uint8)
+_LOWER[ord("A"):ord("Z") + 1] += 32
+_IS_WORD = np.zeros(256, dtype=bool)
+_IS_WORD[ord("a"):ord("z") + 1] = True
+_IS_WORD[ord("0"):ord("9") + 1] = True
+_IS_WORD[128:] = True
+
+_HASH_BASE = np.uint64(1099511628211)
+_HASH_LENGTH_MIX = np.uint64(0x9E3779B97F4A7C15)
+
+
+def hash_tokens(texts: list) -> tuple:
+    """
+    Tokenizes texts and hashes every token without leaving NumPy.
+
+    Each token gets a 64-bit polynomial hash of its lowercased bytes, so a
+    vocabulary lookup becomes a `searchsorted` over integers instead of one
+    dictionary lookup per Python string.
+
+    Args:
+        texts (list): The texts to tokenize.
+
+    Returns:
+        tuple: (hashes, doc_ids) arrays with one entry per token, in text order.
+    """
+    if not texts:
+        return np.zeros(0, dtype=np.uint64), np.zeros(0, dtype=np.int64)
+
+    encoded = [text.encode("utf-8") for text in texts]
+    # A NUL byte between texts guarantees that no token spans two documents.
+    data = _LOWER[np.frombuffer(b"\x00".join(encoded), dtype=np.uint8)]
+    is_word = _IS_WORD[data]
+
+    edges = np.diff(np.concatenate(([0], is_word.view(np.int8), [0])))
+    starts = np.flatnonzero(edges == 1)
+    lengths = np.flatnonzero(edges == -1) - starts
+    if len(starts) == 0:
+        return np.zeros(0, dtype=np.uint64), np.zeros(0, dtype=np.int64)
+
+    word_bytes = data[is_word].astype(np.uint64)
+    token_offsets = np.cumsum(lengths) - lengths
+    position = np.arange(len(word_bytes)) - np.repeat(token_offsets, lengths)
+    powers = np.cumprod(np.full(int(lengths.max()), _HASH_BASE, dtype=np.uint64))
+    hashes = np.add.reduceat(word_bytes * powers[position], token_offsets)
+    hashes ^= lengths.astype(np.uint64) * _HASH_LENGTH_MIX
+
+    text_starts = np.cumsum([0] + [len(chunk) + 1 for chunk in encoded[:-1]])
+    doc_ids = np.searchsorted(text_starts, starts, side="right") - 1
+    return hashes, doc_ids.astype(np.int64)
+
+
+def estimate_tokens(text: str) -> int:
+    """Cheaply estimates the number of LLM tokens in a text (about 4 characters per token)."""
+    return (len(text) + 3) // 4
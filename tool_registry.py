@@ -0,0 +1,245 @@
+# tool_registry.py
+# Registry and executor for the agent's tools.
+# Tools are declared in TOOL_CONFIG["tools"] or contributed by installed packages
+# through an entry point group, and are only constructed when first called.
+# Every call goes through the registry, which enforces the limits each tool
+# declares: a concurrency cap per tool, a shared cap per cost class, a timeout
+# and, for cacheable tools, a short-lived result cache. Adding a slow or heavy
+# tool therefore cannot crowd out the others or flood a backend.
+
+import asyncio
+import importlib
+import threading
+import time
+import weakref
+from contextlib import AsyncExitStack
+from functools import lru_cache
+from importlib.metadata import entry_points
+
+from app_config import TOOL_CONFIG
+from metrics import metrics
+from resilience import TTLCache
+from tools import BaseTool
+
+LIMIT_ATTRIBUTES = ("max_concurrency", "timeout", "cacheable", "cost_class", "known_urls_only")
+METADATA_ATTRIBUTES = ("name", "description", "details")
+
+
+def _load_factory(factory):
+    """Resolves a 'module:attribute' reference; classes, callables and tools pass through."""
+    if isinstance(factory, str):
+        module_name, _, attribute = factory.partition(":")
+        return getattr(importlib.import_module(module_name), attribute)
+    return factory
+
+
+class ConcurrencyLimits:
+    """
+    Named asyncio semaphores, kept separately for every event loop.
+
+    A semaphore must not be shared between event loops, and the app runs one
+    loop per query (Streamlit) or per process (workers), so each loop gets its
+    own set. Sets are dropped together with their loop.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._by_loop = weakref.WeakKeyDictionary()
+
+    def semaphore(self, key: str, limit: int):
+        """Returns the running loop's semaphore for `key`, or None if `limit` is unset."""
+        if not limit:
+            return None
+        with self._lock:
+            semaphores = self._by_loop.setdefault(asyncio.get_running_loop(), {})
+            if key not in semaphores:
+                semaphores[key] = asyncio.Semaphore(limit)
+            return semaphores[key]
+
+
+class ManagedTool(BaseTool):
+    """
+    A registered tool: constructed lazily and called within its declared limits.
+
+    Prompt metadata and limits are read from the tool class (or the overrides),
+    so listing tools in the prompt does not construct them.
+    """
+
+    def __init__(self, factory, limits: ConcurrencyLimits, cost_class_limits: dict, overrides: dict = None):
+        """
+        Args:
+            factory: A BaseTool instance, a BaseTool subclass, a zero-argument
+                callable returning a tool, or a 'module:attribute' reference to one.
+            limits (ConcurrencyLimits): The registry's semaphores.
+            cost_class_limits (dict): Concurrent calls allowed per cost class.
+            overrides (dict): Values replacing the tool's metadata or limits.
+        """
+        factory = _load_factory(factory)
+        overrides = overrides or {}
+        self._tool = factory if isinstance(factory, BaseTool) else None
+        self._factory = factory
+        self._construct_lock = threading.Lock()
+        self._limits = limits
+        self._cost_class_limits = cost_class_limits
+        for attribute in METADATA_ATTRIBUTES + LIMIT_ATTRIBUTES:
+            setattr(self, attribute, overrides.get(attribute, getattr(factory, attribute, None)))
+        if not self.name:
+            raise ValueError(f"Tool {factory!r} does not declare a name.")
+        self._cache = TTLCache(TOOL_CONFIG["cache_size"], TOOL_CONFIG["cache_ttl"]) if self.cacheable else None
+
+    @property
+    def tool(self) -> BaseTool:
+        """The underlying tool, constructed on first access."""
+        if self._tool is None:
+            with self._construct_lock:
+                if self._tool is None:
+                    self._tool = self._factory()
+                    metrics.increment(f"tool.{self.name}.constructed")
+        return self._tool
+
+    @property
+    def constructed(self) -> bool:
+        """Whether the underlying tool has been constructed yet."""
+        return self._tool is not None
+
+    async def use(self, tool_input: str, token_budget: int = None, use_cache: bool = True) -> str:
+        """
+        Calls the tool, waiting for a free slot under its concurrency caps.
+
+        Cache hits skip the caps entirely. The cache key is the normalized
+        input; the token budget is left out because observations are
+        compressed to the step's budget afterwards anyway.
+
+        Args:
+            tool_input (str): The input chosen by the agent.
+            token_budget (int): Tokens available for the output, if known.
+            use_cache (bool): Set to False to always call the tool; the fresh
+                output still replaces the cached one.
+
+        Returns:
+            str: The tool output, or an error message if the call timed out.
+        """
+        cache_key = " ".join(tool_input.lower().split())
+        if self._cache is not None and use_cache:
+            cached = self._cache.get(cache_key)
+            if cached is not None:
+                metrics.increment(f"tool.{self.name}.cache_hits")
+                return cached
+
+        started = time.perf_counter()
+        async with AsyncExitStack() as stack:
+            # The tool's own cap is taken first, so a call queued behind its
+            # siblings does not hold a slot its cost class could give elsewhere.
+            for semaphore in (
+                self._limits.semaphore(f"tool:{self.name}", self.max_concurrency),
+                self._limits.semaphore(f"cost:{self.cost_class}", self._cost_class_limits.get(self.cost_class)),
+            ):
+                if semaphore is not None:
+                    await stack.enter_async_context(semaphore)
+            metrics.observe(f"tool.{self.name}.queue_wait", time.perf_counter() - started)
+
+            metrics.increment(f"tool.{self.name}.calls")
+            call_started = time.perf_counter()
+            try:
+                output = await asyncio.wait_for(self.tool.use(tool_input, token_budget=token_budget), self.timeout)
+            except asyncio.TimeoutError:
+                metrics.increment(f"tool.{self.name}.timeouts")
+                return f"Error: The {self.name} tool did not respond within {self.timeout:g} seconds."
+            metrics.observe(f"tool.{self.name}.latency", time.perf_counter() - call_started)
+
+        if self._cache is not None and self.tool.should_cache(output):
+            self._cache.set(cache_key, output)
+        return output
+
+    def should_cache(self, output: str) -> bool:
+        """Defers to the underlying tool."""
+        return self.tool.should_cache(output)
+
+
+class ToolRegistry:
+    """
+    The tools available to an agent, by name, in registration order.
+
+    Iterating the registry yields `ManagedTool`s, which behave like the tools
+    they wrap but run within the tool's declared limits.
+    """
+
+    def __init__(self, specs: list = None, entry_point_group: str = None):
+        """
+        Registers the configured tools and those published under the entry point group.
+
+        Args:
+            specs (list): Tool specs (see `register`). Defaults to TOOL_CONFIG["tools"].
+            entry_point_group (str): Entry point group to discover tools from.
+                Defaults to TOOL_CONFIG["entry_point_group"]; pass "" to disable.
+        """
+        self._tools = {}
+        self._limits = ConcurrencyLimits()
+        self._cost_class_limits = TOOL_CONFIG["cost_class_limits"]
+        for spec in TOOL_CONFIG["tools"] if specs is None else specs:
+            self.register(spec)
+
+        group = TOOL_CONFIG["entry_point_group"] if entry_point_group is None else entry_point_group
+        if group:
+            self._discover(group)
+
+    def register(self, spec) -> ManagedTool:
+        """
+        Adds a tool.
+
+        Args:
+            spec: A dict with a 'factory' plus optional metadata and limit
+                overrides, or a factory on its own (a tool instance, a tool
+                class or a 'module:Class' reference).
+
+        Returns:
+            ManagedTool: The registered tool.
+
+        Raises:
+            ValueError: If a tool with the same name is already registered.
+        """
+        overrides = dict(spec) if isinstance(spec, dict) else {"factory": spec}
+        managed = ManagedTool(overrides.pop("factory"), self._limits, self._cost_class_limits, overrides)
+        if managed.name in self._tools:
+            raise ValueError(f"A tool named '{managed.name}' is already registered.")
+        self._tools[managed.name] = managed
+        return managed
+
+    def get(self, name: str):
+        """Returns the tool registered under `name`, or None."""
+        return self._tools.get(name)
+
+    def names(self) -> list:
+        """The registered tool names, in registration order."""
+        return list(self._tools)
+
+    def __iter__(self):
+        return iter(list(self._tools.values()))
+
+    def __len__(self):
+        return len(self._tools)
+
+    def __contains__(self, name):
+        return name in self._tools
+
+    def _discover(self, group: str):
+        """Registers the tools installed packages publish under an entry point group."""
+        discovered = entry_points()
+        if hasattr(discovered, "select"):
+            discovered = discovered.select(group=group)
+        else:
+            # Python < 3.10 returns a dict of groups.
+            discovered = discovered.get(group, [])
+        for entry_point in discovered:
+            # A broken plugin must not take the built-in tools down with it.
+            try:
+                self.register(entry_point.load())
+            except Exception as e:
+                metrics.increment("tool.discovery_errors")
+                print(f"Skipping tool entry point '{entry_point.name}': {e}")
+
+
+@lru_cache(maxsize=None)
+def get_tool_registry() -> ToolRegistry:
+    """Returns the shared tool registry, so tools are built once and caches are shared per process."""
+    return ToolRegistry()
@@ -1,20 +1,123 @@
 # tools.py
 # Defines the tools that the AI agent can use to gather information.
-# For this use case, we have a specialized tool for searching supply chain news.
+# For this use case, we have a specialized tool for searching supply chain news,
+# and a tool that fetches the full text of articles found by earlier searches.
 
+import asyncio
+import codecs
+import ipaddress
 import os
+import re
+import socket
+import time
 import httpx
 from abc import ABC, abstractmethod
+from html.parser import HTMLParser
+from app_config import FETCH_CONFIG, SEARCH_CONFIG
+from metrics import metrics
+from resilience import CircuitBreaker, TTLCache, hedged_call
+from search_policy import SearchPolicy
+from text_processing import estimate_tokens
+
+# URLs in free text, e.g. a tool input that quotes earlier observations.
+_URL_PATTERN = re.compile(r"https?://[^\s<>\"'\]\[]+")
+
+# Matches one formatted search result as produced by `format_results`.
+_RESULT_PATTERN = re.compile(
+    r"^- Title: (?P<title>.*?)\n  URL: (?P<url>.*?)\n  Snippet: (?P<content>.*?)(?=\n- Title: |\Z)",
+    re.DOTALL | re.MULTILINE,
+)
+
+def format_results(results: list) -> str:
+    """
+    Formats raw search results into the text block shown to the agent.
+
+    Args:
+        results (list): Result dicts with 'title', 'url' and 'content' keys.
+
+    Returns:
+        str: One '- Title / URL / Snippet' entry per result.
+    """
+    formatted_results = []
+    for res in results:
+        formatted_results.append(f"- Title: {res['title']}\n  URL: {res['url']}\n  Snippet: {res['content']}\n")
+    return "\n".join(formatted_results)
+
+def parse_results(text: str) -> list:
+    """
+    Recovers the individual results from a block produced by `format_results`.
+
+    Text that does not contain formatted results (errors, "no results" notices)
+    yields an empty list.
+
+    Args:
+        text (str): A tool output or observation body.
+
+    Returns:
+        list: Result dicts with 'title', 'url' and 'content' keys.
+    """
+    return [
+        {
+            "title": match.group("title").strip(),
+            "url": match.group("url").strip(),
+            "content": match.group("content").strip(),
+        }
+        for match in _RESULT_PATTERN.finditer(text)
+    ]
+
+def parse_urls(text: str) -> list:
+    """
+    Extracts the unique http(s) URLs from free text, in order of appearance.
+
+    Args:
+        text (str): For example a tool input listing URLs from earlier observations.
+
+    Returns:
+        list: The URLs, without trailing punctuation.
+    """
+    urls = []
+    for match in _URL_PATTERN.finditer(text):
+        url = match.group(0).rstrip(".,;:!?)'\"")
+        if url not in urls:
+            urls.append(url)
+    return urls
+
+class SearchError(Exception):
+    """Raised when a search fails; the message is what the agent gets to see."""
 
 class BaseTool(ABC):
-    """Abstract base class for all tools."""
+    """
+    Abstract base class for all tools.
+
+    Besides its prompt metadata, a tool declares the limits the tool registry
+    enforces when it runs (see tool_registry.py). They are class attributes so
+    they can be read without constructing the tool, and TOOL_CONFIG entries
+    may override them.
+    """
     name: str
     description: str
     details: str
 
+    max_concurrency = 4         # calls of this tool in flight at once, per event loop
+    timeout = 60.0              # seconds before a call is abandoned
+    cacheable = False           # whether identical inputs may be served from the registry cache
+    cost_class = "standard"     # "cheap", "standard" or "expensive"; shares a concurrency cap per class
+    known_urls_only = False     # whether the agent may only pass URLs seen in the run's earlier observations
+
+    def should_cache(self, output: str) -> bool:
+        """Whether an output of a cacheable tool may be cached (errors should not be)."""
+        return True
+
     @abstractmethod
-    async def use(self, tool_input: str) -> str:
-        """The core logic of the tool."""
+    async def use(self, tool_input: str, token_budget: int = None) -> str:
+        """
+        The core logic of the tool.
+
+        Args:
+            tool_input (str): The input chosen by the agent.
+            token_budget (int): A hint for how many prompt tokens the output may
+                take; tools that cannot size their output may ignore it.
+        """
         pass
 
 class SupplyChainNewsSearchTool(BaseTool):
@@ -38,12 +141,37 @@ class SupplyChainNewsSearchTool(BaseTool):
         "</tool_details>"
     )
 
-    async def use(self, tool_input: str) -> str:
+    # A call may make two hedged requests per depth tier.
+    max_concurrency = 4
+    timeout = 3 * SEARCH_CONFIG["request_timeout"]
+    cacheable = True
+    cost_class = "standard"
+
+    # Backend health is a property of the service, not of one agent, so the
+    # breaker and the fallback cache are shared by every instance of the tool.
+    breaker = CircuitBreaker(
+        "search",
+        failure_threshold=SEARCH_CONFIG["breaker_failure_threshold"],
+        recovery_timeout=SEARCH_CONFIG["breaker_recovery_timeout"],
+        probe_timeout=SEARCH_CONFIG["breaker_probe_timeout"]
+    )
+    fallback_cache = TTLCache(max_entries=SEARCH_CONFIG["cache_size"], ttl=SEARCH_CONFIG["cache_ttl"])
+
+    policy = SearchPolicy()
+
+    async def use(self, tool_input: str, token_budget: int = None) -> str:
         """
         Performs a search using the Tavily API.
 
+        The search starts at basic depth and escalates to advanced depth only
+        when the basic results are sparse or weakly relevant; the number of
+        results is sized from `token_budget`. Slow responses are hedged with a
+        second request, and while the circuit breaker is open the tool fails
+        fast, serving a recent cached result for the same query when there is one.
+
         Args:
             tool_input (str): The search query.
+            token_budget (int): Tokens available for this observation, if known.
 
         Returns:
             str: A formatted string of search results or an error message.
@@ -52,31 +180,432 @@ class SupplyChainNewsSearchTool(BaseTool):
         if not api_key:
             return "Error: TAVILY_API_KEY is not set. The search tool cannot function."
 
-        url = "https://api.tavily.com/search"
+        cache_key = " ".join(tool_input.lower().split())
+        try:
+            async with httpx.AsyncClient(timeout=SEARCH_CONFIG["request_timeout"]) as client:
+                results, formatted = await self._search(client, api_key, tool_input, "basic", token_budget)
+                if self.policy.should_escalate(results):
+                    try:
+                        results, formatted = await self._search(
+                            client, api_key, tool_input, "advanced", token_budget
+                        )
+                    except SearchError:
+                        # The basic results are still better than nothing.
+                        pass
+        except SearchError as e:
+            return self._fallback(cache_key, str(e))
+
+        if not results:
+            return f"No search results found for query: '{tool_input}'"
+
+        self.fallback_cache.set(cache_key, formatted)
+        return formatted
+
+    def should_cache(self, output: str) -> bool:
+        """Only fresh results are cached; errors, notices and fallback results are not."""
+        return output.startswith("- Title: ")
+
+    async def _search(self, client: httpx.AsyncClient, api_key: str, tool_input: str, tier: str,
+                      token_budget: int = None) -> tuple:
+        """
+        Runs one search at the given depth and records its outcome with the policy.
+
+        Returns:
+            tuple: (raw results, formatted results).
+
+        Raises:
+            SearchError: With the message for the agent when the search failed
+                or the circuit breaker rejected it.
+        """
+        if not self.breaker.allow_request():
+            metrics.increment("search.failed_fast")
+            raise SearchError(
+                f"Error: The search backend is temporarily unavailable. No cached results for query: '{tool_input}'"
+            )
+
         payload = {
             "api_key": api_key,
             "query": tool_input,
-            "search_depth": "advanced",
+            "search_depth": tier,
             "include_answer": False,
-            "max_results": 5
+            "max_results": self.policy.max_results(tier, token_budget)
         }
+        started = time.perf_counter()
+        try:
+            response = await hedged_call(
+                lambda: self._post(client, payload), self._hedge_delay(), "search", "search.attempt_latency"
+            )
+        except httpx.HTTPStatusError as e:
+            if self._is_backend_failure(e):
+                self.breaker.record_failure()
+            else:
+                # Client errors (bad key, bad request) say nothing about backend health.
+                self.breaker.record_success()
+            raise SearchError(
+                f"Error performing search: HTTP Status {e.response.status_code} - {e.response.text}"
+            ) from e
+        except asyncio.CancelledError:
+            # A tool timeout, a cancelled run or a lost hedge race says nothing
+            # about the backend, but must not leave a half-open probe pending.
+            self.breaker.release_probe()
+            raise
+        except Exception as e:
+            self.breaker.record_failure()
+            raise SearchError(f"An unexpected error occurred during search: {e}") from e
+        self.breaker.record_success()
+
+        results = response.get("results") or []
+        formatted = format_results(results)
+        self.policy.record(
+            tier, tool_input, time.perf_counter() - started, results, estimate_tokens(formatted),
+            escalated=tier == "basic" and self.policy.should_escalate(results)
+        )
+        return results, formatted
+
+    @staticmethod
+    async def _post(client: httpx.AsyncClient, payload: dict) -> dict:
+        """Sends one search request."""
+        response = await client.post(SEARCH_CONFIG["url"], json=payload)
+        response.raise_for_status() # Raise an exception for bad status codes
+        return response.json()
+
+    @staticmethod
+    def _hedge_delay() -> float:
+        """The hedge delay: the configured percentile of recent request latencies."""
+        if metrics.sample_count("search.attempt_latency") < SEARCH_CONFIG["hedge_min_samples"]:
+            return SEARCH_CONFIG["hedge_default_delay"]
+        delay = metrics.percentile("search.attempt_latency", SEARCH_CONFIG["hedge_percentile"])
+        return min(SEARCH_CONFIG["hedge_max_delay"], max(SEARCH_CONFIG["hedge_min_delay"], delay))
+
+    @staticmethod
+    def _is_backend_failure(error: httpx.HTTPStatusError) -> bool:
+        """Server errors and rate limiting count against the backend's health."""
+        return error.response.status_code >= 500 or error.response.status_code == 429
+
+    def _fallback(self, cache_key: str, error_message: str) -> str:
+        """Serves a recent cached result for the query if there is one, otherwise the error."""
+        cached = self.fallback_cache.get(cache_key)
+        if cached is None:
+            return error_message
+        metrics.increment("search.served_from_cache")
+        return f"(Served from cache: the search backend is currently unavailable.)\n{cached}"
+
+class FetchError(Exception):
+    """Raised when an article cannot be fetched; the message says why."""
+
+class _ArticleTextParser(HTMLParser):
+    """
+    Collects the readable text of an HTML page as it streams in, without building a DOM.
+
+    Text inside scripts, styles, navigation, headers, footers, forms and the
+    like is skipped. Text inside <article> or <main> is kept apart, because on
+    most news pages that is the story itself.
+    """
+
+    SKIPPED_TAGS = {
+        "script", "style", "noscript", "template", "svg", "iframe", "nav", "header", "footer",
+        "aside", "form", "button", "select"
+    }
+    BLOCK_TAGS = {
+        "p", "div", "section", "li", "ul", "ol", "table", "tr", "td", "th", "br", "pre", "blockquote",
+        "figcaption", "dd", "dt", "h1", "h2", "h3", "h4", "h5", "h6"
+    }
+    MAIN_TAGS = {"article", "main"}
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.title = ""
+        self.meta_title = ""
+        self.blocks = []            # (text, inside article/main)
+        self.text_length = 0
+        self._current = []
+        self._in_title = False
+        self._skip_depth = 0
+        self._main_depth = 0
+
+    def handle_starttag(self, tag, attrs):
+        if tag in self.SKIPPED_TAGS:
+            self._skip_depth += 1
+        elif tag in self.MAIN_TAGS:
+            self.end_block()
+            self._main_depth += 1
+        elif tag in self.BLOCK_TAGS:
+            self.end_block()
+        elif tag == "title":
+            self._in_title = True
+        elif tag == "meta":
+            attributes = dict(attrs)
+            if attributes.get("property") == "og:title" and attributes.get("content"):
+                self.meta_title = attributes["content"]
 
+    def handle_endtag(self, tag):
+        if tag in self.SKIPPED_TAGS:
+            self._skip_depth = max(0, self._skip_depth - 1)
+        elif tag in self.MAIN_TAGS:
+            self.end_block()
+            self._main_depth = max(0, self._main_depth - 1)
+        elif tag in self.BLOCK_TAGS:
+            self.end_block()
+        elif tag == "title":
+            self._in_title = False
+
+    def handle_data(self, data):
+        if self._in_title:
+            self.title += data
+        elif not self._skip_depth:
+            self._current.append(data)
+
+    def end_block(self):
+        """Closes the current text block."""
+        text = " ".join("".join(self._current).split())
+        self._current = []
+        if text:
+            self.blocks.append((text, self._main_depth > 0))
+            self.text_length += len(text)
+
+    def article_text(self, min_block_chars: int, max_chars: int) -> str:
+        """
+        The page's main text: the <article>/<main> blocks if they hold a
+        substantial amount of text, otherwise all blocks. Short blocks (menus,
+        bylines, captions) and repeated blocks are dropped.
+        """
+        self.end_block()
+        main_blocks = [text for text, in_main in self.blocks if in_main]
+        blocks = main_blocks if sum(map(len, main_blocks)) >= 4 * min_block_chars else [text for text, _ in self.blocks]
+        kept, seen, length = [], set(), 0
+        for text in blocks:
+            if len(text) < min_block_chars or text in seen:
+                continue
+            seen.add(text)
+            kept.append(text)
+            length += len(text) + 1
+            if length >= max_chars:
+                break
+        return " ".join(kept)[:max_chars]
+
+class _PublicAddressTransport(httpx.AsyncBaseTransport):
+    """
+    Sends requests only to hosts that resolve to public addresses.
+
+    The host of every request, redirects included, is resolved here, and the
+    request is sent to the checked address itself, with the original Host
+    header and TLS server name. A DNS answer that changes between the check
+    and the connection (DNS rebinding) therefore cannot reach another address.
+    """
+
+    def __init__(self, transport: httpx.AsyncBaseTransport, resolver):
+        """
+        Args:
+            transport (httpx.AsyncBaseTransport): Transport that sends the pinned requests.
+            resolver (callable): Async function returning the IP addresses of a host name.
+        """
+        self._transport = transport
+        self._resolver = resolver
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        """
+        Raises:
+            FetchError: If the URL is not http(s), its host cannot be resolved,
+                or any of its addresses is loopback, private, link-local or
+                otherwise not globally routable.
+        """
+        url = request.url
+        if url.scheme not in ("http", "https") or not url.host:
+            raise FetchError("refusing to fetch a non-web URL")
         try:
-            async with httpx.AsyncClient() as client:
-                response = await client.post(url, json=payload)
-                response.raise_for_status() # Raise an exception for bad status codes
-                results = response.json()
+            addresses = await self._resolver(url.host)
+        except OSError as e:
+            raise FetchError(f"could not resolve {url.host}") from e
+        if not addresses:
+            raise FetchError(f"could not resolve {url.host}")
+        checked = []
+        for address in addresses:
+            ip = ipaddress.ip_address(address.split("%", 1)[0])
+            if ip.version == 6 and ip.ipv4_mapped:
+                ip = ip.ipv4_mapped
+            if not ip.is_global or ip.is_multicast:
+                metrics.increment("fetch.blocked_hosts")
+                raise FetchError(f"refusing to fetch {url.host}: it resolves to the non-public address {ip}")
+            checked.append(ip)
 
-                if not results.get("results"):
-                    return f"No search results found for query: '{tool_input}'"
+        # The client keeps the original request, so redirects resolve against the real URL.
+        pinned = httpx.Request(
+            request.method, url.copy_with(host=str(checked[0])), headers=request.headers,
+            stream=request.stream, extensions={**request.extensions, "sni_hostname": url.host},
+        )
+        return await self._transport.handle_async_request(pinned)
 
-                # Format the results for the agent
-                formatted_results = []
-                for res in results["results"]:
-                    formatted_results.append(f"- Title: {res['title']}\n  URL: {res['url']}\n  Snippet: {res['content']}\n")
-                return "\n".join(formatted_results)
+    async def aclose(self):
+        await self._transport.aclose()
 
-        except httpx.HTTPStatusError as e:
-            return f"Error performing search: HTTP Status {e.response.status_code} - {e.response.text}"
-        except Exception as e:
-            return f"An unexpected error occurred during search: {e}"
+
+class ArticleFetchTool(BaseTool):
+    """
+    Fetches the full text of articles whose URLs appeared in earlier observations.
+
+    All URLs are fetched concurrently over one pooled client, with a limit on
+    concurrent requests per host. Bodies are streamed and parsed as they
+    arrive, and reading stops at a hard byte cap and a per-article time cap,
+    so one huge or slow page cannot hold up the others.
+
+    Since the URLs come from the model, and through it from web pages, the
+    agent only passes URLs that appeared in the run's earlier observations
+    (see `known_urls_only`), and every request, including each redirect, is
+    refused unless its host resolves to public addresses only (see
+    `_PublicAddressTransport`).
+    """
+    name = "fetch_articles"
+    description = (
+        "Fetches the full text of news articles. Use this when search snippets are too thin to "
+        "answer confidently: pass the URLs of the most relevant results from earlier observations "
+        "instead of running more searches."
+    )
+    details = (
+        "<tool_details>\n"
+        "  <name>fetch_articles</name>\n"
+        "  <description>Fetches and extracts the main text of up to "
+        f"{FETCH_CONFIG['max_urls']} web pages at once.</description>\n"
+        "  <parameters>\n"
+        "    <param name='urls' type='string' required='true'>URLs copied from earlier observations, separated by spaces or new lines. For example: 'https://example.com/port-strike https://example.org/typhoon-update'.</param>\n"
+        "  </parameters>\n"
+        "</tool_details>"
+    )
+
+    max_concurrency = 2
+    timeout = FETCH_CONFIG["connect_timeout"] + 2 * FETCH_CONFIG["article_timeout"]
+    cacheable = True
+    cost_class = "expensive"
+    known_urls_only = True
+
+    def __init__(self, transport: httpx.AsyncBaseTransport = None, resolver=None):
+        """
+        Args:
+            transport (httpx.AsyncBaseTransport): Transport for the HTTP client;
+                by default the network. Tests can pass a local stand-in.
+            resolver (callable): Async function returning the IP addresses of a
+                host name; by default the system resolver.
+        """
+        self.transport = transport
+        self.resolver = resolver or self._resolve
+
+    async def use(self, tool_input: str, token_budget: int = None) -> str:
+        """
+        Fetches the articles at the URLs contained in the input.
+
+        The extracted text is capped per article, not sized from `token_budget`:
+        the observation is compressed to the step's budget afterwards, and
+        more text gives the compression more relevant sentences to choose from.
+
+        Args:
+            tool_input (str): Text containing up to FETCH_CONFIG["max_urls"] URLs.
+            token_budget (int): Unused.
+
+        Returns:
+            str: The articles formatted like search results, preceded by a note
+                listing the URLs that could not be fetched, or an error message.
+        """
+        urls = parse_urls(tool_input)[:FETCH_CONFIG["max_urls"]]
+        if not urls:
+            return "Error: No http(s) URLs found in the input. Pass URLs from earlier search results."
+
+        limits = httpx.Limits(max_connections=FETCH_CONFIG["max_connections"])
+        timeout = httpx.Timeout(FETCH_CONFIG["article_timeout"], connect=FETCH_CONFIG["connect_timeout"])
+        transport = _PublicAddressTransport(self.transport or httpx.AsyncHTTPTransport(limits=limits), self.resolver)
+        host_slots = {}
+        async with httpx.AsyncClient(
+            transport=transport, timeout=timeout, follow_redirects=True, max_redirects=FETCH_CONFIG["max_redirects"],
+            headers={"User-Agent": FETCH_CONFIG["user_agent"], "Accept": "text/html,text/plain;q=0.9"}
+        ) as client:
+            outcomes = await asyncio.gather(
+                *(self._fetch(client, url, host_slots) for url in urls), return_exceptions=True
+            )
+
+        articles, failures = [], []
+        for url, outcome in zip(urls, outcomes):
+            if isinstance(outcome, Exception):
+                metrics.increment("fetch.failures")
+                failures.append(f"  {url}: {outcome}")
+            else:
+                articles.append(outcome)
+
+        notice = f"Could not fetch {len(failures)} of {len(urls)} URL(s):\n" + "\n".join(failures) if failures else ""
+        if not articles:
+            return notice
+        return f"{notice}\n\n{format_results(articles)}" if notice else format_results(articles)
+
+    def should_cache(self, output: str) -> bool:
+        """Only complete successes are cached, so failed URLs are retried next time."""
+        return output.startswith("- Title: ")
+
+    async def _fetch(self, client: httpx.AsyncClient, url: str, host_slots: dict) -> dict:
+        """
+        Streams one article, within the per-host limit and the time cap.
+
+        Returns:
+            dict: A result with 'title', 'url' and 'content'.
+
+        Raises:
+            FetchError: If nothing readable could be retrieved.
+        """
+        host = httpx.URL(url).host
+        slot = host_slots.setdefault(host, asyncio.Semaphore(FETCH_CONFIG["per_host_limit"]))
+        async with slot:
+            parser = _ArticleTextParser()
+            started = time.perf_counter()
+            try:
+                await asyncio.wait_for(self._stream(client, url, parser), FETCH_CONFIG["article_timeout"])
+            except (asyncio.TimeoutError, httpx.TimeoutException):
+                # Keep what arrived before the cap; a slow tail is usually boilerplate.
+                metrics.increment("fetch.time_capped")
+                parser.end_block()
+                if not parser.text_length:
+                    raise FetchError(f"timed out after {FETCH_CONFIG['article_timeout']}s")
+            except httpx.HTTPStatusError as e:
+                raise FetchError(f"HTTP status {e.response.status_code}") from e
+            except httpx.HTTPError as e:
+                raise FetchError(f"{type(e).__name__}: {e}" if str(e) else type(e).__name__) from e
+            metrics.observe("fetch.latency", time.perf_counter() - started)
+
+        content = parser.article_text(FETCH_CONFIG["min_block_chars"], FETCH_CONFIG["max_chars"])
+        if not content:
+            raise FetchError("no readable text found")
+        title = " ".join((parser.meta_title or parser.title).split()) or host
+        return {"title": title, "url": url, "content": content}
+
+    @staticmethod
+    async def _stream(client: httpx.AsyncClient, url: str, parser: _ArticleTextParser):
+        """Requests a URL, following redirects, and parses the final response."""
+        async with client.stream("GET", url) as response:
+            await ArticleFetchTool._read(response, parser)
+
+    @staticmethod
+    async def _resolve(host: str) -> list:
+        """The IP addresses of a host name (or of an IP literal, itself)."""
+        infos = await asyncio.get_running_loop().getaddrinfo(host, None, type=socket.SOCK_STREAM)
+        return [info[4][0] for info in infos]
+
+    @staticmethod
+    async def _read(response: httpx.Response, parser: _ArticleTextParser):
+        """Feeds a final response's body to the parser chunk by chunk, up to the byte cap."""
+        response.raise_for_status()
+        content_type = response.headers.get("content-type", "text/html").split(";")[0].strip().lower()
+        if content_type not in ("text/html", "application/xhtml+xml", "text/plain"):
+            raise FetchError(f"unsupported content type {content_type}")
+
+        try:
+            decoder = codecs.getincrementaldecoder(response.charset_encoding or "utf-8")(errors="replace")
+        except LookupError:
+            decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+        received = 0
+        # Decompressed bytes are counted, so compressed bombs are capped too.
+        async for chunk in response.aiter_bytes():
+            chunk = chunk[:FETCH_CONFIG["max_bytes"] - received]
+            received += len(chunk)
+            parser.feed(decoder.decode(chunk))
+            if received >= FETCH_CONFIG["max_bytes"]:
+                metrics.increment("fetch.byte_capped")
+                break
+            if parser.text_length >= 4 * FETCH_CONFIG["max_chars"]:
+                # Enough text to choose from; skip the rest of the page.
+                break
+        metrics.increment("fetch.bytes", received)
@@ -0,0 +1,310 @@
+# watchlist.py
+# Watchlist monitoring: standing risk questions (per supplier, port or region)
+# that are refreshed on a schedule. The first analysis runs the full agent loop;
+# later refreshes only repeat its searches, compare the results with the stored
+# evidence (URLs and title hashes) and call the LLM once to revise the answer
+# when, and only when, the evidence actually changed.
+#
+# Usage:
+#   python watchlist.py add "Port congestion risks at Rotterdam"
+#   python watchlist.py list
+#   python watchlist.py refresh [item_id] [--every MINUTES]
+#   python watchlist.py show item_id
+
+import argparse
+import asyncio
+import hashlib
+import os
+import sqlite3
+import time
+
+from app_config import WATCHLIST_CONFIG
+from metrics import metrics
+from prompts import WATCHLIST_UPDATE_PROMPT_TEMPLATE
+from tools import format_results, parse_results
+
+
+def content_hash(text: str) -> str:
+    """Hashes text after collapsing whitespace, so reformatting is not a change."""
+    return hashlib.sha256(" ".join(text.split()).encode("utf-8")).hexdigest()[:16]
+
+
+def evidence_hash(result: dict) -> str:
+    """
+    Identifies a search result by its URL and title.
+
+    The snippet is left out on purpose: the search backend returns different
+    snippets for the same page depending on the search depth and the query,
+    so hashing it would report changes where there is no new news.
+    """
+    return content_hash(f"{result['url']} {result['title']}")
+
+
+class Watchlist:
+    """
+    Stores watchlist items with their answer, the searches behind it and the
+    evidence set those searches returned.
+    """
+
+    def __init__(self, agent, db_path: str = None):
+        """
+        Opens (or creates) the watchlist database.
+
+        Args:
+            agent (SupplyChainAnalystAgent): Used for the initial analysis, the
+                repeated searches and the update calls.
+            db_path (str): Path of the SQLite file. Relative paths are resolved
+                against the application directory.
+        """
+        self.agent = agent
+        db_path = db_path or WATCHLIST_CONFIG["db_path"]
+        if not os.path.isabs(db_path):
+            db_path = os.path.join(os.path.dirname(__file__), db_path)
+        self._conn = sqlite3.connect(db_path)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.executescript(
+            "CREATE TABLE IF NOT EXISTS items ("
+            " id INTEGER PRIMARY KEY AUTOINCREMENT,"
+            " query TEXT NOT NULL,"
+            " answer TEXT NOT NULL,"
+            " created_at REAL NOT NULL,"
+            " refreshed_at REAL NOT NULL,"
+            " updated_at REAL NOT NULL,"
+            " refresh_count INTEGER NOT NULL DEFAULT 0,"
+            " update_count INTEGER NOT NULL DEFAULT 0);"
+            "CREATE TABLE IF NOT EXISTS searches ("
+            " item_id INTEGER NOT NULL,"
+            " tool TEXT NOT NULL,"
+            " input TEXT NOT NULL,"
+            " result_count INTEGER,"
+            " PRIMARY KEY (item_id, tool, input));"
+            "CREATE TABLE IF NOT EXISTS evidence ("
+            " item_id INTEGER NOT NULL,"
+            " url TEXT NOT NULL,"
+            " content_hash TEXT NOT NULL,"
+            " first_seen REAL NOT NULL,"
+            " PRIMARY KEY (item_id, url));"
+        )
+        columns = {row["name"] for row in self._conn.execute("PRAGMA table_info(searches)")}
+        if "result_count" not in columns:
+            # Databases created before result counts were recorded also hashed
+            # snippets; an empty hash makes the next refresh re-baseline them.
+            with self._conn:
+                self._conn.execute("ALTER TABLE searches ADD COLUMN result_count INTEGER")
+                self._conn.execute("UPDATE evidence SET content_hash = ''")
+
+    async def add(self, query: str, max_steps: int = 5) -> dict:
+        """
+        Analyzes a new watchlist question with the full agent loop and stores
+        the answer together with its searches and evidence.
+
+        Calls of `known_urls_only` tools (article fetches) are not stored:
+        they only re-read results of the searches, and their URLs were
+        allowed for that one run, not for unattended refreshes.
+
+        Returns:
+            dict: The stored item.
+        """
+        run_record = await self.agent.analyze(query, max_steps=max_steps)
+        now = time.time()
+        with self._conn:
+            item_id = self._conn.execute(
+                "INSERT INTO items (query, answer, created_at, refreshed_at, updated_at) VALUES (?, ?, ?, ?, ?)",
+                (query, run_record["answer"], now, now, now),
+            ).lastrowid
+            for observation in run_record["observations"]:
+                if self._is_url_tool(observation["tool"]):
+                    continue
+                results = parse_results(observation["output"])
+                self._conn.execute(
+                    "INSERT OR IGNORE INTO searches (item_id, tool, input, result_count) VALUES (?, ?, ?, ?)",
+                    (item_id, observation["tool"], observation["input"], len(results)),
+                )
+                self._store_evidence(item_id, results, now)
+        return self.get(item_id)
+
+    async def refresh(self, item_id: int) -> dict:
+        """
+        Re-runs an item's searches and revises its answer if the evidence changed.
+
+        Evidence counts as new when a result's URL was not seen before or its
+        title changed. Only as many results per search as the original run got
+        are compared, so a refresh that is sized differently from the original
+        step (which sized its search from its token budget) does not turn the
+        extra results into "news".
+
+        Returns:
+            dict: {'item_id', 'changed' (bool), 'new_evidence' (count), 'answer'}.
+        """
+        item = self.get(item_id)
+        if item is None:
+            raise KeyError(f"Watchlist item {item_id} not found.")
+        searches = [
+            row for row in self._conn.execute(
+                "SELECT tool, input, result_count FROM searches WHERE item_id = ?", (item_id,)
+            )
+            # Items added before article fetches were skipped may still list some.
+            if not self._is_url_tool(row["tool"])
+        ]
+
+        outputs = await asyncio.gather(*(self._search(row["tool"], row["input"]) for row in searches))
+        known = {
+            row["url"]: row["content_hash"]
+            for row in self._conn.execute("SELECT url, content_hash FROM evidence WHERE item_id = ?", (item_id,))
+        }
+        new_results, rebaselined, seen = [], [], set()
+        for row, output in zip(searches, outputs):
+            results = parse_results(output)
+            if row["result_count"] is not None:
+                results = results[:row["result_count"]]
+            for result in results:
+                if result["url"] in seen:
+                    continue
+                seen.add(result["url"])
+                if known.get(result["url"]) == "":
+                    rebaselined.append(result)
+                elif known.get(result["url"]) != evidence_hash(result):
+                    new_results.append(result)
+
+        now = time.time()
+        metrics.increment("watchlist.refreshes")
+        if not new_results:
+            metrics.increment("watchlist.unchanged")
+            with self._conn:
+                self._store_evidence(item_id, rebaselined, now)
+                self._conn.execute(
+                    "UPDATE items SET refreshed_at = ?, refresh_count = refresh_count + 1 WHERE id = ?",
+                    (now, item_id),
+                )
+            return {"item_id": item_id, "changed": False, "new_evidence": 0, "answer": item["answer"]}
+
+        new_results = new_results[:WATCHLIST_CONFIG["max_new_evidence"]]
+        answer = await self._revise(item, new_results)
+        metrics.increment("watchlist.updates")
+        with self._conn:
+            self._store_evidence(item_id, rebaselined + new_results, now)
+            self._conn.execute(
+                "UPDATE items SET answer = ?, refreshed_at = ?, updated_at = ?,"
+                " refresh_count = refresh_count + 1, update_count = update_count + 1 WHERE id = ?",
+                (answer, now, now, item_id),
+            )
+        return {"item_id": item_id, "changed": True, "new_evidence": len(new_results), "answer": answer}
+
+    async def refresh_all(self) -> list:
+        """Refreshes every item, a few at a time."""
+        semaphore = asyncio.Semaphore(WATCHLIST_CONFIG["refresh_concurrency"])
+
+        async def refresh_one(item_id):
+            async with semaphore:
+                return await self.refresh(item_id)
+
+        return await asyncio.gather(*(refresh_one(item["id"]) for item in self.list()))
+
+    def get(self, item_id: int) -> dict:
+        """Returns a watchlist item by id, or None."""
+        row = self._conn.execute("SELECT * FROM items WHERE id = ?", (item_id,)).fetchone()
+        return dict(row) if row else None
+
+    def list(self) -> list:
+        """Returns all watchlist items."""
+        return [dict(row) for row in self._conn.execute("SELECT * FROM items ORDER BY id")]
+
+    def remove(self, item_id: int):
+        """Deletes an item with its searches and evidence."""
+        with self._conn:
+            for table, column in (("items", "id"), ("searches", "item_id"), ("evidence", "item_id")):
+                self._conn.execute(f"DELETE FROM {table} WHERE {column} = ?", (item_id,))
+
+    def _is_url_tool(self, tool_name: str) -> bool:
+        """Whether a tool only accepts URLs found by earlier searches of the same run."""
+        tool = self.agent.find_tool(tool_name)
+        return tool is not None and bool(tool.known_urls_only)
+
+    async def _search(self, tool_name: str, tool_input: str) -> str:
+        """Repeats one recorded search through the agent's tool, bypassing the tool cache."""
+        tool = self.agent.find_tool(tool_name)
+        if tool is None:
+            return ""
+        return await tool.use(tool_input, use_cache=False)
+
+    async def _revise(self, item: dict, new_results: list) -> str:
+        """Makes the single LLM call that folds new evidence into the answer."""
+        prompt = WATCHLIST_UPDATE_PROMPT_TEMPLATE.format(
+            query=item["query"],
+            previous_answer=item["answer"],
+            new_evidence=format_results(new_results),
+        )
+        reply = await self.agent.complete([{"role": "user", "content": prompt}])
+        return self.agent._extract_content(reply, "answer") or reply
+
+    def _store_evidence(self, item_id: int, results: list, seen_at: float):
+        """Upserts results into an item's evidence set."""
+        for result in results:
+            if not result["url"]:
+                continue
+            self._conn.execute(
+                "INSERT INTO evidence (item_id, url, content_hash, first_seen) VALUES (?, ?, ?, ?)"
+                " ON CONFLICT (item_id, url) DO UPDATE SET content_hash = excluded.content_hash",
+                (item_id, result["url"], evidence_hash(result), seen_at),
+            )
+
+
+async def _run_command(args):
+    """Executes one watchlist command."""
+    from agent import SupplyChainAnalystAgent
+    from config import load_config
+
+    load_config()
+    watchlist = Watchlist(SupplyChainAnalystAgent(), args.db)
+
+    if args.command == "add":
+        item = await watchlist.add(args.query)
+        print(f"Added watchlist item {item['id']}.\n\n{item['answer']}")
+    elif args.command == "list":
+        for item in watchlist.list():
+            refreshed = time.strftime("%Y-%m-%d %H:%M", time.localtime(item["refreshed_at"]))
+            print(f"  #{item['id']:<4} refreshed {refreshed}  updates={item['update_count']}  {item['query'][:60]}")
+    elif args.command == "show":
+        item = watchlist.get(args.item_id)
+        print(item["answer"] if item else f"Watchlist item {args.item_id} not found.")
+    elif args.command == "remove":
+        watchlist.remove(args.item_id)
+        print(f"Removed watchlist item {args.item_id}.")
+    elif args.command == "refresh":
+        while True:
+            if args.item_id is None:
+                outcomes = await watchlist.refresh_all()
+            else:
+                outcomes = [await watchlist.refresh(args.item_id)]
+            for outcome in outcomes:
+                status = f"updated with {outcome['new_evidence']} new source(s)" if outcome["changed"] else "unchanged"
+                print(f"  #{outcome['item_id']}: {status}")
+            if not args.every:
+                break
+            await asyncio.sleep(args.every * 60)
+
+
+def main():
+    """Command line entry point for managing and refreshing the watchlist."""
+    parser = argparse.ArgumentParser(description="Supply Chain Risk Analyst AI - watchlist monitoring")
+    parser.add_argument("--db", default=WATCHLIST_CONFIG["db_path"], help="Watchlist database path")
+    commands = parser.add_subparsers(dest="command", required=True)
+    add_parser = commands.add_parser("add", help="Analyze and start watching a question")
+    add_parser.add_argument("query")
+    commands.add_parser("list", help="List watched questions")
+    show_parser = commands.add_parser("show", help="Print an item's current answer")
+    show_parser.add_argument("item_id", type=int)
+    remove_parser = commands.add_parser("remove", help="Stop watching a question")
+    remove_parser.add_argument("item_id", type=int)
+    refresh_parser = commands.add_parser("refresh", help="Refresh one item, or all of them")
+    refresh_parser.add_argument("item_id", type=int, nargs="?")
+    refresh_parser.add_argument("--every", type=float, help="Keep refreshing every N minutes")
+
+    try:
+        asyncio.run(_run_command(parser.parse_args()))
+    except KeyboardInterrupt:
+        print("\nStopped.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,191 @@
+# worker.py
+# Runs analysis jobs from the durable job queue on a fleet of worker processes.
+# Each process has its own event loop and agent, so throughput scales across
+# CPU cores, and a crashed worker only delays its jobs until their leases expire.
+#
+# Usage:
+#   python worker.py run --workers 4           # start the fleet (Ctrl+C to stop)
+#   python worker.py submit "your question"    # enqueue an analysis
+#   python worker.py status [job_id]           # queue summary or one job's result
+
+import argparse
+import asyncio
+import multiprocessing
+import os
+import signal
+import socket
+import time
+
+from app_config import WORKER_CONFIG
+from cancellation import CancellationToken, RunCancelled
+from job_queue import JobQueue
+
+
+async def process_job(agent, queue: JobQueue, job: dict, owner: str):
+    """
+    Runs one leased job, heartbeating its lease until the agent finishes.
+
+    If a heartbeat reveals that the lease was lost (for example because this
+    process was stalled past the lease), the job is abandoned: another worker
+    already owns it.
+    """
+    print(f"[{owner}] Job {job['id']} (attempt {job['attempts']}): {job['query']}")
+    cancel_token = CancellationToken()
+    task = asyncio.ensure_future(agent.analyze(job["query"], cancel_token=cancel_token, **job["params"]))
+    while not task.done():
+        done, _ = await asyncio.wait({task}, timeout=WORKER_CONFIG["heartbeat_interval"])
+        if not done and not queue.heartbeat(job["id"], owner):
+            print(f"[{owner}] Lost the lease on job {job['id']}; abandoning it.")
+            cancel_token.cancel("lease lost")
+            try:
+                await task
+            except RunCancelled:
+                pass
+            return
+
+    try:
+        result = task.result()
+    except Exception as e:
+        queue.fail(job["id"], owner, f"{type(e).__name__}: {e}")
+        print(f"[{owner}] Job {job['id']} failed: {e}")
+    else:
+        queue.complete(job["id"], owner, result)
+        print(f"[{owner}] Job {job['id']} done.")
+
+
+async def worker_loop(worker_index: int, db_path: str, concurrency: int):
+    """
+    Leases and runs jobs forever, keeping up to `concurrency` jobs in flight.
+
+    Args:
+        worker_index (int): Position of this worker in the fleet, for logging.
+        db_path (str): The job queue database.
+        concurrency (int): Maximum number of jobs this process runs at once.
+    """
+    # Imported here so the supervisor process never builds an agent itself.
+    from agent import SupplyChainAnalystAgent
+    from config import load_config
+
+    load_config()
+    queue = JobQueue(db_path)
+    agent = SupplyChainAnalystAgent()
+    owner = f"{socket.gethostname()}:{os.getpid()}:w{worker_index}"
+    running = set()
+    # The supervisor stops workers with SIGTERM; unwind so buffered analytics are written.
+    loop, task = asyncio.get_running_loop(), asyncio.current_task()
+    try:
+        loop.add_signal_handler(signal.SIGTERM, task.cancel)
+    except NotImplementedError:
+        # Event loops on Windows have no signal handlers.
+        signal.signal(signal.SIGTERM, lambda signum, frame: loop.call_soon_threadsafe(task.cancel))
+
+    try:
+        while True:
+            while len(running) < concurrency:
+                job = queue.lease(owner)
+                if job is None:
+                    break
+                running.add(asyncio.ensure_future(process_job(agent, queue, job, owner)))
+
+            if running:
+                _, running = await asyncio.wait(
+                    running, timeout=WORKER_CONFIG["poll_interval"], return_when=asyncio.FIRST_COMPLETED
+                )
+            else:
+                await asyncio.sleep(WORKER_CONFIG["poll_interval"])
+    finally:
+        if agent.analytics is not None:
+            agent.analytics.flush()
+
+
+def _worker_process(worker_index: int, db_path: str, concurrency: int):
+    """Entry point of a worker process."""
+    # The supervisor handles Ctrl+C and stops the workers itself.
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    try:
+        asyncio.run(worker_loop(worker_index, db_path, concurrency))
+    except asyncio.CancelledError:
+        # Terminated by the supervisor; jobs in flight are retried once their leases expire.
+        pass
+
+
+def run_fleet(workers: int, db_path: str, concurrency: int):
+    """
+    Starts the worker processes and restarts any that exit unexpectedly.
+
+    Args:
+        workers (int): Number of worker processes.
+        db_path (str): The job queue database.
+        concurrency (int): Jobs each worker runs at once.
+    """
+    context = multiprocessing.get_context("spawn")
+
+    def start(index):
+        process = context.Process(
+            target=_worker_process, args=(index, db_path, concurrency), name=f"worker-{index}", daemon=True
+        )
+        process.start()
+        return process
+
+    processes = {index: start(index) for index in range(workers)}
+    print(f"Started {workers} workers ({concurrency} concurrent job(s) each). Press Ctrl+C to stop.")
+    try:
+        while True:
+            time.sleep(1)
+            for index, process in list(processes.items()):
+                if not process.is_alive():
+                    print(f"Worker {index} exited with code {process.exitcode}; restarting.")
+                    processes[index] = start(index)
+    except KeyboardInterrupt:
+        print("\nStopping workers. Jobs in flight will be retried after their leases expire.")
+    finally:
+        for process in processes.values():
+            process.terminate()
+        for process in processes.values():
+            process.join(timeout=5)
+
+
+def main():
+    """Parses the command line and dispatches to the requested command."""
+    parser = argparse.ArgumentParser(description="Supply Chain Risk Analyst AI - worker fleet")
+    parser.add_argument("--db", default=WORKER_CONFIG["db_path"], help="Job queue database path")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = commands.add_parser("run", help="Start the worker fleet")
+    run_parser.add_argument("--workers", type=int, default=WORKER_CONFIG["workers"] or os.cpu_count() or 1)
+    run_parser.add_argument("--concurrency", type=int, default=WORKER_CONFIG["concurrency"])
+
+    submit_parser = commands.add_parser("submit", help="Enqueue an analysis")
+    submit_parser.add_argument("query")
+    submit_parser.add_argument("--max-steps", type=int, default=5)
+
+    status_parser = commands.add_parser("status", help="Show the queue or a single job")
+    status_parser.add_argument("job_id", type=int, nargs="?")
+
+    args = parser.parse_args()
+
+    if args.command == "run":
+        run_fleet(args.workers, args.db, args.concurrency)
+        return
+
+    queue = JobQueue(args.db)
+    if args.command == "submit":
+        job_id = queue.submit(args.query, {"max_steps": args.max_steps})
+        print(f"Submitted job {job_id}.")
+    elif args.job_id is None:
+        print(queue.stats() or "The queue is empty.")
+        for job in queue.list(limit=10):
+            print(f"  #{job['id']:<5} {job['status']:<7} attempts={job['attempts']}  {job['query'][:60]}")
+    else:
+        job = queue.get(args.job_id)
+        if job is None:
+            print(f"Job {args.job_id} not found.")
+        elif job["status"] == "done":
+            print(job["result"]["answer"])
+        else:
+            print(f"Job {job['id']} is {job['status']} (attempts: {job['attempts']}). {job['error'] or ''}")
+    queue.close()
+
+
+if __name__ == "__main__":
+    main()